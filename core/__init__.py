@@ -13,7 +13,7 @@ root_modules = [
 core_modules = [
     "monad_properties", "sv_custom_exceptions",
     "node_id_dict", "links", "sockets",
-    "handlers", "update_system", "upgrade_nodes",
+    "handlers", "socket_disk_cache", "update_system", "upgrade_nodes",
     "monad", "node_defaults", "events"
 ]
 
@@ -16,6 +16,13 @@
 #
 # ##### END GPL LICENSE BLOCK #####
 
+import hashlib
+import sys
+from contextlib import contextmanager
+
+import numpy as np
+from mathutils import Vector, Matrix, Quaternion, Color
+
 from sverchok import data_structure
 from sverchok.utils.logging import warning, info, debug
 
@@ -28,6 +35,23 @@ sentinel = object()
 # socket cache
 socket_data_cache = {}
 
+# content fingerprints of the data in socket_data_cache,
+# same layout: {tree_id: {socket_id: fingerprint}}
+socket_fingerprint_cache = {}
+
+# estimated sizes (in bytes) of the data in socket_data_cache,
+# same layout, filled lazily by get_socket_cache_sizes
+socket_size_cache = {}
+
+# conversions between numpy arrays and lists made by sockets of nodes
+# which use array mode (see array_inputs / array_outputs of nodes):
+# {tree_id: {(node name, socket name): (from node name, from socket name, direction, number of objects)}}
+array_mode_conversions = {}
+
+# stack of sets, collecting socket_ids of sockets set by SvSetSocket
+# inside of recording_socket_sets() blocks
+_recorded_sets = []
+
 # faster than builtin deep copy for us.
 # useful for our limited case
 # we should be able to specify vectors here to get them create
@@ -43,6 +67,192 @@ def sv_deep_copy(lst):
     return lst
 
 
+def _contains_arrays(data):
+    """checks if numpy arrays are on the path of first elements of nested lists"""
+    while isinstance(data, (list, tuple)) and data:
+        data = data[0]
+    return isinstance(data, np.ndarray)
+
+
+def sv_frozen(data):
+    """
+    return socket data without copying it, numpy arrays are replaced by
+    their read-only views, so that in-place modification raises an error
+    instead of changing data in the socket cache.
+    Only used for nodes which declare that they do not mutate their inputs,
+    lists are not protected
+    """
+    if isinstance(data, np.ndarray):
+        view = data.view()
+        view.flags.writeable = False
+        return view
+    if isinstance(data, list) and _contains_arrays(data):
+        return [sv_frozen(item) for item in data]
+    return data
+
+
+def sv_to_arrays(data, vertices=False):
+    """
+    converts objects (items of the first level) of socket data to numpy arrays:
+    arrays of shape (n, 3) for vertices, 1D arrays of numbers otherwise.
+    Objects which are already arrays or can not be converted are kept as is.
+    Returns converted data and number of converted objects.
+    """
+    if isinstance(data, np.ndarray):
+        return list(data), 0
+    result = []
+    converted = 0
+    for item in data:
+        if isinstance(item, np.ndarray):
+            result.append(item)
+            continue
+        if vertices and len(item) == 0:
+            array = np.empty((0, 3))
+        else:
+            try:
+                array = np.asarray(item, dtype=np.float64 if vertices else None)
+            except (ValueError, TypeError):
+                # ragged nested lists
+                array = None
+        if array is None or array.dtype.kind not in 'biuf' or array.ndim != (2 if vertices else 1) \
+                or (vertices and array.shape[1] != 3):
+            result.append(item)
+        else:
+            result.append(array)
+            converted += 1
+    return result, converted
+
+
+def sv_to_lists(data):
+    """
+    replaces numpy arrays in socket data by nested lists.
+    Returns converted data and number of converted arrays.
+    """
+    if isinstance(data, np.ndarray):
+        return data.tolist(), 1
+    if isinstance(data, list) and _contains_arrays(data):
+        result = []
+        converted = 0
+        for item in data:
+            item, n = sv_to_lists(item)
+            result.append(item)
+            converted += n
+        return result, converted
+    return data, 0
+
+
+def record_array_mode_conversion(socket, direction, count):
+    """remember that data for the input socket was converted, for get_array_mode_report"""
+    other = socket.other
+    conversions = array_mode_conversions.setdefault(socket.id_data.tree_id, {})
+    conversions[(socket.node.name, socket.name)] = (other.node.name, other.name, direction, count)
+
+
+def get_array_mode_report(tree):
+    """
+    list of lines describing where data of the tree is converted
+    between numpy arrays and lists, at boundaries of array mode
+    """
+    conversions = array_mode_conversions.get(tree.tree_id, {})
+    lines = []
+    for (node_name, socket_name), (from_node, from_socket, direction, count) in sorted(conversions.items()):
+        lines.append(f"{from_node}.{from_socket} -> {node_name}.{socket_name}: {count} object(s) converted to {direction}")
+    return lines
+
+
+# types which are hashed by their value when fingerprinting socket data
+_fingerprint_scalar_types = (int, float, str, bool, type(None), np.number, np.bool_,
+                             Vector, Matrix, Quaternion, Color)
+
+
+def _fingerprint_feed(hasher, data):
+    """feeds data into hasher, returns False if data can not be fingerprinted"""
+    if isinstance(data, np.ndarray):
+        if data.dtype.hasobject:
+            return False
+        hasher.update(f"{data.dtype}{data.shape}".encode())
+        hasher.update(np.ascontiguousarray(data).tobytes())
+        return True
+    if isinstance(data, (list, tuple)):
+        if not data:
+            hasher.update(b"[]")
+            return True
+        leaf = data[0]
+        if isinstance(leaf, (list, tuple)) and leaf:
+            leaf = leaf[0]
+        if isinstance(leaf, _fingerprint_scalar_types):
+            # flat list of numbers or list of vertices, repr works at C speed
+            hasher.update(repr(data).encode())
+            return True
+        hasher.update(b"[")
+        for item in data:
+            if not _fingerprint_feed(hasher, item):
+                return False
+        hasher.update(b"]")
+        return True
+    if isinstance(data, _fingerprint_scalar_types):
+        hasher.update(repr(data).encode())
+        return True
+    # curves, fields, bmesh, blender objects etc. are not compared by value
+    return False
+
+
+def sv_data_fingerprint(data):
+    """
+    returns a digest of the socket data content,
+    or None if the data contains objects which can not be compared by value
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    if _fingerprint_feed(hasher, data):
+        return hasher.digest()
+    return None
+
+
+# number of list items which are measured to estimate size of the whole list
+_size_samples = 16
+
+
+def sv_data_size(data):
+    """
+    estimate memory used by socket data in bytes,
+    size of long lists is extrapolated from size of their first items
+    """
+    if isinstance(data, np.ndarray):
+        return data.nbytes
+    if isinstance(data, (list, tuple)):
+        size = sys.getsizeof(data)
+        n = len(data)
+        if n == 0:
+            return size
+        if n > _size_samples:
+            sample = data[:_size_samples]
+            return size + sum(sv_data_size(item) for item in sample) * n // _size_samples
+        return size + sum(sv_data_size(item) for item in data)
+    return sys.getsizeof(data)
+
+
+def get_socket_cache_sizes(tree_id):
+    """returns dictionary {socket_id: estimated size} for the tree"""
+    data = socket_data_cache.get(tree_id, {})
+    sizes = socket_size_cache.setdefault(tree_id, {})
+    for s_id, out in data.items():
+        if s_id not in sizes:
+            sizes[s_id] = sv_data_size(out)
+    return sizes
+
+
+def get_socket_cache_size(tree_id):
+    """estimated memory used by cached socket data of the tree, in bytes"""
+    return sum(get_socket_cache_sizes(tree_id).values())
+
+
+def evict_socket_data(tree_id, s_id):
+    """removes socket data from cache to free memory, returns size of removed data"""
+    socket_data_cache.get(tree_id, {}).pop(s_id, None)
+    socket_fingerprint_cache.get(tree_id, {}).pop(s_id, None)
+    return socket_size_cache.get(tree_id, {}).pop(s_id, 0)
+
+
 # Build string for showing in socket label
 def SvGetSocketInfo(socket):
     """returns string to show in socket label"""
@@ -80,6 +290,10 @@ def SvForgetSocket(socket):
         socket_data_cache[s_ng].pop(s_id, None)
     except KeyError:
         print("it was never there")
+    if s_ng in socket_fingerprint_cache:
+        socket_fingerprint_cache[s_ng].pop(s_id, None)
+    if s_ng in socket_size_cache:
+        socket_size_cache[s_ng].pop(s_id, None)
 
 def SvSetSocket(socket, out):
     """sets socket data for socket"""
@@ -94,13 +308,56 @@ def SvSetSocket(socket, out):
     if s_ng not in socket_data_cache:
         socket_data_cache[s_ng] = {}
     socket_data_cache[s_ng][s_id] = out
+    if _recorded_sets:
+        _recorded_sets[-1].add(s_id)
+    if s_ng in socket_size_cache:
+        socket_size_cache[s_ng].pop(s_id, None)
+    if data_structure.SKIP_UNCHANGED or data_structure.DISK_CACHE_PATH:
+        if s_ng not in socket_fingerprint_cache:
+            socket_fingerprint_cache[s_ng] = {}
+        socket_fingerprint_cache[s_ng][s_id] = sv_data_fingerprint(out)
+
+
+@contextmanager
+def recording_socket_sets():
+    """Collect socket_ids of sockets which are set inside of the block"""
+    recorded = set()
+    _recorded_sets.append(recorded)
+    try:
+        yield recorded
+    finally:
+        _recorded_sets.pop()
+
+
+def SvGetSocketFingerprint(socket):
+    """
+    returns fingerprint of the data the socket reads (for input sockets)
+    or writes (for output sockets), None if it is unknown
+    """
+    if socket.is_output:
+        s_id = socket.socket_id
+        s_ng = socket.id_data.tree_id
+    else:
+        other = socket.other
+        if not other:
+            return None
+        s_id = other.socket_id
+        s_ng = other.id_data.tree_id
+    return socket_fingerprint_cache.get(s_ng, {}).get(s_id)
+
+
+def SvHasSocketData(socket):
+    """checks if output socket has data in socket_data_cache"""
+    return socket.socket_id in socket_data_cache.get(socket.id_data.tree_id, {})
 
 
 def SvGetSocket(socket, deepcopy=True):
     """gets socket data from socket,
     if deep copy is True a deep copy is make_dep_dict,
     to increase performance if the node doesn't mutate input
-    set to False and increase performance substanstilly
+    set to False and increase performance substanstilly.
+    Nodes which never mutate their inputs can set mutates_inputs = False,
+    then they get data without copying (with read-only numpy arrays)
     """
     global socket_data_cache
     if socket.is_linked:
@@ -112,7 +369,9 @@ def SvGetSocket(socket, deepcopy=True):
         if s_id in socket_data_cache[s_ng]:
             out = socket_data_cache[s_ng][s_id]
             if deepcopy:
-                return sv_deep_copy(out)
+                if getattr(socket.node, 'mutates_inputs', True):
+                    return sv_deep_copy(out)
+                return sv_frozen(out)
             else:
                 return out
         else:
@@ -179,6 +438,9 @@ def reset_socket_cache(ng):
     """
     global socket_data_cache
     socket_data_cache[ng.tree_id] = {}
+    socket_fingerprint_cache[ng.tree_id] = {}
+    socket_size_cache[ng.tree_id] = {}
+    array_mode_conversions.pop(ng.tree_id, None)
 
 def clear_all_socket_cache():
     """
@@ -186,3 +448,6 @@ def clear_all_socket_cache():
     """
     global socket_data_cache
     socket_data_cache.clear()
+    socket_fingerprint_cache.clear()
+    socket_size_cache.clear()
+    array_mode_conversions.clear()
@@ -0,0 +1,306 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Persistent on-disk cache of node outputs.
+
+Nodes which set disk_cacheable = True store their output data in
+.npz files, keyed by a hash of node type, node properties and
+fingerprints of input data. When the same node with the same inputs
+is processed again (for example after the .blend file is reopened),
+its outputs are loaded from disk instead of being recalculated.
+
+Only plain data (numbers, nested lists of numbers, numpy arrays)
+can be stored; if a node outputs anything else, it is just not cached.
+When files of the cache take more than DISK_CACHE_SIZE megabytes,
+the oldest of them are removed.
+"""
+
+import os
+import json
+import hashlib
+import warnings
+
+import numpy as np
+import bpy
+
+from sverchok import data_structure
+from sverchok.core.socket_data import SvGetSocketFingerprint, socket_data_cache
+from sverchok.utils.logging import debug, info, exception
+
+# increase when format of stored data changes
+CACHE_FORMAT_VERSION = 1
+
+_scalar_types = (int, float, bool, str, np.number, np.bool_)
+
+
+def _pack(data, arrays):
+    """
+    Convert socket data into JSON-compatible spec, storing numbers in arrays dict.
+    Returns None if the data can not be stored.
+    """
+    if isinstance(data, np.ndarray):
+        if data.dtype.hasobject:
+            return None
+        name = f"a{len(arrays)}"
+        arrays[name] = data
+        return {"array": name}
+    if isinstance(data, (list, tuple)):
+        if not data:
+            return {"items": []}
+        first = data[0]
+        if isinstance(first, _scalar_types) or (isinstance(first, (list, tuple)) and first and isinstance(first[0], _scalar_types)):
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                try:
+                    array = np.array(data)
+                except ValueError:
+                    array = None
+            if array is not None and array.dtype.kind in 'biuf':
+                # rectangular list, e.g. list of vertices or edges
+                name = f"a{len(arrays)}"
+                arrays[name] = array
+                return {"list": name, "tuples": isinstance(first, tuple)}
+            if isinstance(first, (list, tuple)) and all(isinstance(item, (list, tuple)) for item in data):
+                # ragged list, e.g. list of faces
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    try:
+                        values = np.array([value for item in data for value in item])
+                    except ValueError:
+                        values = None
+                if values is not None and values.ndim == 1 and values.dtype.kind in 'biuf':
+                    name = f"a{len(arrays)}"
+                    arrays[name] = values
+                    arrays[name + "_lengths"] = np.array([len(item) for item in data], dtype=np.int64)
+                    return {"ragged": name, "tuples": isinstance(first, tuple)}
+        items = []
+        for item in data:
+            spec = _pack(item, arrays)
+            if spec is None:
+                return None
+            items.append(spec)
+        return {"items": items}
+    if isinstance(data, _scalar_types):
+        if isinstance(data, (np.number, np.bool_)):
+            data = data.item()
+        return {"value": data}
+    return None
+
+
+def _unpack(spec, arrays):
+    if "array" in spec:
+        return arrays[spec["array"]]
+    if "list" in spec:
+        data = arrays[spec["list"]].tolist()
+        if spec["tuples"]:
+            data = [tuple(item) for item in data]
+        return data
+    if "ragged" in spec:
+        values = arrays[spec["ragged"]].tolist()
+        ends = np.cumsum(arrays[spec["ragged"] + "_lengths"]).tolist()
+        starts = [0] + ends[:-1]
+        item_type = tuple if spec["tuples"] else list
+        return [item_type(values[start:end]) for start, end in zip(starts, ends)]
+    if "items" in spec:
+        return [_unpack(item, arrays) for item in spec["items"]]
+    return spec["value"]
+
+
+def pack_socket_data(data_dict):
+    """
+    data_dict: {socket identifier: socket data}
+    Returns dictionary of numpy arrays suitable for np.savez, or None
+    """
+    arrays = {}
+    specs = {}
+    for identifier, data in data_dict.items():
+        spec = _pack(data, arrays)
+        if spec is None:
+            return None
+        specs[identifier] = spec
+    arrays["spec"] = np.array(json.dumps(specs))
+    return arrays
+
+
+def unpack_socket_data(arrays):
+    """inverse of pack_socket_data"""
+    specs = json.loads(str(arrays["spec"]))
+    return {identifier: _unpack(spec, arrays) for identifier, spec in specs.items()}
+
+
+def _property_value(value):
+    if isinstance(value, _scalar_types):
+        return value
+    try:
+        return tuple(value[:])
+    except TypeError:
+        return repr(value)
+
+
+def get_node_cache_key(node):
+    """
+    Hash of node type, its properties, fingerprints of linked input data
+    and names of linked outputs (nodes may set only linked outputs).
+    Returns None if some input data can not be fingerprinted.
+    """
+    hasher = hashlib.blake2b(digest_size=20)
+    hasher.update(f"{CACHE_FORMAT_VERSION}:{node.bl_idname}".encode())
+
+    for key, annotation in sorted(node.bl_rna.__annotations__.items()):
+        # node id is excluded, so that identical nodes share cached outputs
+        if annotation[0] == bpy.props.PointerProperty or key == 'n_id':
+            continue
+        hasher.update(f"{key}={_property_value(getattr(node, key))!r};".encode())
+
+    for socket in node.inputs:
+        if socket.is_linked:
+            fingerprint = SvGetSocketFingerprint(socket)
+            if fingerprint is None:
+                return None
+            hasher.update(socket.identifier.encode())
+            hasher.update(fingerprint)
+        elif getattr(socket, 'use_prop', False) and hasattr(socket, 'prop'):
+            hasher.update(f"{socket.identifier}={_property_value(socket.prop)!r};".encode())
+
+    linked_outputs = sorted(socket.identifier for socket in node.outputs if socket.is_linked)
+    hasher.update(f"outputs={linked_outputs!r}".encode())
+
+    return hasher.hexdigest()
+
+
+def _cache_file_path(key):
+    return os.path.join(data_structure.DISK_CACHE_PATH, key + ".npz")
+
+
+def load_node_outputs(node, key):
+    """
+    Set outputs of the node from disk cache.
+    Returns True if data for all linked outputs was found.
+    """
+    path = _cache_file_path(key)
+    if not os.path.exists(path):
+        return False
+    try:
+        with np.load(path, allow_pickle=False) as arrays:
+            data_dict = unpack_socket_data(arrays)
+    except Exception as e:
+        exception("Can't load cached outputs of node %s from %s: %s", node.name, path, e)
+        return False
+    sockets = {socket.identifier: socket for socket in node.outputs}
+    if not all(identifier in sockets for identifier in data_dict):
+        return False
+    if not all(socket.identifier in data_dict for socket in node.outputs if socket.is_linked):
+        return False
+    for identifier, data in data_dict.items():
+        sockets[identifier].sv_set(data)
+    debug("Loaded outputs of node %s from disk cache", node.name)
+    return True
+
+
+def save_node_outputs(node, key, set_sockets):
+    """
+    Store outputs of the node into disk cache.
+    set_sockets: socket_ids of outputs set by the node while it was processed
+    (see recording_socket_sets); data left in other outputs by earlier
+    processing is not stored.
+    """
+    tree_data = socket_data_cache.get(node.id_data.tree_id, {})
+    data_dict = {socket.identifier: tree_data[socket.socket_id]
+                    for socket in node.outputs
+                    if socket.socket_id in set_sockets and socket.socket_id in tree_data}
+    if not data_dict:
+        return
+    arrays = pack_socket_data(data_dict)
+    if arrays is None:
+        debug("Outputs of node %s can not be stored in disk cache", node.name)
+        return
+    path = _cache_file_path(key)
+    tmp_path = path + ".tmp"
+    try:
+        os.makedirs(data_structure.DISK_CACHE_PATH, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        exception("Can't store outputs of node %s in disk cache: %s", node.name, e)
+        return
+    limit_disk_cache_size()
+
+
+def _cache_files():
+    """(modification time, size, path) of files in the disk cache directory"""
+    path = data_structure.DISK_CACHE_PATH
+    if not path or not os.path.isdir(path):
+        return []
+    files = []
+    for entry in os.scandir(path):
+        if entry.name.endswith(".npz"):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+    return files
+
+
+def limit_disk_cache_size():
+    """Remove the oldest files from disk cache until it fits into DISK_CACHE_SIZE"""
+    limit = data_structure.DISK_CACHE_SIZE * 1024 * 1024
+    if not limit:
+        return
+    files = _cache_files()
+    total = sum(size for _, size, _ in files)
+    if total <= limit:
+        return
+    files.sort()
+    for _, size, path in files:
+        if total <= limit:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+    debug("Disk cache: %.1f MB after removing old files", total / (1024 * 1024))
+
+
+def clear_disk_cache():
+    """Remove all files stored in the disk cache directory"""
+    for _, _, path in _cache_files():
+        os.remove(path)
+
+
+class SvClearDiskCache(bpy.types.Operator):
+    """Remove all node outputs stored in the disk cache"""
+    bl_idname = "node.sverchok_clear_disk_cache"
+    bl_label = "Clear disk cache"
+    bl_options = {'INTERNAL'}
+
+    def execute(self, context):
+        clear_disk_cache()
+        info("Disk cache cleared.")
+        return {'FINISHED'}
+
+
+def register():
+    bpy.utils.register_class(SvClearDiskCache)
+
+
+def unregister():
+    bpy.utils.unregister_class(SvClearDiskCache)
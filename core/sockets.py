@@ -31,7 +31,7 @@ from sverchok.core.socket_conversions import (
 
 from sverchok.core.socket_data import (
     SvGetSocketInfo, SvGetSocket, SvSetSocket, SvForgetSocket,
-    SvNoDataError, sentinel)
+    SvNoDataError, sentinel, sv_to_arrays, sv_to_lists, _contains_arrays, record_array_mode_conversion)
 
 from sverchok.data_structure import (
     updateNode,
@@ -260,12 +260,39 @@ class SvSocketCommon:
         return self.other.bl_idname != self.bl_idname
 
     def convert_data(self, source_data, implicit_conversions=None):
-        if not self.needs_data_conversion():
-            return source_data
-        else:
+        # implicit conversions work with lists: arrays from outputs in
+        # array mode are converted before them, arrays for inputs in
+        # array mode are made after them
+        to_arrays = self.name in getattr(self.node, 'array_inputs', ())
+        if not to_arrays:
+            source_data = self.convert_array_mode(source_data)
+        if self.needs_data_conversion():
             policy = self.node.get_implicit_conversions(self.name, implicit_conversions)
             self.node.debug(f"Trying to convert data for input socket {self.name} by {policy}")
-            return policy.convert(self, source_data)
+            source_data = policy.convert(self, source_data)
+        if to_arrays:
+            source_data = self.convert_array_mode(source_data)
+        return source_data
+
+
+    def convert_array_mode(self, data):
+        """
+        Convert data at boundaries of array mode: inputs listed in
+        array_inputs of the node get numpy arrays; other inputs, linked to
+        outputs listed in array_outputs of the other node, get lists.
+        """
+        if self.name in getattr(self.node, 'array_inputs', ()):
+            data, count = sv_to_arrays(data, vertices=self.bl_idname == "SvVerticesSocket")
+            direction = "arrays"
+        elif self.is_linked and _contains_arrays(data) and self.other.name in getattr(self.other.node, 'array_outputs', ()):
+            data, count = sv_to_lists(data)
+            direction = "lists"
+        else:
+            return data
+        if count and self.is_linked:
+            self.node.debug(f"Converted {count} objects for input socket {self.name} to {direction}")
+            record_array_mode_conversion(self, direction, count)
+        return data
 
 
 class SvSocketStandard(SvSocketCommon):
@@ -426,9 +453,9 @@ class SvVerticesSocket(NodeSocket, SvSocketCommon):
             return self.convert_data(source_data, implicit_conversions)
 
         if self.get_prop_name():
-            return [[getattr(self.node, self.get_prop_name())[:]]]
+            return self.convert_array_mode([[getattr(self.node, self.get_prop_name())[:]]])
         elif self.use_prop:
-            return [[self.prop[:]]]
+            return self.convert_array_mode([[self.prop[:]]])
         elif default is sentinel:
             raise SvNoDataError(self)
         else:
@@ -458,9 +485,9 @@ class SvQuaternionSocket(NodeSocket, SvSocketCommon):
             return self.convert_data(source_data, implicit_conversions)
 
         if self.get_prop_name():
-            return [[getattr(self.node, self.get_prop_name())[:]]]
+            return self.convert_array_mode([[getattr(self.node, self.get_prop_name())[:]]])
         elif self.use_prop:
-            return [[self.prop[:]]]
+            return self.convert_array_mode([[self.prop[:]]])
         elif default is sentinel:
             raise SvNoDataError(self)
         else:
@@ -559,10 +586,10 @@ class SvStringsSocket(NodeSocket, SvSocketCommon):
             _, prop_dict = getattr(self.node.rna_type, self.get_prop_name(), (None, {}))
             subtype = prop_dict.get("subtype", "")
             if subtype == "ANGLE":
-                return [[math.degrees(getattr(self.node, self.get_prop_name()))]]
-            return [[getattr(self.node, self.get_prop_name())]]
+                return self.convert_array_mode([[math.degrees(getattr(self.node, self.get_prop_name()))]])
+            return self.convert_array_mode([[getattr(self.node, self.get_prop_name())]])
         elif self.prop_type:
-            return [[getattr(self.node, self.prop_type)[self.prop_index]]]
+            return self.convert_array_mode([[getattr(self.node, self.prop_type)[self.prop_index]]])
         elif default is not sentinel:
             return default
         else:
@@ -621,7 +648,8 @@ class SvChameleonSocket(NodeSocket, SvSocketCommon):
 
     def sv_get(self, default=sentinel, deepcopy=True):
         if self.is_linked and not self.is_output:
-            return SvGetSocket(self, deepcopy=True if self.needs_data_conversion() else deepcopy)
+            # no implicit conversions for chameleon, only array mode
+            return self.convert_array_mode(SvGetSocket(self, deepcopy=True if self.needs_data_conversion() else deepcopy))
 
         if self.get_prop_name():
             return [[getattr(self.node, self.get_prop_name())[:]]]
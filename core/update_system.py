@@ -18,14 +18,20 @@
 
 import collections
 import time
+import os
+from concurrent.futures import ThreadPoolExecutor, wait
 
 import bpy
 from mathutils import Vector
 
 from sverchok import data_structure
-from sverchok.core.socket_data import SvNoDataError, reset_socket_cache
+from sverchok.core.socket_data import (
+    SvNoDataError, reset_socket_cache, SvGetSocket, SvGetSocketFingerprint, SvHasSocketData,
+    sv_data_fingerprint, get_socket_cache_sizes, evict_socket_data, recording_socket_sets)
+from sverchok.core.socket_disk_cache import get_node_cache_key, load_node_outputs, save_node_outputs
 from sverchok.utils.logging import debug, info, warning, error, exception
 from sverchok.utils.profile import profile
+from sverchok.utils import telemetry
 from sverchok.utils.exception_drawing_with_bgl import clear_exception_drawing_with_bgl, start_exception_drawing_with_bgl
 from sverchok.core.socket_data import clear_all_socket_cache
 from sverchok.core.node_id_dict import clear_nodes_id_dict
@@ -53,6 +59,9 @@ def is_first_run():
 def clear_system_cache():
     print("cleaning Sverchok cache")
     clear_all_socket_cache()
+    node_input_signatures.clear()
+    evicted_nodes.clear()
+    dep_dict_cache.clear()
     clear_nodes_id_dict()
     clear_link_memory()
 
@@ -66,6 +75,15 @@ def update_error_colors(self, context):
 update_cache = {}
 # cache for partial update lists
 partial_update_cache = {}
+# fingerprints of node inputs at the moment of last successful processing
+# {tree_id: {node_id: signature}}
+node_input_signatures = {}
+# cache of dependency dictionaries, {tree name: {down: deps}},
+# dropped by build_update_list when links of the tree change
+dep_dict_cache = {}
+# names of nodes whose output data was evicted from socket cache
+# to fit into memory budget, {tree_id: set(node_name)}
+evicted_nodes = {}
 
 
 def make_dep_dict(node_tree, down=False):
@@ -116,6 +134,27 @@ def make_dep_dict(node_tree, down=False):
     return deps
 
 
+def get_dep_dict(node_tree, down=False):
+    """
+    Cached version of make_dep_dict. The cache is dropped when
+    update lists of the tree are rebuilt (on links change), so
+    partial updates do not have to walk all links of the tree.
+    The returned dictionary must not be modified.
+    """
+    tree_deps = dep_dict_cache.setdefault(node_tree.name, {})
+    deps = tree_deps.get(down)
+    if deps is None:
+        deps = make_dep_dict(node_tree, down)
+        tree_deps[down] = deps
+    return deps
+
+def clear_dep_dict_cache(node_tree):
+    """Should be called when dependencies between nodes change not by links (e.g. wifi nodes)"""
+    dep_dict_cache.pop(node_tree.name, None)
+    if node_tree.name in partial_update_cache:
+        partial_update_cache[node_tree.name] = {}
+
+
 def make_update_list(node_tree, node_set=None, dependencies=None):
     """
     Makes a update list from a node_group
@@ -135,7 +174,7 @@ def make_update_list(node_tree, node_set=None, dependencies=None):
     else:
         return []
     if not dependencies:
-        deps = make_dep_dict(ng)
+        deps = get_dep_dict(ng)
     else:
         deps = dependencies
 
@@ -233,8 +272,8 @@ def make_tree_from_nodes(node_names, tree, down=True):
     out_stack = collections.deque(node_names)
     current_node = out_stack.pop()
 
-    # build downwards links, this should be cached perhaps
-    node_links = make_dep_dict(ng, down)
+    # build downwards links
+    node_links = get_dep_dict(ng, down)
     while current_node:
         for node in node_links[current_node]:
             if node not in out_set:
@@ -270,7 +309,7 @@ def make_animation_tree(node_types, node_list, tree_name):
     return a_tree
 
 
-def do_update_heat_map(node_list, nodes):
+def do_update_heat_map(node_list, nodes, origin_nodes=None):
     """
     Create a heat map for the node tree,
     Needs development.
@@ -279,10 +318,12 @@ def do_update_heat_map(node_list, nodes):
         color_data = {node.name: (node.color[:], node.use_custom_color) for node in nodes}
         nodes.id_data.sv_user_colors = str(color_data)
 
-    times = do_update_general(node_list, nodes)
+    times = do_update_general(node_list, nodes, origin_nodes=origin_nodes)
     if not times:
-        return
+        return times
     t_max = max(times)
+    if not t_max:
+        return times
     addon_name = data_structure.SVERCHOK_NAME
     addon = bpy.context.preferences.addons.get(addon_name)
     if addon:
@@ -297,6 +338,7 @@ def do_update_heat_map(node_list, nodes):
         nodes[name].use_custom_color = True
         # linear scale.
         nodes[name].color = cold.lerp(hot, t / t_max)
+    return times
 
 def update_error_nodes(ng, name, err=Exception):
     if ng.bl_idname == "SverchGroupTreeType":
@@ -357,10 +399,169 @@ def reset_error_nodes(ng):
         del ng["error nodes"]
 
 
+def get_node_input_signature(node):
+    """
+    Fingerprints of data in linked inputs of the node.
+    Returns None if the node has no linked inputs or
+    some of input data can't be fingerprinted.
+    """
+    signature = []
+    for socket in node.inputs:
+        if not socket.is_linked:
+            continue
+        other = socket.other
+        if not other:
+            return None
+        fingerprint = SvGetSocketFingerprint(socket)
+        if fingerprint is None:
+            return None
+        signature.append((socket.identifier, other.socket_id, fingerprint))
+    if not signature:
+        return None
+    return tuple(signature)
+
+def is_node_unchanged(node, signature, signatures):
+    """
+    Node can be skipped if its inputs are the same as at last processing
+    and its outputs are still in the socket cache.
+    """
+    if signature is None or signatures.get(node.node_id) != signature:
+        return False
+    return all(SvHasSocketData(s) for s in node.outputs if s.is_linked)
+
+
+def get_inputs_fingerprints(node):
+    """
+    Fingerprints of data in socket cache which is read by linked inputs of the node
+    """
+    fingerprints = {}
+    for socket in node.inputs:
+        if not socket.is_linked:
+            continue
+        try:
+            data = SvGetSocket(socket, deepcopy=False)
+        except LookupError:
+            continue
+        fingerprints[socket.name] = sv_data_fingerprint(data)
+    return fingerprints
+
+def report_input_mutations(node, fingerprints_before):
+    """
+    Warn about input sockets whose data was changed by processing of the node
+    """
+    for name, fingerprint in get_inputs_fingerprints(node).items():
+        before = fingerprints_before.get(name)
+        if before is not None and fingerprint != before:
+            warning("Node %s (%s) mutated data of its input socket %s",
+                    node.name, node.bl_idname, name)
+
+def check_node_signature(node, origin_nodes, signatures):
+    """
+    Returns (skip, signature): whether the node can be skipped as unchanged,
+    and input signature to be stored after the node is processed.
+    """
+    if not hasattr(node, "node_id"):
+        return False, None
+    signature = get_node_input_signature(node)
+    if origin_nodes is not None and node.name not in origin_nodes:
+        if is_node_unchanged(node, signature, signatures):
+            if data_structure.DEBUG_MODE:
+                debug("Skipped unchanged %s", node.name)
+            return True, signature
+    signatures.pop(node.node_id, None)
+    return False, signature
+
+def report_node_exception(ng, node_name, err):
+    update_error_nodes(ng, node_name, err)
+    #traceback.print_tb(err.__traceback__)
+    exception("Node %s had exception: %s", node_name, err)
+
+    if hasattr(ng, "sv_show_error_in_tree"):
+        # not yet supported in monad trees..
+        if ng.sv_show_error_in_tree:
+            error_text = "".join(traceback.format_exception(type(err), err, err.__traceback__))
+            start_exception_drawing_with_bgl(ng, node_name, error_text, err)
+
+
+class NodeProcessing(object):
+    """
+    Processing of one node together with the steps around it:
+    check of input data mutation, on-disk cache of outputs and telemetry.
+    All of it is done in the main thread, except for the kernel of
+    nodes which are processed in a thread pool (see split_process()).
+    """
+    def __init__(self, node, use_telemetry):
+        self.node = node
+        self.use_telemetry = use_telemetry
+        self.fingerprints_before = None
+        self.memory_start = None
+        self.disk_key = None
+        self.finish = None
+        self.kernel = None
+        # socket_ids of outputs set by the node
+        self.set_sockets = set()
+        self.start = time.perf_counter()
+        self.duration = 0.0
+
+    def begin(self, threaded=False):
+        """
+        Load outputs of the node from disk cache or process it.
+        If threaded is True and the node supports it, only prepare
+        the kernel and return True; then run_kernel() has to be called
+        (in any thread), and after it end() in the main thread.
+        """
+        node = self.node
+        if data_structure.CHECK_MUTATION:
+            self.fingerprints_before = get_inputs_fingerprints(node)
+        if self.use_telemetry:
+            self.memory_start = telemetry.node_memory_start()
+        if data_structure.DISK_CACHE_PATH and getattr(node, "disk_cacheable", False):
+            self.disk_key = get_node_cache_key(node)
+
+        self.start = time.perf_counter()
+        if self.disk_key and load_node_outputs(node, self.disk_key):
+            self.disk_key = None
+        elif threaded:
+            self.kernel, self.finish = node.split_process()
+            self.duration = time.perf_counter() - self.start
+            return True
+        elif hasattr(node, "process"):
+            with recording_socket_sets() as set_sockets:
+                node.process()
+            self.set_sockets = set_sockets
+        self.duration = time.perf_counter() - self.start
+        return False
+
+    def run_kernel(self):
+        """Returns result of the kernel and time it took"""
+        start = time.perf_counter()
+        result = self.kernel()
+        return result, time.perf_counter() - start
+
+    def end(self, kernel_result=None, kernel_duration=0.0):
+        """Set outputs of a threaded node, store outputs to disk cache, record telemetry"""
+        node = self.node
+        if self.finish is not None:
+            start = time.perf_counter()
+            with recording_socket_sets() as set_sockets:
+                self.finish(kernel_result)
+            self.set_sockets = set_sockets
+            self.duration += kernel_duration + time.perf_counter() - start
+        if self.disk_key:
+            save_node_outputs(node, self.disk_key, self.set_sockets)
+        if self.use_telemetry:
+            telemetry.record_node(node, self.start, self.duration, self.memory_start)
+        if data_structure.CHECK_MUTATION:
+            report_input_mutations(node, self.fingerprints_before)
+
+
 @profile(section="UPDATE")
-def do_update_general(node_list, nodes, procesed_nodes=set()):
+def do_update_general(node_list, nodes, procesed_nodes=set(), origin_nodes=None):
     """
     General update function for node set
+    If origin_nodes (names of nodes which drive the update) are given and
+    skipping of unchanged nodes is enabled, other nodes whose inputs did not
+    change since their last processing are not processed again.
     """
     global graphs
     timings = []
@@ -373,16 +574,34 @@ def do_update_general(node_list, nodes, procesed_nodes=set()):
     # this is a no-op if no bgl being drawn.
     clear_exception_drawing_with_bgl(nodes)
 
+    skip_unchanged = data_structure.SKIP_UNCHANGED
+    if skip_unchanged:
+        signatures = node_input_signatures.setdefault(nodes.id_data.tree_id, {})
+
+    use_telemetry = data_structure.TELEMETRY
+    if use_telemetry:
+        telemetry.begin_update()
+
     for node_name in node_list:
         if node_name in done_nodes:
             continue
         try:
             node = nodes[node_name]
-            start = time.perf_counter()
-            if hasattr(node, "process"):
-                node.process()
+            signature = None
+            if skip_unchanged:
+                skip, signature = check_node_signature(node, origin_nodes, signatures)
+                if skip:
+                    timings.append(0.0)
+                    continue
+
+            processing = NodeProcessing(node, use_telemetry)
+            processing.begin()
+            processing.end()
+            start, delta = processing.start, processing.duration
+
+            if signature is not None:
+                signatures[node.node_id] = signature
 
-            delta = time.perf_counter() - start
             total_time += delta
 
             if data_structure.DEBUG_MODE:
@@ -392,17 +611,7 @@ def do_update_general(node_list, nodes, procesed_nodes=set()):
             gather({"name" : node_name, "bl_idname": node.bl_idname, "start": start, "duration": delta})
 
         except Exception as err:
-            ng = nodes.id_data
-            update_error_nodes(ng, node_name, err)
-            #traceback.print_tb(err.__traceback__)
-            exception("Node %s had exception: %s", node_name, err)
-            
-            if hasattr(ng, "sv_show_error_in_tree"):
-                # not yet supported in monad trees..
-                if ng.sv_show_error_in_tree:
-                    error_text = traceback.format_exc()
-                    start_exception_drawing_with_bgl(ng, node_name, error_text, err)
-            
+            report_node_exception(nodes.id_data, node_name, err)
             return None
 
     graphs.append(graph)
@@ -412,11 +621,207 @@ def do_update_general(node_list, nodes, procesed_nodes=set()):
     return timings
 
 
-def do_update(node_list, nodes):
+def make_update_waves(node_lists, deps):
+    """
+    Split topologically sorted update lists into waves;
+    nodes of one wave do not depend on each other, so
+    they can be processed in any order or at the same time.
+    Waves of independent node sets are merged together.
+    """
+    levels = {}
+    waves = []
+    for node_list in node_lists:
+        for name in node_list:
+            level = 1 + max((levels[dep] for dep in deps[name] if dep in levels), default=-1)
+            levels[name] = level
+            if level == len(waves):
+                waves.append([])
+            waves[level].append(name)
+    return waves
+
+
+_update_executor = None
+
+def get_update_executor():
+    global _update_executor
+    if _update_executor is None:
+        _update_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="sverchok")
+    return _update_executor
+
+
+@profile(section="UPDATE")
+def do_update_parallel(node_lists, nodes, origin_nodes=None):
+    """
+    Update function which processes node sets wave by wave.
+    For nodes of a wave which declare that they release the GIL
+    (releases_gil = True), inputs are read in the main thread, their
+    kernels are run in a thread pool, and then outputs are set in the
+    main thread. Other nodes are processed in the main thread first.
+    """
+    global graphs
+    graph = []
+    ng = nodes.id_data
+
+    clear_exception_drawing_with_bgl(nodes)
+
+    skip_unchanged = data_structure.SKIP_UNCHANGED
+    if skip_unchanged:
+        signatures = node_input_signatures.setdefault(ng.tree_id, {})
+
+    use_telemetry = data_structure.TELEMETRY
+    if use_telemetry:
+        telemetry.begin_update()
+    # peak memory can not be attributed to nodes running at the same time
+    use_threads = not (use_telemetry and telemetry.tracks_memory())
+
+    def node_done(processing, signature):
+        node = processing.node
+        if signature is not None:
+            signatures[node.node_id] = signature
+        graph.append({"name" : node.name, "bl_idname": node.bl_idname,
+                      "start": processing.start, "duration": processing.duration})
+
+    executor = get_update_executor()
+    for wave in make_update_waves(node_lists, get_dep_dict(ng)):
+        pending = []
+        for node_name in wave:
+            try:
+                node = nodes[node_name]
+                signature = None
+                if skip_unchanged:
+                    skip, signature = check_node_signature(node, origin_nodes, signatures)
+                    if skip:
+                        continue
+                processing = NodeProcessing(node, use_telemetry)
+                threaded = use_threads and getattr(node, "releases_gil", False)
+                if processing.begin(threaded=threaded):
+                    pending.append((processing, signature))
+                    continue
+                processing.end()
+            except Exception as err:
+                report_node_exception(ng, node_name, err)
+                return None
+            node_done(processing, signature)
+
+        if not pending:
+            continue
+        futures = [executor.submit(processing.run_kernel) for processing, _ in pending]
+        wait(futures)
+        for (processing, signature), future in zip(pending, futures):
+            try:
+                result, duration = future.result()
+                processing.end(result, duration)
+            except Exception as err:
+                report_node_exception(ng, processing.node.name, err)
+                return None
+            node_done(processing, signature)
+
+    graphs.append(graph)
+    return graph
+
+
+def do_update(node_list, nodes, origin_nodes=None):
+    """
+    Process nodes of the list; returns None if the update
+    was aborted because of an error in a node.
+    """
     if data_structure.HEAT_MAP:
-        do_update_heat_map(node_list, nodes)
+        return do_update_heat_map(node_list, nodes, origin_nodes)
+    elif data_structure.PARALLEL_UPDATE:
+        return do_update_parallel([node_list], nodes, origin_nodes=origin_nodes)
     else:
-        do_update_general(node_list, nodes)
+        return do_update_general(node_list, nodes, origin_nodes=origin_nodes)
+
+def get_evictable_sockets(ng, processed_nodes):
+    """
+    Output sockets whose data is not needed any more after an update pass,
+    {socket_id: node name}: all nodes reading them were processed in the
+    pass without errors, and none of them is a viewer or another output
+    node (a node without linked outputs), which may read its inputs again
+    outside of the update, e.g. when the UI is redrawn.
+    """
+    failed = set()
+    if "error nodes" in ng:
+        failed = set(ast.literal_eval(ng["error nodes"]).keys())
+
+    evictable = {}
+    kept = set()
+    for link in ng.links:
+        from_socket = link.from_socket
+        if not hasattr(from_socket, "socket_id"):
+            continue
+        s_id = from_socket.socket_id
+        if s_id in kept:
+            continue
+        to_node = link.to_node
+        if (to_node.name not in processed_nodes or to_node.name in failed
+                or to_node.bl_idname == 'NodeReroute'
+                or not any(socket.is_linked for socket in to_node.outputs)):
+            kept.add(s_id)
+            evictable.pop(s_id, None)
+        else:
+            evictable[s_id] = link.from_node.name
+    return evictable
+
+def enforce_socket_cache_budget(ng, processed_nodes):
+    """
+    Evict output data of nodes from socket cache, biggest first,
+    until the memory used by the tree fits into the budget.
+    This is called after an update pass with names of nodes processed
+    in it; only data which was already read by all its consumers can be
+    evicted (see get_evictable_sockets). Evicted nodes are processed again
+    when their data is needed by a later partial update.
+    """
+    budget = data_structure.SOCKET_CACHE_BUDGET * 1024 * 1024
+    if not budget:
+        return
+    tree_id = ng.tree_id
+    sizes = get_socket_cache_sizes(tree_id)
+    total = sum(sizes.values())
+    if total <= budget:
+        return
+
+    evictable = get_evictable_sockets(ng, set(processed_nodes))
+    candidates = [(sizes[s_id], s_id, node_name)
+                    for s_id, node_name in evictable.items() if s_id in sizes]
+    candidates.sort(reverse=True)
+
+    evicted = evicted_nodes.setdefault(tree_id, set())
+    for size, s_id, node_name in candidates:
+        if total <= budget:
+            break
+        total -= evict_socket_data(tree_id, s_id)
+        evicted.add(node_name)
+    if data_structure.DEBUG_MODE:
+        debug("Socket cache of %s: %.1f MB after eviction", ng.name, total / (1024 * 1024))
+
+def add_evicted_dependencies(ng, update_list):
+    """
+    Extend the update list with upstream nodes whose output data,
+    needed by nodes of the list, was evicted from socket cache.
+    """
+    evicted = evicted_nodes.get(ng.tree_id)
+    if not evicted:
+        return update_list
+    nodes = ng.nodes
+    for name in list(evicted):
+        node = nodes.get(name)
+        if node is None or all(SvHasSocketData(s) for s in node.outputs if s.is_linked):
+            evicted.discard(name)
+
+    node_set = set(update_list)
+    deps = get_dep_dict(ng)
+    needed = set()
+    stack = list(update_list)
+    while stack:
+        name = stack.pop()
+        for dep in deps[name]:
+            if dep in evicted and dep not in node_set and dep not in needed:
+                needed.add(dep)
+                stack.append(dep)
+    if not needed:
+        return update_list
+    return make_update_list(ng, node_set | needed, deps)
 
 def build_update_list(ng=None):
     """
@@ -432,8 +837,9 @@ def build_update_list(ng=None):
         for ng in sverchok_trees():
             build_update_list(ng)
     else:
+        dep_dict_cache.pop(ng.name, None)
         node_sets = separate_nodes(ng)
-        deps = make_dep_dict(ng)
+        deps = get_dep_dict(ng)
         out = [make_update_list(ng, s, deps) for s in node_sets]
         update_cache[ng.name] = out
         partial_update_cache[ng.name] = {}
@@ -455,7 +861,9 @@ def process_to_node(node):
         return
 
     update_list = make_tree_from_nodes([node.name], ng, down=False)
-    do_update(update_list, ng.nodes)
+    update_list = add_evicted_dependencies(ng, update_list)
+    if do_update(update_list, ng.nodes) is not None:
+        enforce_socket_cache_budget(ng, update_list)
 
 
 def process_from_nodes(nodes):
@@ -471,9 +879,16 @@ def process_from_nodes(nodes):
             print("Something not very important happend in Blender memory", node, type(node))
 
     ng = nodes[0].id_data
-    update_list = make_tree_from_nodes(node_names, ng)
+    p_u_c = partial_update_cache.setdefault(ng.name, {})
+    key = tuple(sorted(node_names))
+    update_list = p_u_c.get(key)
+    if not update_list:
+        update_list = make_tree_from_nodes(node_names, ng)
+        p_u_c[key] = update_list
     reset_error_some_nodes(ng, update_list)
-    do_update(update_list, ng.nodes)
+    update_list = add_evicted_dependencies(ng, update_list)
+    if do_update(update_list, ng.nodes, origin_nodes=set(node_names)) is not None:
+        enforce_socket_cache_budget(ng, update_list)
 
 
 def process_from_node(node):
@@ -501,7 +916,9 @@ def process_from_node(node):
         nodes = ng.nodes
         if not ng.sv_process:
             return
-        do_update(update_list, nodes)
+        update_list = add_evicted_dependencies(ng, update_list)
+        if do_update(update_list, nodes, origin_nodes={node.name}) is not None:
+            enforce_socket_cache_budget(ng, update_list)
     else:
         process_tree(ng)
 
@@ -528,8 +945,18 @@ def process_tree(ng=None):
         if not update_list:
             build_update_list(ng)
             update_list = update_cache.get(ng.name)
-        for l in update_list:
-            do_update(l, ng.nodes)
+        evicted_nodes.pop(ng.tree_id, None)
+        if data_structure.PARALLEL_UPDATE and not data_structure.HEAT_MAP:
+            # independent node sets are processed together
+            if do_update_parallel(update_list, ng.nodes) is None:
+                processed_lists = []
+            else:
+                processed_lists = update_list
+        else:
+            # lists whose update was aborted by an error are not counted:
+            # nodes after the failed one have not read their inputs
+            processed_lists = [l for l in update_list if do_update(l, ng.nodes) is not None]
+        enforce_socket_cache_budget(ng, [name for l in processed_lists for name in l])
     else:
         pass
 
@@ -37,6 +37,16 @@ from sverchok.core.events import CurrentEvents, BlenderEventsTypes
 
 DEBUG_MODE = False
 HEAT_MAP = False
+SKIP_UNCHANGED = False
+PARALLEL_UPDATE = False
+CHECK_MUTATION = False
+# memory budget for socket cache of one tree, in megabytes, 0 = unlimited
+SOCKET_CACHE_BUDGET = 0
+# directory of persistent node outputs cache, empty = disabled
+DISK_CACHE_PATH = ""
+# maximum size of files in the disk cache, in megabytes, 0 = unlimited
+DISK_CACHE_SIZE = 1024
+TELEMETRY = False
 RELOAD_EVENT = False
 
 # this is set correctly later.
@@ -817,6 +827,13 @@ def setup_init():
     """
     global DEBUG_MODE
     global HEAT_MAP
+    global SKIP_UNCHANGED
+    global PARALLEL_UPDATE
+    global CHECK_MUTATION
+    global SOCKET_CACHE_BUDGET
+    global DISK_CACHE_PATH
+    global DISK_CACHE_SIZE
+    global TELEMETRY
     global SVERCHOK_NAME
     import sverchok
     SVERCHOK_NAME = sverchok.__name__
@@ -824,6 +841,17 @@ def setup_init():
     if addon:
         DEBUG_MODE = addon.preferences.show_debug
         HEAT_MAP = addon.preferences.heat_map
+        SKIP_UNCHANGED = addon.preferences.skip_unchanged_nodes
+        PARALLEL_UPDATE = addon.preferences.parallel_update
+        CHECK_MUTATION = addon.preferences.check_input_mutation
+        SOCKET_CACHE_BUDGET = addon.preferences.socket_cache_budget
+        if addon.preferences.use_disk_cache:
+            DISK_CACHE_PATH = addon.preferences.disk_cache_path
+        DISK_CACHE_SIZE = addon.preferences.disk_cache_size
+        TELEMETRY = addon.preferences.telemetry
+        from sverchok.utils import telemetry
+        telemetry.set_buffer_size(addon.preferences.telemetry_buffer_size)
+        telemetry.set_memory_tracking(TELEMETRY and addon.preferences.telemetry_memory)
     else:
         print("Setup of preferences failed")
 
@@ -421,6 +421,38 @@ class SverchCustomTreeNode:
     # E.g., draft_properties_mapping = dict(count = 'count_draft').
     draft_properties_mapping = dict()
 
+    # Nodes which spend most of processing time in numpy (or other code
+    # which releases the GIL) can set this to True and implement
+    # split_process(). When parallel update is enabled in preferences,
+    # only the kernel returned by split_process() is run in a thread
+    # pool; sockets, properties and any other Blender data are accessed
+    # from the main thread only.
+    releases_gil = False
+
+    # Nodes which never modify data they get from input sockets
+    # can set this to False. Then sv_get() does not make a deep
+    # copy of the data for them, and numpy arrays are passed as
+    # read-only views. Use "Check input mutation" debug setting
+    # to find nodes which mutate their inputs.
+    mutates_inputs = True
+
+    # Names of input / output sockets (Vertices and Strings) working
+    # in "array mode". Inputs listed in array_inputs get objects as
+    # numpy arrays (vertices as arrays of shape (n, 3)), lists coming
+    # from other nodes are converted. Outputs listed in array_outputs
+    # may be set with numpy arrays; they are converted to lists when
+    # read by inputs of other nodes which are not in array mode.
+    # Where conversions happen in a tree can be seen with
+    # core.socket_data.get_array_mode_report().
+    array_inputs = frozenset()
+    array_outputs = frozenset()
+
+    # Nodes with expensive processing and deterministic outputs
+    # (which depend only on node properties and input data) can set
+    # this to True to have their outputs stored in the disk cache,
+    # when it is enabled in preferences.
+    disk_cacheable = False
+
     n_id : StringProperty(default="")
     
     def update(self):
@@ -442,6 +474,20 @@ class SverchCustomTreeNode:
     def poll(cls, ntree):
         return ntree.bl_idname in ['SverchCustomTreeType', 'SverchGroupTreeType']
 
+    def split_process(self):
+        """
+        For nodes with releases_gil = True. Called in the main thread
+        instead of process(): read input sockets and properties, and
+        return a pair (kernel, finish). kernel() is called without
+        arguments in a worker thread; it must only work with the data
+        it was given, not with sockets, properties or other Blender data.
+        finish(result) is called in the main thread with the value
+        returned by kernel(), and sets output sockets.
+        Such nodes usually implement process() as
+        kernel, finish = self.split_process(); finish(kernel()).
+        """
+        raise Exception("not implemented")
+
     @property
     def node_id(self):
         if not self.n_id:
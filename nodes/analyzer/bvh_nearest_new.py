@@ -20,7 +20,7 @@ import bpy
 from bpy.props import EnumProperty
 from sverchok.node_tree import SverchCustomTreeNode
 from sverchok.data_structure import (updateNode, match_long_cycle as C)
-from mathutils.bvhtree import BVHTree
+from sverchok.utils.sv_bvh_utils import get_bvh, bvh_find_nearest
 
 
 class SvBVHnearNewNode(bpy.types.Node, SverchCustomTreeNode):
@@ -54,7 +54,7 @@ class SvBVHnearNewNode(bpy.types.Node, SverchCustomTreeNode):
     @staticmethod
     def svmesh_to_bvh_lists(vsock, fsock):
         for vertices, polygons in zip(*C([vsock.sv_get(), fsock.sv_get()])):
-            yield BVHTree.FromPolygons(vertices, polygons, all_triangles=False, epsilon=0.0)
+            yield get_bvh(vertices, polygons, all_triangles=False, epsilon=0.0)
 
     def process(self):
         vert_sock, face_sock, point_sock = self.inputs
@@ -63,7 +63,8 @@ class SvBVHnearNewNode(bpy.types.Node, SverchCustomTreeNode):
         PT = point_sock.sv_get()
         if self.mode == 'find_nearest':
             for bvh, pt in zip(self.svmesh_to_bvh_lists(vert_sock, face_sock), PT):
-                RL.append([bvh.find_nearest(P) for P in pt])
+                location, normal, index, distance, _ = bvh_find_nearest(bvh, pt)
+                RL.append(list(zip(location.tolist(), normal.tolist(), index.tolist(), distance.tolist())))
         else:  # find_nearest_range
             for bvh, pt in zip(self.svmesh_to_bvh_lists(vert_sock, face_sock), PT):
                 RL.extend([bvh.find_nearest_range(P) for P in pt])
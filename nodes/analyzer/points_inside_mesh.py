@@ -18,6 +18,7 @@
 
 
 from itertools import cycle
+import numpy as np
 import bpy
 from bpy.props import (IntProperty, FloatProperty, BoolProperty, EnumProperty, FloatVectorProperty)
 import bmesh
@@ -29,6 +30,7 @@ from mathutils.noise import seed_set, random_unit_vector
 from sverchok.node_tree import SverchCustomTreeNode, throttled
 from sverchok.data_structure import updateNode, list_match_func, list_match_modes
 from sverchok.utils.sv_bmesh_utils import bmesh_from_pydata
+from sverchok.utils.sv_bvh_utils import get_bvh, bvh_find_nearest, bvh_ray_cast
 
 
 def generate_random_unitvectors():
@@ -43,100 +45,55 @@ directions = generate_random_unitvectors()
 def get_points_in_mesh(verts, faces, points, eps=0.0, num_samples=3):
     mask_inside = []
 
-    bvh = BVHTree.FromPolygons(verts, faces, all_triangles=False, epsilon=eps)
+    bvh = get_bvh(verts, faces, all_triangles=False, epsilon=eps)
 
     for direction in directions[:num_samples]:
-        samples = []
-        mask = samples.append
-
-        for point in points:
-            hit = bvh.ray_cast(point, direction)
-            if hit[0]:
-                v = hit[1].dot(direction)
-                mask(not v < 0.0)
-            else:
-                mask(False)
-
+        _, normals, _, _, success = bvh_ray_cast(bvh, points, direction)
+        samples = np.zeros(len(success), dtype=bool)
+        samples[success] = normals[success] @ np.array(direction) >= 0.0
         mask_inside.append(samples)
 
     if len(mask_inside) == 1:
-        return mask_inside[0]
+        return mask_inside[0].tolist()
     else:
-        mask_totals = []
-        oversample = mask_totals.append
-        num_points = len(points)
-
         # exactly what the criteria should be here is not clear, this seems enough.
-        for i in range(num_points):
-            fsum = sum(mask_inside[j][i] for j in range(num_samples))
-
-            if num_samples == 2:
-                oversample(fsum >= 1)
-            elif num_samples == 3:
-                oversample(fsum >= 2)
-            elif num_samples == 4:
-                oversample(fsum >= 3)
-            elif num_samples == 5:
-                oversample(fsum >= 4)
-            elif num_samples == 6:
-                oversample(fsum >= 4)
-        return mask_totals
+        min_hits = {2: 1, 3: 2, 4: 3, 5: 4, 6: 4}[num_samples]
+        fsum = np.sum(mask_inside, axis=0)
+        return (fsum >= min_hits).tolist()
 
 
 def are_inside(verts, faces, points, eps):
     bm = bmesh_from_pydata(verts, [], faces, normal_update=True)
-    mask_inside = []
-    mask = mask_inside.append
     bvh = BVHTree.FromBMesh(bm, epsilon=eps)
+    bm.free()
 
     # return points on polygons
-    for point in points:
-        fco, normal, _, _ = bvh.find_nearest(point)
-        p2 = fco - Vector(point)
-        v = p2.dot(normal)
-        mask(not v < 0.0)  # addp(v >= 0.0) ?
-
-    return mask_inside
+    fco, normals, _, _, _ = bvh_find_nearest(bvh, points)
+    v = np.sum((fco - np.array(points)) * normals, axis=1)
+    return np.invert(v < 0.0).tolist()  # addp(v >= 0.0) ?
 
 
 def get_points_in_mesh_2D(verts, faces, points, normal, eps=0.0):
-    mask_totals = []
-    bvh = BVHTree.FromPolygons(verts, faces, all_triangles=False, epsilon=eps)
-
-    for point in points:
-        inside = False
-        for direction in normal:
-            hit = bvh.ray_cast(point, Vector(direction))
-            if hit[0]:
-                inside = True
-                break
-            else:
-                hit = bvh.ray_cast(point, -Vector(direction))
-                if hit[0]:
-                    inside = True
-                    break
-        mask_totals.append(inside)
-    return mask_totals
+    bvh = get_bvh(verts, faces, all_triangles=False, epsilon=eps)
+
+    inside = np.zeros(len(points), dtype=bool)
+    for direction in normal:
+        direction = np.array(direction)
+        inside |= bvh_ray_cast(bvh, points, direction)[4]
+        inside |= bvh_ray_cast(bvh, points, -direction)[4]
+    return inside.tolist()
 
 def get_points_in_mesh_2D_clip(verts, faces, points, normal, clip_distance, eps=0.0, matchig_method='REPEAT'):
-    mask_totals = []
-    bvh = BVHTree.FromPolygons(verts, faces, all_triangles=False, epsilon=eps)
+    bvh = get_bvh(verts, faces, all_triangles=False, epsilon=eps)
 
     normal, clip_distance = list_match_func[matchig_method]([normal, clip_distance])
-    for point in points:
-        inside = False
-        for direction, dist in zip(normal, clip_distance):
-            hit = bvh.ray_cast(point, Vector(direction))
-            if hit[0] and hit[3] < dist:
-                inside = True
-                break
-            else:
-                hit = bvh.ray_cast(point, -Vector(direction))
-                if hit[0] and hit[3] < dist:
-                    inside = True
-                    break
-        mask_totals.append(inside)
-    return mask_totals
+    inside = np.zeros(len(points), dtype=bool)
+    for direction, dist in zip(normal, clip_distance):
+        direction = np.array(direction)
+        for ray_direction in (direction, -direction):
+            _, _, _, distances, success = bvh_ray_cast(bvh, points, ray_direction)
+            inside[success] |= distances[success] < dist
+    return inside.tolist()
 
 class SvPointInside(bpy.types.Node, SverchCustomTreeNode):
     """
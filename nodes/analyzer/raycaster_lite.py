@@ -19,7 +19,7 @@
 import bpy
 from sverchok.node_tree import SverchCustomTreeNode
 from sverchok.data_structure import (updateNode, match_long_cycle as C)
-from mathutils.bvhtree import BVHTree
+from sverchok.utils.sv_bvh_utils import get_bvh, bvh_ray_cast
 
 # zeffii 2017 8 okt
 # airlifted from Kosvor's Raycast nodes..
@@ -52,7 +52,7 @@ class SvRaycasterLiteNode(bpy.types.Node, SverchCustomTreeNode):
     @staticmethod
     def svmesh_to_bvh_lists(v, f):
         for vertices, polygons in zip(*C([v, f])):
-            yield BVHTree.FromPolygons(vertices, polygons, all_triangles=False, epsilon=0.0)
+            yield get_bvh(vertices, polygons, all_triangles=False, epsilon=0.0)
 
     def process(self):
         L, N, I, D, S = self.outputs
@@ -62,18 +62,23 @@ class SvRaycasterLiteNode(bpy.types.Node, SverchCustomTreeNode):
 
         for bvh, st, di in zip(*[self.svmesh_to_bvh_lists(vert_in, face_in), start_in, direction_in]):
             st, di = C([st, di])
-            RL.append([bvh.ray_cast(i, i2) for i, i2 in zip(st, di)])
+            location, normal, index, distance, success = bvh_ray_cast(bvh, st, di)
+            missed = ~success
+            location[missed] = 0
+            normal[missed] = 0
+            distance[missed] = 0
+            RL.append((location, normal, index, distance, success))
 
         if L.is_linked:
-            L.sv_set([[r[0][:] if r[0] else (0, 0, 0) for r in L] for L in RL])
+            L.sv_set([r[0].tolist() for r in RL])
         if N.is_linked:
-            N.sv_set([[r[1][:] if r[1] else (0, 0, 0) for r in L] for L in RL])
+            N.sv_set([r[1].tolist() for r in RL])
         if I.is_linked:
-            I.sv_set([[r[2] if r[2] else -1 for r in L] for L in RL])
+            I.sv_set([r[2].tolist() for r in RL])
         if D.is_linked:
-            D.sv_set([[r[3] if r[3] else 0 for r in L] for L in RL])
+            D.sv_set([r[3].tolist() for r in RL])
         if S.is_linked:
-            S.sv_set([[r[2] != None for r in L] for L in RL])
+            S.sv_set([r[4].tolist() for r in RL])
 
 
 def register():
@@ -7,8 +7,7 @@ from bpy.props import FloatProperty, EnumProperty, BoolProperty, IntProperty, St
 
 from sverchok.node_tree import SverchCustomTreeNode, throttled
 from sverchok.data_structure import updateNode, zip_long_repeat, fullList, match_long_repeat, ensure_nesting_level
-from sverchok.utils.modules.eval_formula import get_variables, sv_compile, safe_eval_compiled
-from sverchok.utils.script_importhelper import safe_names_np
+from sverchok.utils.modules.eval_formula import get_variables, sv_compile, safe_eval_compiled, safe_eval_compiled_np
 from sverchok.utils.logging import info, exception
 from sverchok.utils.math import (
         from_cylindrical, from_spherical,
@@ -125,16 +124,9 @@ class SvCurveFormulaNode(bpy.types.Node, SverchCustomTreeNode):
 
         def function(t):
             variables.update(dict(t=t))
-            v1 = safe_eval_compiled(compiled1, variables, allowed_names = safe_names_np)
-            v2 = safe_eval_compiled(compiled2, variables, allowed_names = safe_names_np)
-            v3 = safe_eval_compiled(compiled3, variables, allowed_names = safe_names_np)
-
-            if not isinstance(v1, np.ndarray):
-                v1 = np.full_like(t, v1)
-            if not isinstance(v2, np.ndarray):
-                v2 = np.full_like(t, v2)
-            if not isinstance(v3, np.ndarray):
-                v3 = np.full_like(t, v3)
+            v1 = safe_eval_compiled_np(compiled1, variables, t)
+            v2 = safe_eval_compiled_np(compiled2, variables, t)
+            v3 = safe_eval_compiled_np(compiled3, variables, t)
 
             r = np.array(out_coordinates(v1, v2, v3)).T
             return r
@@ -1,6 +1,6 @@
 import numpy as np
 
-from mathutils import Matrix, Vector
+from mathutils import Matrix
 import bpy
 from bpy.props import FloatProperty, EnumProperty, BoolProperty, IntProperty
 
@@ -52,12 +52,11 @@ class SvCurveFrameNode(bpy.types.Node, SverchCustomTreeNode):
                 ts = np.array(ts)
 
                 verts = curve.evaluate_array(ts)
-                matrices_np, normals, binormals = curve.frame_array(ts)
-                new_matrices = []
-                for matrix_np, point in zip(matrices_np, verts):
-                    matrix = Matrix(matrix_np.tolist()).to_4x4()
-                    matrix.translation = Vector(point)
-                    new_matrices.append(matrix)
+                matrices_np = np.zeros((len(ts), 4, 4))
+                _, normals, binormals = curve.frame_array(ts, out=matrices_np[:,:3,:3])
+                matrices_np[:,:3,3] = verts
+                matrices_np[:,3,3] = 1.0
+                new_matrices = [Matrix(matrix) for matrix in matrices_np.tolist()]
 
                 if self.join:
                     matrix_out.extend(new_matrices)
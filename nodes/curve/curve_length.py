@@ -77,12 +77,17 @@ class SvCurveLengthNode(bpy.types.Node, SverchCustomTreeNode):
                     t_min = t_min * curve_t_range + curve_t_min
                     t_max = t_max * curve_t_range + curve_t_min
 
+                curve_t_min, curve_t_max = curve.get_u_bounds()
                 if t_min >= t_max:
                     length = 0.0
+                elif t_min == curve_t_min and t_max == curve_t_max and resolution >= 2:
+                    # length of the whole curve: the same samples as calc_length()
+                    # would take, but the arc-length table is shared with other nodes.
+                    solver = curve.get_length_solver('LIN', resolution)
+                    length = solver.get_total_length()
                 else:
                     # "resolution" is for whole range of curve;
                     # take only part of it which corresponds to t_min...t_max segment.
-                    curve_t_min, curve_t_max = curve.get_u_bounds()
                     resolution = int(resolution * (t_max - t_min) / (curve_t_max - curve_t_min))
                     if resolution < 1:
                         resolution = 1
@@ -16,6 +16,7 @@ class SvEvalCurveNode(bpy.types.Node, SverchCustomTreeNode):
         bl_idname = 'SvExEvalCurveNode'
         bl_label = 'Evaluate Curve'
         bl_icon = 'CURVE_NCURVE'
+        mutates_inputs = False
 
         modes = [
             ('AUTO', "Automatic", "Evaluate the curve at evenly spaced points", 0),
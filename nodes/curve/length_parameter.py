@@ -6,7 +6,6 @@ from bpy.props import FloatProperty, EnumProperty, BoolProperty, IntProperty
 
 from sverchok.node_tree import SverchCustomTreeNode, throttled
 from sverchok.data_structure import updateNode, zip_long_repeat, ensure_nesting_level
-from sverchok.utils.curve import SvCurveLengthSolver
 
 class SvCurveLengthParameterNode(bpy.types.Node, SverchCustomTreeNode):
     """
@@ -41,6 +40,14 @@ class SvCurveLengthParameterNode(bpy.types.Node, SverchCustomTreeNode):
 
     mode: EnumProperty(name='Interpolation mode', default="SPL", items=modes, update=updateNode)
 
+    tolerance : FloatProperty(
+        name = "Tolerance",
+        description = "If not zero, segments of the length table are subdivided until length of each of them is calculated with this tolerance; not used in draft mode",
+        min = 0.0,
+        default = 0.0,
+        precision = 6,
+        update = updateNode)
+
     @throttled
     def update_sockets(self, context):
         self.inputs['Length'].hide_safe = self.eval_mode != 'MANUAL'
@@ -80,6 +87,7 @@ class SvCurveLengthParameterNode(bpy.types.Node, SverchCustomTreeNode):
     def draw_buttons_ext(self, context, layout):
         self.draw_buttons(context, layout)
         layout.prop(self, 'mode', expand=True)
+        layout.prop(self, 'tolerance')
 
     def does_support_draft_mode(self):
         return True
@@ -115,10 +123,11 @@ class SvCurveLengthParameterNode(bpy.types.Node, SverchCustomTreeNode):
                 resolution = resolution[0]
 
             mode = self.mode
+            tolerance = self.tolerance or None
             if self.id_data.sv_draft:
                 mode = 'LIN'
-            solver = SvCurveLengthSolver(curve)
-            solver.prepare(mode, resolution)
+                tolerance = None
+            solver = curve.get_length_solver(mode, resolution, tolerance)
 
             if self.eval_mode == 'AUTO':
                 total_length = solver.get_total_length()
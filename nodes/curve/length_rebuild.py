@@ -28,6 +28,14 @@ class SvLengthRebuildCurveNode(bpy.types.Node, SverchCustomTreeNode):
 
     mode: EnumProperty(name='Interpolation mode', default="SPL", items=modes, update=updateNode)
 
+    tolerance : FloatProperty(
+        name = "Tolerance",
+        description = "If not zero, segments of the length table are subdivided until length of each of them is calculated with this tolerance; not used in draft mode",
+        min = 0.0,
+        default = 0.0,
+        precision = 6,
+        update = updateNode)
+
     def sv_init(self, context):
         self.inputs.new('SvCurveSocket', "Curve")
         self.inputs.new('SvStringsSocket', "Resolution").prop_name = 'resolution'
@@ -35,6 +43,7 @@ class SvLengthRebuildCurveNode(bpy.types.Node, SverchCustomTreeNode):
 
     def draw_buttons_ext(self, context, layout):
         layout.prop(self, 'mode', expand=True)
+        layout.prop(self, 'tolerance')
 
     def does_support_draft_mode(self):
         return True
@@ -60,9 +69,11 @@ class SvLengthRebuildCurveNode(bpy.types.Node, SverchCustomTreeNode):
         for curves, resolutions in zip_long_repeat(curves_s, resolution_s):
             for curve, resolution in zip_long_repeat(curves, resolutions):
                 mode = self.mode
+                tolerance = self.tolerance or None
                 if self.id_data.sv_draft:
                     mode = 'LIN'
-                new_curve = SvLengthRebuiltCurve(curve, resolution, mode=mode)
+                    tolerance = None
+                new_curve = SvLengthRebuiltCurve(curve, resolution, mode=mode, tolerance=tolerance)
                 curves_out.append(new_curve)
 
         self.outputs['Curve'].sv_set(curves_out)
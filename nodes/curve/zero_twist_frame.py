@@ -1,6 +1,6 @@
 import numpy as np
 
-from mathutils import Matrix, Vector
+from mathutils import Matrix
 import bpy
 from bpy.props import FloatProperty, EnumProperty, BoolProperty, IntProperty
 
@@ -60,19 +60,24 @@ class SvCurveZeroTwistFrameNode(bpy.types.Node, SverchCustomTreeNode):
                 ts = np.array(ts)
 
                 vectors = curve.evaluate_array(ts)
-                matrices_np, normals, binormals = curve.frame_array(ts)
+                frenet, _, _ = curve.frame_array(ts)
 
                 curve.pre_calc_torsion_integral(resolution)
                 integral = curve.torsion_integral(ts)
 
-                new_matrices = []
-                for matrix_np, point, angle in zip(matrices_np, vectors, integral):
-                    frenet_matrix = Matrix(matrix_np.tolist()).to_4x4()
-                    rotation_matrix = Matrix.Rotation(-angle, 4, 'Z')
-                    #print("Z:", rotation_matrix)
-                    matrix = frenet_matrix @ rotation_matrix
-                    matrix.translation = Vector(point)
-                    new_matrices.append(matrix)
+                # rotation by -angle around Z axis
+                n = len(ts)
+                rotations = np.zeros((n, 3, 3))
+                rotations[:,0,0] = rotations[:,1,1] = np.cos(integral)
+                rotations[:,0,1] = np.sin(integral)
+                rotations[:,1,0] = - rotations[:,0,1]
+                rotations[:,2,2] = 1.0
+
+                matrices_np = np.zeros((n, 4, 4))
+                np.matmul(frenet, rotations, out=matrices_np[:,:3,:3])
+                matrices_np[:,:3,3] = vectors
+                matrices_np[:,3,3] = 1.0
+                new_matrices = [Matrix(matrix) for matrix in matrices_np.tolist()]
 
                 torsion_out.append(integral.tolist())
                 if self.join:
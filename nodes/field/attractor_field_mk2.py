@@ -3,8 +3,6 @@ import numpy as np
 
 import bpy
 from bpy.props import FloatProperty, EnumProperty, BoolProperty, IntProperty, StringProperty
-from mathutils import kdtree
-from mathutils import bvhtree
 
 from sverchok.node_tree import SverchCustomTreeNode, throttled
 from sverchok.data_structure import updateNode, zip_long_repeat
@@ -23,6 +21,8 @@ from sverchok.utils.field.vector import (SvVectorFieldPointDistance,
             SvBvhAttractorVectorField,
             SvSelectVectorField)
 from sverchok.utils.math import all_falloff_types, falloff_array
+from sverchok.utils.sv_KDT_utils import SvKdTree
+from sverchok.utils.sv_bvh_utils import get_bvh
 
 class SvAttractorFieldNodeMk2(bpy.types.Node, SverchCustomTreeNode):
     """
@@ -132,10 +132,7 @@ class SvAttractorFieldNodeMk2(bpy.types.Node, SverchCustomTreeNode):
             vfields = [SvVectorFieldPointDistance(center, falloff=falloff) for center in centers]
             vfield = SvAverageVectorField(vfields)
         elif self.merge_mode == 'MIN':
-            kdt = kdtree.KDTree(len(centers))
-            for i, v in enumerate(centers):
-                kdt.insert(v, i)
-            kdt.balance()
+            kdt = SvKdTree(centers)
             vfield = SvKdtVectorField(kdt=kdt, falloff=falloff)
             sfield = SvKdtScalarField(kdt=kdt, falloff=falloff)
         else: # SEP
@@ -191,7 +188,7 @@ class SvAttractorFieldNodeMk2(bpy.types.Node, SverchCustomTreeNode):
         return self.merge_fields(vfields, sfields)
 
     def to_mesh(self, verts, faces, falloff):
-        bvh = bvhtree.BVHTree.FromPolygons(verts, faces)
+        bvh = get_bvh(verts, faces)
         sfield = SvBvhAttractorScalarField(bvh=bvh, falloff=falloff, signed=self.signed)
         vfield = SvBvhAttractorVectorField(bvh=bvh, falloff=falloff)
         return vfield, sfield
@@ -8,12 +8,15 @@ from sverchok.node_tree import SverchCustomTreeNode, throttled
 from sverchok.data_structure import updateNode, zip_long_repeat, fullList, match_long_repeat
 from sverchok.utils.modules.eval_formula import get_variables, safe_eval
 from sverchok.utils.logging import info, exception
-from sverchok.utils.sv_noise_utils import noise_options, PERLIN_ORIGINAL
+from sverchok.utils.sv_noise_utils import noise_options, PERLIN_ORIGINAL, noise_numpy_types
 
 from sverchok.utils.field.vector import SvNoiseVectorField
 
 avail_noise = [(t[0], t[0].title(), t[0].title(), '', t[1]) for t in noise_options]
 
+for idx, new_type in enumerate(noise_numpy_types.keys()):
+    avail_noise.append((new_type, new_type.title().replace('_', ' '), new_type.title(), '', 100 + idx))
+
 class SvNoiseVectorFieldNode(bpy.types.Node, SverchCustomTreeNode):
     """
     Triggers: Noise Vector Field
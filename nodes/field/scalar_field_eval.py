@@ -22,6 +22,8 @@ class SvScalarFieldEvaluateNode(bpy.types.Node, SverchCustomTreeNode):
     bl_label = 'Evaluate Scalar Field'
     bl_icon = 'OUTLINER_OB_EMPTY'
     sv_icon = 'SV_EVAL_SCALAR_FIELD'
+    releases_gil = True
+    mutates_inputs = False
 
     def sv_init(self, context):
         self.inputs.new('SvScalarFieldSocket', "Field")
@@ -30,33 +32,42 @@ class SvScalarFieldEvaluateNode(bpy.types.Node, SverchCustomTreeNode):
         d.prop = (0.0, 0.0, 0.0)
         self.outputs.new('SvStringsSocket', 'Value')
 
-    def process(self):
+    def split_process(self):
         if not any(socket.is_linked for socket in self.outputs):
-            return
+            return (lambda: None), (lambda result: None)
 
         vertices_s = self.inputs['Vertices'].sv_get()
         vertices_s = ensure_nesting_level(vertices_s, 4)
         fields_s = self.inputs['Field'].sv_get()
         fields_s = ensure_nesting_level(fields_s, 2, data_types=(SvScalarField,))
 
-        values_out = []
-        for fields, vertices_i in zip_long_repeat(fields_s, vertices_s):
-            for field, vertices in zip_long_repeat(fields, vertices_i):
-                if len(vertices) == 0:
-                    new_values = []
-                elif len(vertices) == 1:
-                    vertex = vertices[0]
-                    value = field.evaluate(*vertex)
-                    new_values = [value]
-                else:
-                    XYZ = np.array(vertices)
-                    xs = XYZ[:,0]
-                    ys = XYZ[:,1]
-                    zs = XYZ[:,2]
-                    new_values = field.evaluate_grid(xs, ys, zs).tolist()
-                values_out.append(new_values)
+        def kernel():
+            values_out = []
+            for fields, vertices_i in zip_long_repeat(fields_s, vertices_s):
+                for field, vertices in zip_long_repeat(fields, vertices_i):
+                    if len(vertices) == 0:
+                        new_values = []
+                    elif len(vertices) == 1:
+                        vertex = vertices[0]
+                        value = field.evaluate(*vertex)
+                        new_values = [value]
+                    else:
+                        XYZ = np.array(vertices)
+                        xs = XYZ[:,0]
+                        ys = XYZ[:,1]
+                        zs = XYZ[:,2]
+                        new_values = field.evaluate_grid(xs, ys, zs).tolist()
+                    values_out.append(new_values)
+            return values_out
+
+        def finish(values_out):
+            self.outputs['Value'].sv_set(values_out)
 
-        self.outputs['Value'].sv_set(values_out)
+        return kernel, finish
+
+    def process(self):
+        kernel, finish = self.split_process()
+        finish(kernel())
 
 def register():
     bpy.utils.register_class(SvScalarFieldEvaluateNode)
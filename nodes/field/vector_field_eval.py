@@ -16,6 +16,8 @@ class SvVectorFieldEvaluateNode(bpy.types.Node, SverchCustomTreeNode):
     bl_idname = 'SvExVectorFieldEvaluateNode'
     bl_label = 'Evaluate Vector Field'
     bl_icon = 'OUTLINER_OB_EMPTY'
+    releases_gil = True
+    mutates_inputs = False
     sv_icon = 'SV_EVAL_VECTOR_FIELD'
 
     def sv_init(self, context):
@@ -25,33 +27,42 @@ class SvVectorFieldEvaluateNode(bpy.types.Node, SverchCustomTreeNode):
         d.prop = (0.0, 0.0, 0.0)
         self.outputs.new('SvVerticesSocket', 'Vectors')
 
-    def process(self):
+    def split_process(self):
         if not any(socket.is_linked for socket in self.outputs):
-            return
+            return (lambda: None), (lambda result: None)
 
         vertices_s = self.inputs['Vertices'].sv_get()
         fields_s = self.inputs['Field'].sv_get()
 
-        values_out = []
-        for field, vertices in zip_long_repeat(fields_s, vertices_s):
-            if len(vertices) == 0:
-                new_values = []
-            elif len(vertices) == 1:
-                vertex = vertices[0]
-                value = field.evaluate(*vertex)
-                new_values = [tuple(value)]
-            else:
-                XYZ = np.array(vertices)
-                xs = XYZ[:,0]
-                ys = XYZ[:,1]
-                zs = XYZ[:,2]
-                new_xs, new_ys, new_zs = field.evaluate_grid(xs, ys, zs)
-                new_vectors = np.dstack((new_xs[:], new_ys[:], new_zs[:]))
-                new_values = new_vectors[0].tolist()
-
-            values_out.append(new_values)
-
-        self.outputs['Vectors'].sv_set(values_out)
+        def kernel():
+            values_out = []
+            for field, vertices in zip_long_repeat(fields_s, vertices_s):
+                if len(vertices) == 0:
+                    new_values = []
+                elif len(vertices) == 1:
+                    vertex = vertices[0]
+                    value = field.evaluate(*vertex)
+                    new_values = [tuple(value)]
+                else:
+                    XYZ = np.array(vertices)
+                    xs = XYZ[:,0]
+                    ys = XYZ[:,1]
+                    zs = XYZ[:,2]
+                    new_xs, new_ys, new_zs = field.evaluate_grid(xs, ys, zs)
+                    new_vectors = np.dstack((new_xs[:], new_ys[:], new_zs[:]))
+                    new_values = new_vectors[0].tolist()
+
+                values_out.append(new_values)
+            return values_out
+
+        def finish(values_out):
+            self.outputs['Vectors'].sv_set(values_out)
+
+        return kernel, finish
+
+    def process(self):
+        kernel, finish = self.split_process()
+        finish(kernel())
 
 def register():
     bpy.utils.register_class(SvVectorFieldEvaluateNode)
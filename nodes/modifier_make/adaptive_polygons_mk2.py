@@ -19,6 +19,8 @@
 from math import sin, cos, pi, sqrt, pow
 from functools import reduce
 
+import numpy as np
+
 import bpy
 from bpy.props import FloatProperty, EnumProperty, BoolProperty, IntProperty
 import bmesh
@@ -27,7 +29,7 @@ from mathutils.geometry import barycentric_transform
 
 from sverchok.node_tree import SverchCustomTreeNode, throttled
 from sverchok.data_structure import (updateNode, Vector_generate,
-                                     Vector_degenerate, match_long_repeat,
+                                     match_long_repeat,
                                      zip_long_repeat,
                                      fullList, cycle_for_length,
                                      describe_data_shape, get_data_nesting_level,
@@ -47,6 +49,9 @@ sqrt_3_6 = sqrt_3/6
 sqrt_3_3 = sqrt_3/3
 sqrt_3_2 = sqrt_3/2
 
+# maximum number of donor vertices mapped at once
+MAPPING_CHUNK_SIZE = 1 << 18
+
 class OutputData(object):
     def __init__(self):
         self.verts_out = []
@@ -54,6 +59,41 @@ class OutputData(object):
         self.face_data_out = []
         self.vert_recpt_idx_out = []
         self.face_recpt_idx_out = []
+        # (map_mode, id(donor vertices)) -> MappingBatch
+        self.mapping_batches = dict()
+
+class MappingBatch(object):
+    """
+    Recipient faces (or parts of faces in Frame / Fan mode) to be
+    filled with the same donor vertices in the same mapping mode.
+    Donor vertices are mapped onto all these faces at once,
+    and put into output.verts_out at recorded positions.
+    """
+    def __init__(self, map_mode, donor):
+        self.map_mode = map_mode
+        # keep donor.verts_np alive, as its id is used as a key of the batch
+        self.donor_key = donor.verts_np
+        if map_mode == 'TRI':
+            self.donor_verts = donor.verts_np
+        else:
+            self.donor_verts = donor.quad_verts_np
+        self.src_triangle = [donor.tri_vert_1[:], donor.tri_vert_2[:], donor.tri_vert_3[:]]
+        self.slots = []
+        self.vertices_co = []
+        self.vertices_normal = []
+        self.face_normals = []
+        self.wcoefs = []
+        self.zcoefs = []
+        self.zoffsets = []
+
+    def add(self, slot, vertices_co, vertices_normal, face_normal, wcoef, zcoef, zoffset):
+        self.slots.append(slot)
+        self.vertices_co.append([v[:] for v in vertices_co])
+        self.vertices_normal.append([n[:] for n in vertices_normal])
+        self.face_normals.append(face_normal[:])
+        self.wcoefs.append(wcoef)
+        self.zcoefs.append(zcoef)
+        self.zoffsets.append(zoffset)
 
 class RecptFaceData(object):
     def __init__(self):
@@ -86,6 +126,10 @@ class DonorData(object):
         self.tri_vert_2 = None
         self.tri_vert_3 = None
         self.verts_v = []
+        # verts_v as numpy array; for Quads mode, mapped to
+        # [-1/2; 1/2] square if xy_mode is BOUNDS
+        self.verts_np = None
+        self.quad_verts_np = None
         self.faces_i = []
         self.face_data_i = []
 
@@ -97,6 +141,7 @@ class SvAdaptivePolygonsNodeMk2(bpy.types.Node, SverchCustomTreeNode):
     bl_idname = 'SvAdaptivePolygonsNodeMk2'
     bl_label = 'Adaptive Polygons Mk2'
     bl_icon = 'OUTLINER_OB_EMPTY'
+    disk_cacheable = True
     sv_icon = 'SV_ADAPTATIVE_POLS'
 
     axes = [
@@ -531,7 +576,7 @@ class SvAdaptivePolygonsNodeMk2(bpy.types.Node, SverchCustomTreeNode):
 
         if map_mode == 'ASIS':
             # Leave this recipient's face as it was - as a single face.
-            verts = recpt_face_data.vertices_co[:]
+            verts = [v[:] for v in recpt_face_data.vertices_co]
             n = len(verts)
             output.verts_out.append(verts)
             output.faces_out.append([list(range(n))])
@@ -553,23 +598,8 @@ class SvAdaptivePolygonsNodeMk2(bpy.types.Node, SverchCustomTreeNode):
                                      recpt_face_data.vertices_co[i2]],
                                     [donor.tri_vert_1/wcoef, donor.tri_vert_2/wcoef, donor.tri_vert_3/wcoef]
                                 ) * zcoef
-            new_verts = []
-            for v in donor.verts_v:
-                new_verts.append(self.interpolate_tri_3d(
-                                    recpt_face_data.vertices_co[i0],
-                                    recpt_face_data.vertices_co[i1],
-                                    recpt_face_data.vertices_co[i2],
-                                    recpt_face_data.vertices_normal[i0],
-                                    recpt_face_data.vertices_normal[i1],
-                                    recpt_face_data.vertices_normal[i2],
-                                    donor.tri_vert_1/wcoef, donor.tri_vert_2/wcoef, donor.tri_vert_3/wcoef,
-                                    recpt_face_data.normal,
-                                    v, zcoef, zoffset))
-            output.verts_out.append(new_verts)
-            output.faces_out.append(donor.faces_i)
-            output.face_data_out.append(donor.face_data_i)
-            output.vert_recpt_idx_out.append([recpt_face_data.index for i in new_verts])
-            output.face_recpt_idx_out.append([recpt_face_data.index for i in donor.faces_i])
+            # Vertices are calculated later for all faces at once, see _map_batches.
+            self._add_to_batch(map_mode, output, recpt_face_data, donor, [i0, i1, i2], zcoef, zoffset, wcoef)
 
         elif map_mode == 'QUAD':
             # Quads processing mode.
@@ -599,42 +629,8 @@ class SvAdaptivePolygonsNodeMk2(bpy.types.Node, SverchCustomTreeNode):
                                 [corner1, corner2, corner3, corner4]
                             ) * zcoef
 
-            new_verts = []
-            #self.info("Donor: %s", len(donor.verts_v))
-            for v in donor.verts_v:
-                if self.xy_mode == 'BOUNDS':
-                    # Map the `v` vertex's X, Y coordinates
-                    # from it's bounding square to
-                    # [-1/2; 1/2] square.
-                    # Leave Z coordinate as it was.
-                    x = self.map_bounds(donor.min_x, donor.max_x, v[X])
-                    y = self.map_bounds(donor.min_y, donor.max_y, v[Y])
-                    z = v[Z]
-
-                    v = Vector((0, 0, 0))
-                    v[X] = x
-                    v[Y] = y
-                    v[Z] = z
-
-                new_verts.append(self.interpolate_quad_3d(
-                                    recpt_face_data.vertices_co[i0],
-                                    recpt_face_data.vertices_co[i1],
-                                    recpt_face_data.vertices_co[i2],
-                                    recpt_face_data.vertices_co[i3],
-                                    recpt_face_data.vertices_normal[i0],
-                                    recpt_face_data.vertices_normal[i1],
-                                    recpt_face_data.vertices_normal[i2],
-                                    recpt_face_data.vertices_normal[i3],
-                                    recpt_face_data.normal,
-                                    v,
-                                    wcoef, wcoef,
-                                    zcoef, zoffset))
-
-            output.verts_out.append(new_verts)
-            output.faces_out.append(donor.faces_i)
-            output.face_data_out.append(donor.face_data_i)
-            output.vert_recpt_idx_out.append([recpt_face_data.index for i in new_verts])
-            output.face_recpt_idx_out.append([recpt_face_data.index for i in donor.faces_i])
+            # Vertices are calculated later for all faces at once, see _map_batches.
+            self._add_to_batch(map_mode, output, recpt_face_data, donor, [i0, i1, i2, i3], zcoef, zoffset, wcoef)
 
         elif map_mode == 'FRAME':
             is_fan = abs(recpt_face_data.frame_width - 1.0) < 1e-6
@@ -705,6 +701,84 @@ class SvAdaptivePolygonsNodeMk2(bpy.types.Node, SverchCustomTreeNode):
                     sub_recpt.vertices_idxs = [0, 1, 2, 3]
                     self._process_face(sub_map_mode, output, sub_recpt, donor, zcoef, zoffset, angle, wcoef, facerot)
 
+    def _add_to_batch(self, map_mode, output, recpt_face_data, donor, idxs, zcoef, zoffset, wcoef):
+        key = (map_mode, id(donor.verts_np))
+        batch = output.mapping_batches.get(key)
+        if batch is None:
+            batch = output.mapping_batches[key] = MappingBatch(map_mode, donor)
+        batch.add(len(output.verts_out),
+                  [recpt_face_data.vertices_co[i] for i in idxs],
+                  [recpt_face_data.vertices_normal[i] for i in idxs],
+                  recpt_face_data.normal,
+                  wcoef, zcoef, zoffset)
+
+        n_verts = len(donor.verts_v)
+        output.verts_out.append(None)
+        output.faces_out.append(donor.faces_i)
+        output.face_data_out.append(donor.face_data_i)
+        output.vert_recpt_idx_out.append([recpt_face_data.index] * n_verts)
+        output.face_recpt_idx_out.append([recpt_face_data.index for i in donor.faces_i])
+
+    def _map_batches(self, output):
+        """
+        Calculate vertices for all faces collected in output.mapping_batches.
+        This does the same as interpolate_tri_3d / interpolate_quad_3d,
+        for all donor vertices and many recipient faces at once.
+        """
+        X, Y = self.get_other_axes()
+        Z = self.normal_axis_idx()
+        for batch in output.mapping_batches.values():
+            donor_verts = batch.donor_verts
+            n_donor = max(len(donor_verts), 1)
+            all_dst_verts = np.array(batch.vertices_co, dtype=np.float64)
+            all_dst_normals = np.array(batch.vertices_normal, dtype=np.float64)
+            all_face_normals = np.array(batch.face_normals, dtype=np.float64)
+            all_wcoefs = np.array(batch.wcoefs, dtype=np.float64)
+            all_zcoefs = np.array(batch.zcoefs, dtype=np.float64)
+            all_zoffsets = np.array(batch.zoffsets, dtype=np.float64)
+
+            if batch.map_mode == 'TRI':
+                # Barycentric coordinates of donor vertices in the source triangle
+                # (which is the bounding triangle scaled by 1/wcoef) are affine
+                # functions of wcoef * vertex.
+                src = np.array(batch.src_triangle)[:, [X, Y]]
+                inverse = np.linalg.pinv(np.stack([src[1] - src[0], src[2] - src[0]], axis=1))
+                donor_xy = donor_verts[:, [X, Y]].dot(inverse.T)
+                src_origin = inverse.dot(src[0])
+
+            step = max(1, MAPPING_CHUNK_SIZE // n_donor)
+            for start in range(0, len(batch.slots), step):
+                end = start + step
+                dst_verts = all_dst_verts[start:end]
+                wcoefs = all_wcoefs[start:end, np.newaxis]
+
+                if batch.map_mode == 'TRI':
+                    l2l3 = donor_xy[np.newaxis, :, :] * wcoefs[:, :, np.newaxis] - src_origin
+                    l1 = 1.0 - l2l3.sum(axis=2)
+                    weights = np.concatenate([l1[:, :, np.newaxis], l2l3], axis=2)
+                else:
+                    # Bilinear map from [-1/2; 1/2] x [-1/2; 1/2] square
+                    a = donor_verts[:, X] * wcoefs + 0.5
+                    b = donor_verts[:, Y] * wcoefs + 0.5
+                    weights = np.stack([(1 - a) * (1 - b), a * (1 - b), a * b, (1 - a) * b], axis=2)
+
+                locs = np.matmul(weights, dst_verts)
+                if self.normal_mode == 'MAP':
+                    # For LINEAR mode, interpolated (vertex + normal) minus
+                    # interpolated vertex is the interpolated normal.
+                    normals = np.matmul(weights, all_dst_normals[start:end])
+                    if self.normal_interp_mode == 'SMOOTH':
+                        norms = np.linalg.norm(normals, axis=2, keepdims=True)
+                        normals /= np.where(norms > 0, norms, 1.0)
+                else:
+                    normals = all_face_normals[start:end, np.newaxis, :]
+                offsets = donor_verts[:, Z] * all_zcoefs[start:end, np.newaxis] + all_zoffsets[start:end, np.newaxis]
+                new_verts = locs + normals * offsets[:, :, np.newaxis]
+
+                for slot, verts in zip(batch.slots[start:end], new_verts.tolist()):
+                    output.verts_out[slot] = verts
+        output.mapping_batches.clear()
+
     def _process(self, verts_recpt, faces_recpt, verts_donor, faces_donor, face_data_donor, frame_widths, zcoefs, zoffsets, zrotations, wcoefs, facerots, mask):
         bm = bmesh_from_pydata(verts_recpt, [], faces_recpt, normal_update=True)
         bm.verts.ensure_lookup_table()
@@ -781,6 +855,7 @@ class SvAdaptivePolygonsNodeMk2(bpy.types.Node, SverchCustomTreeNode):
             # the rotation angle have changed.
             if prev_angle is None or angle != prev_angle or not single_donor:
                 donor.verts_v = self.rotate_z(donor_verts_o, angle)
+                donor.verts_np = np.array([v[:] for v in donor.verts_v], dtype=np.float64).reshape((-1, 3))
 
                 if self.xy_mode == 'BOUNDS' or self.z_scale == 'AUTO' :
                     donor.max_x = max(v[X] for v in donor.verts_v)
@@ -791,6 +866,16 @@ class SvAdaptivePolygonsNodeMk2(bpy.types.Node, SverchCustomTreeNode):
                 if self.xy_mode == 'BOUNDS':
                     donor.tri_vert_1, donor.tri_vert_2, donor.tri_vert_3 = self.bounding_triangle(donor.verts_v)
 
+                    # Map X, Y coordinates of donor vertices
+                    # from their bounding square to
+                    # [-1/2; 1/2] square.
+                    # Leave Z coordinate as it was.
+                    donor.quad_verts_np = donor.verts_np.copy()
+                    donor.quad_verts_np[:, X] = self.map_bounds(donor.min_x, donor.max_x, donor.verts_np[:, X])
+                    donor.quad_verts_np[:, Y] = self.map_bounds(donor.min_y, donor.max_y, donor.verts_np[:, Y])
+                else:
+                    donor.quad_verts_np = donor.verts_np
+
             prev_angle = angle
 
             if self.z_scale == 'CONST':
@@ -836,6 +921,7 @@ class SvAdaptivePolygonsNodeMk2(bpy.types.Node, SverchCustomTreeNode):
             recpt_face_idx += 1
 
         bm.free()
+        self._map_batches(output)
 
         return output
 
@@ -907,7 +993,6 @@ class SvAdaptivePolygonsNodeMk2(bpy.types.Node, SverchCustomTreeNode):
             output.vert_recpt_idx_out.extend(new.vert_recpt_idx_out)
             output.face_recpt_idx_out.extend(new.face_recpt_idx_out)
 
-            output.verts_out = Vector_degenerate(output.verts_out)
             if self.join:
                 output.verts_out, _, output.faces_out = mesh_join(output.verts_out, [], output.faces_out)
                 output.face_data_out = sum(output.face_data_out, [])
@@ -17,33 +17,22 @@
 # ##### END GPL LICENSE BLOCK #####
 
 import bpy
-import sys
-from bpy.props import EnumProperty, BoolProperty
+from bpy.props import EnumProperty, BoolProperty, FloatProperty
 from sverchok.node_tree import SverchCustomTreeNode
 from sverchok.data_structure import updateNode, match_long_cycle as mlr
-from sverchok.utils.csg_core import CSG
+from sverchok.utils.csg_numpy import CSGPolygons, csg_union, csg_subtract, csg_intersect
 
 
-def Boolean(VA, PA, VB, PB, operation):
-    a = CSG.Obj_from_pydata(VA, PA)
-    b = CSG.Obj_from_pydata(VB, PB)
-    faces = []
-    vertices = []
+def Boolean(VA, PA, VB, PB, operation, tolerance=0.0):
+    a = CSGPolygons.from_pydata(VA, PA)
+    b = CSGPolygons.from_pydata(VB, PB)
     if operation == 'DIFF':
-        polygons = a.subtract(b).toPolygons()
+        polygons = csg_subtract(a, b)
     elif operation == 'JOIN':
-        polygons = a.union(b).toPolygons()
+        polygons = csg_union(a, b)
     elif operation == 'ITX':
-        polygons = a.intersect(b).toPolygons()
-    for polygon in polygons:
-        indices = []
-        for v in polygon.vertices:
-            pos = [v.pos.x, v.pos.y, v.pos.z]
-            if pos not in vertices:
-                vertices.append(pos)
-            index = vertices.index(pos)
-            indices.append(index)
-        faces.append(indices)
+        polygons = csg_intersect(a, b)
+    vertices, faces = polygons.to_pydata(tolerance)
     return [vertices, faces]
 
 
@@ -52,6 +41,7 @@ class SvCSGBooleanNodeMK2(bpy.types.Node, SverchCustomTreeNode):
     bl_idname = 'SvCSGBooleanNodeMK2'
     bl_label = 'CSG Boolean 2'
     bl_icon = 'MOD_BOOLEAN'
+    disk_cacheable = True
 
     mode_options = [
         ("ITX", "Intersect", "", 0),
@@ -86,6 +76,12 @@ class SvCSGBooleanNodeMK2(bpy.types.Node, SverchCustomTreeNode):
         default=True,
         update=update_mode)
 
+    tolerance: FloatProperty(
+        name="Merge tolerance",
+        description="vertices of the result which fall into the same cell of a grid with this step are merged (0 to merge only coincident vertices)",
+        default=1e-6, min=0.0, precision=6,
+        update=updateNode)
+
     def sv_init(self, context):
         self.inputs.new('SvVerticesSocket', 'Verts A')
         self.inputs.new('SvStringsSocket',  'Polys A')
@@ -104,6 +100,10 @@ class SvCSGBooleanNodeMK2(bpy.types.Node, SverchCustomTreeNode):
         if self.nest_objs:
             col.prop(self, "out_last", toggle=True)
 
+    def draw_buttons_ext(self, context, layout):
+        self.draw_buttons(context, layout)
+        layout.prop(self, "tolerance")
+
     def process(self):
         OutV, OutP = self.outputs
         if not OutV.is_linked:
@@ -111,24 +111,22 @@ class SvCSGBooleanNodeMK2(bpy.types.Node, SverchCustomTreeNode):
         VertA, PolA, VertB, PolB, VertN, PolN = self.inputs
         SMode = self.selected_mode
         out = []
-        recursionlimit = sys.getrecursionlimit()
-        sys.setrecursionlimit(10000)
+        tolerance = self.tolerance
         if not self.nest_objs:
             for v1, p1, v2, p2 in zip(*mlr([VertA.sv_get(), PolA.sv_get(), VertB.sv_get(), PolB.sv_get()])):
-                out.append(Boolean(v1, p1, v2, p2, SMode))
+                out.append(Boolean(v1, p1, v2, p2, SMode, tolerance))
         else:
             vnest, pnest = VertN.sv_get(), PolN.sv_get()
-            First = Boolean(vnest[0], pnest[0], vnest[1], pnest[1], SMode)
+            First = Boolean(vnest[0], pnest[0], vnest[1], pnest[1], SMode, tolerance)
             if not self.out_last:
                 out.append(First)
                 for i in range(2, len(vnest)):
-                    out.append(Boolean(First[0], First[1], vnest[i], pnest[i], SMode))
+                    out.append(Boolean(First[0], First[1], vnest[i], pnest[i], SMode, tolerance))
                     First = out[-1]
             else:
                 for i in range(2, len(vnest)):
-                    First = Boolean(First[0], First[1], vnest[i], pnest[i], SMode)
+                    First = Boolean(First[0], First[1], vnest[i], pnest[i], SMode, tolerance)
                 out.append(First)
-        sys.setrecursionlimit(recursionlimit)
         OutV.sv_set([i[0] for i in out])
         if OutP.is_linked:
             OutP.sv_set([i[1] for i in out])
@@ -7,12 +7,12 @@
 
 
 from typing import NamedTuple, Any, List, Tuple
-import random
-from itertools import chain, repeat
+from itertools import chain, repeat, product
+
+import numpy as np
 
 import bpy
-from mathutils import Vector
-from mathutils.geometry import tessellate_polygon, area_tri
+from mathutils.geometry import tessellate_polygon
 
 from sverchok.node_tree import SverchCustomTreeNode
 from sverchok.data_structure import updateNode
@@ -46,26 +46,50 @@ INPUT_CONFIG = [
 
 class NodeProperties(NamedTuple):
     proportional: bool
+    mode: str = 'RANDOM'
+    min_distance: float = 0.0
+    output_numpy: bool = False
+
+
+# in Poisson disk mode, number of candidate points generated per requested point
+POISSON_CANDIDATES_FACTOR = 10
 
 
 def node_process(inputs: InputData, properties: NodeProperties):
-    me = TriangulatedMesh([Vector(co) for co in inputs.verts], inputs.faces)
+    me = TriangulatedMesh(inputs.verts, inputs.faces)
     if properties.proportional:
         me.use_even_points_distribution()
     if inputs.face_weight:
         me.set_custom_face_weights(inputs.face_weight)
-    return me.generate_random_points(inputs.number[0], inputs.seed[0])  # todo [0] <-- ?!
+    number, seed = inputs.number[0], inputs.seed[0]  # todo [0] <-- ?!
+    if properties.mode == 'POISSON':
+        points, face_indexes = me.generate_poisson_points(number, seed, properties.min_distance)
+    else:
+        points, face_indexes = me.generate_random_points(number, seed)
+    if properties.output_numpy:
+        return points, face_indexes
+    return points.tolist(), face_indexes.tolist()
+
+
+def random_state_from_seed(seed):
+    # RandomState accepts only integers from 0 to 2**32 - 1
+    return np.random.RandomState(int(seed) % 2**32)
 
 
 class TriangulatedMesh:
-    def __init__(self, verts: List[Vector], faces: List[List[int]]):
-        self._verts = verts
+    """
+    Mesh split into triangles, for sampling random points on its surface.
+    Triangles and quads are split with numpy, other faces by tessellate_polygon.
+    Points are generated with numpy for all triangles at once.
+    """
+    def __init__(self, verts, faces: List[List[int]]):
+        self._verts = np.asarray(verts, dtype=np.float64).reshape((-1, 3))
         self._faces = faces
         self._face_weights = None
 
-        self._tri_faces = []
-        self._tri_face_areas = []
-        self._old_face_indexes_per_tri = []
+        self._tri_faces = None  # array (n, 3) of vertex indexes
+        self._tri_face_areas = None
+        self._old_face_indexes_per_tri = None
 
         self._triangulate()
 
@@ -74,63 +98,192 @@ class TriangulatedMesh:
 
     def set_custom_face_weights(self, custom_weights):
         weights_per_tri = self._face_attrs_to_tri_face_attrs(custom_weights)
-        if self._face_weights:
-            self._face_weights *= weights_per_tri  # can be troubles if set custom weights several times
+        if self._face_weights is not None:
+            self._face_weights = self._face_weights * weights_per_tri
         else:
             self._face_weights = weights_per_tri
 
-    def generate_random_points(self, random_points_total: int, seed: int) -> Tuple[list, list]:
-        random.seed(seed)
-        points_total_per_face = self._distribute_points(random_points_total)
-        random_points = []
-        old_face_indexes_per_point = []
-        for tri_face, face_index, points_total in zip(self._tri_faces,
-                                                      self._old_face_indexes_per_tri,
-                                                      points_total_per_face):
-            tri_random_points = self._get_random_vectors_on_tri(*[self._verts[i] for i in tri_face], points_total)
-            random_points.extend(tri_random_points)
-            old_face_indexes_per_point.extend([face_index for _ in range(len(tri_random_points))])
-        return [v[:] for v in random_points], old_face_indexes_per_point
+    def generate_random_points(self, random_points_total: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        random points on the mesh surface, as array of shape (n, 3),
+        and array of indexes of faces of the initial mesh the points lay on;
+        points are grouped by faces
+        """
+        return self._generate_points(random_points_total, random_state_from_seed(seed))
+
+    def generate_poisson_points(self, points_total: int, seed: int, min_distance: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        up to points_total random points on the mesh surface, no two of them
+        closer than min_distance; fewer points are returned if the surface
+        can not take that many
+        """
+        if min_distance <= 0:
+            return self.generate_random_points(points_total, seed)
+        random_state = random_state_from_seed(seed)
+        points, face_indexes = self._generate_points(points_total * POISSON_CANDIDATES_FACTOR, random_state)
+        if len(points) < 2:
+            return points[:points_total], face_indexes[:points_total]
+        # candidates are grouped by faces; shuffle them, so that any prefix
+        # of the list covers the whole surface
+        order = random_state.permutation(len(points))
+        accepted = poisson_disk_mask(points[order], min_distance)
+        selected = np.sort(order[np.nonzero(accepted)[0][:points_total]])
+        return points[selected], face_indexes[selected]
 
     @property
     def tri_face_areas(self):
-        if not self._tri_face_areas:
-            self._tri_face_areas = [area_tri(*[self._verts[i] for i in f]) for f in self._tri_faces]
+        if self._tri_face_areas is None:
+            v1, v2, v3 = (self._verts[self._tri_faces[:, i]] for i in range(3))
+            self._tri_face_areas = np.linalg.norm(np.cross(v2 - v1, v3 - v1), axis=1) / 2
         return self._tri_face_areas
 
-    def _distribute_points(self, random_points_total: int) -> List[int]:
-        # generate list of numbers which mean how many points should be created on face
-        points_total_per_face = [0 for _ in range(len(self._tri_faces))]
-        chosen_faces = random.choices(range(len(self._tri_faces)), self._face_weights, k=random_points_total)
-        for i in chosen_faces:
-            points_total_per_face[i] += 1
-        return points_total_per_face
+    def _generate_points(self, points_total, random_state):
+        tris_total = len(self._tri_faces)
+        if not tris_total or points_total <= 0:
+            return np.empty((0, 3)), np.empty(0, dtype=np.int64)
+        tri_indexes = self._distribute_points(points_total, random_state)
+        # random barycentric coordinates; points of the other half
+        # of the parallelogram are reflected into the triangle
+        u = random_state.random_sample((len(tri_indexes), 2))
+        outside = u.sum(axis=1) > 1
+        u[outside] = 1 - u[outside]
+        tris = self._tri_faces[tri_indexes]
+        v1 = self._verts[tris[:, 0]]
+        points = v1 + (self._verts[tris[:, 1]] - v1) * u[:, 0:1] + (self._verts[tris[:, 2]] - v1) * u[:, 1:2]
+        return points, self._old_face_indexes_per_tri[tri_indexes]
+
+    def _distribute_points(self, random_points_total: int, random_state) -> np.ndarray:
+        # choose a triangle for each point, with probability proportional to weights;
+        # returns sorted array of triangle indexes
+        tris_total = len(self._tri_faces)
+        if self._face_weights is None:
+            tri_indexes = random_state.randint(0, tris_total, random_points_total)
+        else:
+            cumulative = np.cumsum(np.maximum(self._face_weights, 0))
+            if cumulative[-1] <= 0:
+                return np.empty(0, dtype=np.int64)
+            values = random_state.random_sample(random_points_total) * cumulative[-1]
+            tri_indexes = np.searchsorted(cumulative, values, side='right')
+            np.minimum(tri_indexes, tris_total - 1, out=tri_indexes)
+        points_total_per_tri = np.bincount(tri_indexes, minlength=tris_total)
+        return np.repeat(np.arange(tris_total), points_total_per_tri)
 
     def _triangulate(self):
-        # generate list of triangle faces and list of indexes which points to initial faces for each new triangle
-        for i, f in enumerate(self._faces):
-            face_verts = [[self._verts[i] for i in f]]
-            # [[v1,v2,v3,v4]] - face_verts
+        # generate array of triangle faces and array of indexes which points to initial faces for each new triangle
+        tri_faces = []
+        old_face_indexes = []
+
+        sizes = np.array([len(f) for f in self._faces], dtype=np.int64)
+        tris = np.nonzero(sizes == 3)[0]
+        if len(tris):
+            tri_faces.append(np.array([self._faces[i] for i in tris.tolist()], dtype=np.int64).reshape((-1, 3)))
+            old_face_indexes.append(tris)
+
+        quads = np.nonzero(sizes == 4)[0]
+        if len(quads):
+            quad_faces = np.array([self._faces[i] for i in quads.tolist()], dtype=np.int64).reshape((-1, 4))
+            v0, v1, v2, v3 = (self._verts[quad_faces[:, i]] for i in range(4))
+            # diagonal 0-2 can be used if vertices 1 and 3 are at different sides of it
+            # (it is not so only for concave quads)
+            diagonal = v2 - v0
+            good = (np.cross(diagonal, v1 - v0) * np.cross(diagonal, v3 - v0)).sum(axis=1) <= 0
+            quad_faces = np.where(good[:, np.newaxis], quad_faces, np.roll(quad_faces, -1, axis=1))
+            tri_faces.append(quad_faces[:, [0, 1, 2]])
+            tri_faces.append(quad_faces[:, [0, 2, 3]])
+            old_face_indexes.append(quads)
+            old_face_indexes.append(quads)
+
+        verts = self._verts.tolist()
+        ngon_tri_faces = []
+        ngon_old_face_indexes = []
+        for i in np.nonzero(sizes > 4)[0].tolist():
+            f = self._faces[i]
+            face_verts = [[verts[i] for i in f]]
+            # [[v1,v2,v3,v4,...]] - face_verts
             for tri_face in tessellate_polygon(face_verts):
-                self._tri_faces.append([f[itf] for itf in tri_face])
-                self._old_face_indexes_per_tri.append(i)
-
-    @staticmethod
-    def _get_random_vectors_on_tri(v1, v2, v3, number):
-        # returns random vertices for given triangle
-        out = []
-        for _ in range(number):
-            u1 = random.random()
-            u2 = random.random()
-            u1 = u1 if u1 + u2 <= 1 else 1 - u1
-            u2 = u2 if u1 + u2 <= 1 else 1 - u2
-            side1 = v2 - v1
-            side2 = v3 - v1
-            out.append(v1 + side1 * u1 + side2 * u2)
-        return out
+                ngon_tri_faces.append([f[itf] for itf in tri_face])
+                ngon_old_face_indexes.append(i)
+        if ngon_tri_faces:
+            tri_faces.append(np.array(ngon_tri_faces, dtype=np.int64))
+            old_face_indexes.append(np.array(ngon_old_face_indexes, dtype=np.int64))
+
+        if tri_faces:
+            self._tri_faces = np.concatenate(tri_faces)
+            self._old_face_indexes_per_tri = np.concatenate(old_face_indexes)
+        else:
+            self._tri_faces = np.empty((0, 3), dtype=np.int64)
+            self._old_face_indexes_per_tri = np.empty(0, dtype=np.int64)
 
     def _face_attrs_to_tri_face_attrs(self, values):
-        return [values[i] if i <= len(values) - 1 else values[len(values) - 1] for i in self._old_face_indexes_per_tri]
+        values = np.asarray(values, dtype=np.float64)
+        return values[np.minimum(self._old_face_indexes_per_tri, len(values) - 1)]
+
+
+def poisson_disk_mask(points, min_distance):
+    """
+    Select points so that no two selected points are closer than min_distance.
+    Points are considered in the order they are given: a point is rejected
+    only because of a point which goes earlier in the list.
+    Returns boolean mask of selected points.
+
+    Space is divided into cubic cells with diagonal min_distance, so that
+    a cell can contain only one selected point. On each round, first not yet
+    considered point of each empty cell is checked against selected points
+    in cells nearby, all at once; points which have earlier points to be
+    considered nearby wait for the next round. So the result is the same
+    as if points were considered one by one.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    n = len(points)
+    selected = np.zeros(n, dtype=bool)
+    if n == 0:
+        return selected
+    cell_size = min_distance / np.sqrt(3)
+    cells = np.floor((points - points.min(axis=0)) / cell_size).astype(np.int64) + 2
+    # points closer than min_distance are at most 2 cells away from each other
+    dims = cells.max(axis=0) + 3
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    offsets = np.array([(i * dims[1] + j) * dims[2] + k for i, j, k in product(range(-2, 3), repeat=3)])
+    min_distance2 = min_distance ** 2
+
+    # points grouped by cells, in the initial order inside of each cell
+    order = np.argsort(keys, kind='stable')
+    cell_keys, cell_starts, cell_counts = np.unique(keys[order], return_index=True, return_counts=True)
+    cell_points = np.full(len(cell_keys), -1, dtype=np.int64)  # selected point of each cell
+    next_in_cell = np.zeros(len(cell_keys), dtype=np.int64)
+
+    def lookup(candidate_keys, table):
+        # index of point in table (array per cell) for each of cells, or -1
+        idx = np.searchsorted(cell_keys, candidate_keys)
+        np.minimum(idx, len(cell_keys) - 1, out=idx)
+        found = cell_keys[idx] == candidate_keys
+        return np.where(found, table[idx], -1)
+
+    while True:
+        active = np.nonzero((cell_points < 0) & (next_in_cell < cell_counts))[0]
+        if not len(active):
+            break
+        candidates = order[cell_starts[active] + next_in_cell[active]]
+        checked = np.full(len(cell_keys), -1, dtype=np.int64)
+        checked[active] = candidates
+
+        neighbour_keys = keys[candidates][:, np.newaxis] + offsets
+        neighbour_selected = lookup(neighbour_keys, cell_points)
+        neighbour_checked = lookup(neighbour_keys, checked)
+
+        valid = neighbour_selected >= 0
+        diff = points[np.where(valid, neighbour_selected, 0)] - points[candidates][:, np.newaxis, :]
+        rejected = (valid & ((diff * diff).sum(axis=2) < min_distance2)).any(axis=1)
+        # a point waits while there are earlier points to be checked in cells nearby;
+        # the first of them is the one being checked in its cell
+        waiting = ((neighbour_checked >= 0) & (neighbour_checked < candidates[:, np.newaxis])).any(axis=1)
+        accepted = ~rejected & ~waiting
+
+        selected[candidates[accepted]] = True
+        cell_points[active[accepted]] = candidates[accepted]
+        next_in_cell[active[rejected]] += 1
+
+    return selected
 
 
 class SvRandomPointsOnMesh(bpy.types.Node, SverchCustomTreeNode):
@@ -154,9 +307,42 @@ class SvRandomPointsOnMesh(bpy.types.Node, SverchCustomTreeNode):
             description="If checked, then number of points at each face is proportional to the area of the face",
             default=True,
             update=updateNode)
-    
+
+    modes = [
+        ('RANDOM', "Random", "Independent random points", 0),
+        ('POISSON', "Poisson disk", "Random points, no two of them closer than Min distance", 1)
+    ]
+
+    mode: bpy.props.EnumProperty(
+            name="Mode",
+            items=modes,
+            default='RANDOM',
+            update=updateNode)
+
+    min_distance: bpy.props.FloatProperty(
+            name="Min distance",
+            description="Minimal distance between points in Poisson disk mode",
+            default=0.1, min=0.0,
+            update=updateNode)
+
+    output_numpy: bpy.props.BoolProperty(
+            name='Output NumPy',
+            description='Output NumPy arrays',
+            default=False,
+            update=updateNode)
+
     def draw_buttons(self, context, layout):
+        layout.prop(self, "mode", text='')
         layout.prop(self, "proportional", toggle=True)
+        if self.mode == 'POISSON':
+            layout.prop(self, "min_distance")
+
+    def draw_buttons_ext(self, context, layout):
+        self.draw_buttons(context, layout)
+        layout.prop(self, "output_numpy")
+
+    def rclick_menu(self, context, layout):
+        layout.prop(self, "output_numpy", toggle=True)
 
     def sv_init(self, context):
         [self.inputs.new(p.socket_type, p.name) for p in INPUT_CONFIG]
@@ -169,7 +355,7 @@ class SvRandomPointsOnMesh(bpy.types.Node, SverchCustomTreeNode):
         if not all([self.inputs['Verts'].is_linked, self.inputs['Faces'].is_linked]):
             return
 
-        props = NodeProperties(self.proportional)
+        props = NodeProperties(self.proportional, self.mode, self.min_distance, self.output_numpy)
         out = [node_process(inputs, props) for inputs in self.get_input_data_iterator(INPUT_CONFIG)]
         [s.sv_set(data) for s, data in zip(self.outputs, zip(*out))]
 
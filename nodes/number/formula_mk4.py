@@ -17,7 +17,7 @@ import io
 from sverchok.node_tree import SverchCustomTreeNode, throttled
 from sverchok.data_structure import updateNode, match_long_repeat, zip_long_repeat
 from sverchok.utils import logging
-from sverchok.utils.modules.eval_formula import get_variables, safe_eval
+from sverchok.utils.modules.eval_formula import get_variables, safe_eval, safe_eval_vectorized
 
 class SvFormulaNodeMk4(bpy.types.Node, SverchCustomTreeNode):
     """
@@ -212,15 +212,14 @@ class SvFormulaNodeMk4(bpy.types.Node, SverchCustomTreeNode):
 
             for objects in zip(*parameters):
                 object_results = []
-                for values in zip_long_repeat(*objects):
-                    variables = dict(zip(var_names, values))
-                    vector = []
-                    for formula in self.formulas():
-                        if formula:
-                            value = safe_eval(formula, variables)
-                            vector.append(value)
+                columns = match_long_repeat(objects)
+                count = min(len(column) for column in columns)
+                variables = dict(zip(var_names, columns))
+                values = [safe_eval_vectorized(formula, variables, count)
+                            for formula in self.formulas() if formula]
+                for vector in zip(*values):
                     if self.separate:
-                        object_results.append(vector)
+                        object_results.append(list(vector))
                     else:
                         object_results.extend(vector)
                 results.append(object_results)
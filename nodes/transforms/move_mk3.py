@@ -33,7 +33,7 @@ def move_meshes(params, constant, matching_f):
     matching_f stands for list matching formula to use
     '''
     result = []
-    match_mode, output_numpy = constant
+    match_mode = constant[0]
     params = matching_f(params)
 
     local_match = numpy_list_match_func[match_mode]
@@ -41,7 +41,7 @@ def move_meshes(params, constant, matching_f):
     for props in zip(*params):
         verts, move_verts, strength = local_match([np.array(p) for p in props])
         verts_out = verts + move_verts * strength[:, np.newaxis]
-        result.append(verts_out if output_numpy else verts_out.tolist())
+        result.append(verts_out)
 
     return result
 
@@ -58,6 +58,13 @@ class SvMoveNodeMk3(bpy.types.Node, SverchCustomTreeNode):
     bl_icon = 'ORIENTATION_VIEW'
     sv_icon = 'SV_MOVE'
 
+    array_inputs = frozenset({'Vertices', 'Movement Vectors', 'Strength'})
+
+    @property
+    def array_outputs(self):
+        # arrays are converted to lists for nodes which do not take them,
+        # unless "Output NumPy" is enabled
+        return frozenset() if self.output_numpy else frozenset({'Vertices'})
 
     movement_vectors: FloatVectorProperty(
         name='Movement Vect.', description='Base movement vector',
@@ -113,7 +120,7 @@ class SvMoveNodeMk3(bpy.types.Node, SverchCustomTreeNode):
 
         matching_f = list_match_func[self.list_match]
         desired_levels = [3, 3, 2]
-        ops = [self.list_match, self.output_numpy]
+        ops = [self.list_match]
 
         result = recurse_f_level_control(params, ops, move_meshes, matching_f, desired_levels)
 
@@ -24,7 +24,7 @@ from mathutils import noise
 from sverchok.node_tree import SverchCustomTreeNode
 from sverchok.data_structure import updateNode
 from sverchok.utils.sv_seed_funcs import get_offset, seed_adjusted
-from sverchok.utils.sv_noise_utils import noise_options, PERLIN_ORIGINAL
+from sverchok.utils.sv_noise_utils import noise_options, PERLIN_ORIGINAL, noise_numpy_types, numpy_fractal
 
 # helpers
 def dict_from(options, idx1, idx2):
@@ -71,6 +71,9 @@ fractal_type_to_mode = {
 fractal_f = dict_from(fractal_options, 0, 2)
 
 avail_noise = enum_from(noise_options)
+
+for idx, new_type in enumerate(noise_numpy_types.keys()):
+    avail_noise.append((new_type, new_type.title().replace('_', ' '), new_type.title(), '', 100 + idx))
 avail_fractal = enum_from(fractal_options)
 
 
@@ -161,6 +164,15 @@ class SvVectorFractal(bpy.types.Node, SverchCustomTreeNode):
         param_list = [m_h_factor, m_lacunarity, m_octaves, m_offset, m_gain]
 
         out = []
+        if self.noise_type in noise_numpy_types:
+            # numpy noises evaluate whole lists of vertices at once
+            noise_function = noise_numpy_types[self.noise_type][1]
+            for idx, vlist in enumerate(verts):
+                params = [(param[idx] if idx < len(param) else param[-1]) for param in param_list]
+                out.append(numpy_fractal(self.fractal_type, vlist, *params, _seed, noise_function, True).tolist())
+            outputs[0].sv_set(out)
+            return
+
         for idx, vlist in enumerate(verts):
             # lazy generation of full parameters.
             params = [(param[idx] if idx < len(param) else param[-1]) for param in param_list]
@@ -24,19 +24,14 @@ from mathutils import noise
 
 from sverchok.node_tree import SverchCustomTreeNode, throttled
 from sverchok.data_structure import updateNode
-from sverchok.utils.sv_noise_utils import noise_options, PERLIN_ORIGINAL, noise_numpy_types
+from sverchok.utils.sv_noise_utils import noise_options, PERLIN_ORIGINAL, noise_numpy_types, numpy_noise_vector
 import numpy as np
 
 
 def numpy_noise(vecs, out, out_mode, seed, noise_function, smooth, output_numpy):
     if out_mode == 'VECTOR':
-        obj = np.array(vecs)
-        r_noise = np.stack((
-            noise_function(obj, seed, smooth),
-            noise_function(obj, seed + 1, smooth),
-            noise_function(obj, seed + 2, smooth)
-            )).T
-        out.append((2 * r_noise - 1) if output_numpy else (2 * r_noise - 1).tolist())
+        r_noise = numpy_noise_vector(vecs, seed, noise_function, smooth)
+        out.append(r_noise if output_numpy else r_noise.tolist())
     else:
         if output_numpy:
             out.append(noise_function(np.array(vecs), seed, smooth))
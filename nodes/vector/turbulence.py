@@ -23,12 +23,18 @@ from mathutils import noise, Vector
 from sverchok.node_tree import SverchCustomTreeNode
 from sverchok.data_structure import (updateNode, Vector_degenerate, fullList)
 from sverchok.utils.sv_seed_funcs import get_offset, seed_adjusted
-from sverchok.utils.sv_noise_utils import noise_options, PERLIN_ORIGINAL
+from sverchok.utils.sv_noise_utils import (
+    noise_options, PERLIN_ORIGINAL, noise_numpy_types,
+    numpy_turbulence, numpy_turbulence_vector)
 
 
 avail_noise = [(t[0], t[0].title(), t[0].title(), '', t[1]) for t in noise_options]
 
+for idx, new_type in enumerate(noise_numpy_types.keys()):
+    avail_noise.append((new_type, new_type.title().replace('_', ' '), new_type.title(), '', 100 + idx))
+
 turbulence_f = {'SCALAR': noise.turbulence, 'VECTOR': noise.turbulence_vector}
+turbulence_numpy_f = {'SCALAR': numpy_turbulence, 'VECTOR': numpy_turbulence_vector}
 
 class SvTurbulenceNode(bpy.types.Node, SverchCustomTreeNode):
     '''Vector Turbulence node'''
@@ -110,6 +116,15 @@ class SvTurbulenceNode(bpy.types.Node, SverchCustomTreeNode):
 
         # iterate over vert lists and pass arguments to the turbulence function
         out = []
+        if self.noise_type in noise_numpy_types:
+            # numpy noises evaluate whole lists of vertices at once
+            tfunc = turbulence_numpy_f[self.out_mode]
+            noise_function = noise_numpy_types[self.noise_type][1]
+            for vert_list, octaves, hard, amp, freq, seed in zip(*arguments):
+                out.append(tfunc(vert_list, octaves, hard, amp, freq, seed, noise_function, True).tolist())
+            outputs[0].sv_set(out)
+            return
+
         for idx, (vert_list, octaves, hard, amp, freq, seed) in enumerate(zip(*arguments)):
             final_vert_list = seed_adjusted(vert_list, seed)
             out.append([tfunc(v, octaves, hard, noise_basis=self.noise_type, amplitude_scale=amp, frequency_scale=freq) for v in final_vert_list])
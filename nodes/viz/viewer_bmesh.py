@@ -18,18 +18,17 @@
 
 # MK2
 import numpy as np
-import itertools
 import collections
 import random
 from random import random as rnd_float
 
 import bpy
 from bpy.props import BoolProperty, StringProperty, BoolVectorProperty
-from mathutils import Matrix, Vector
+from mathutils import Matrix
 
 from sverchok.node_tree import SverchCustomTreeNode
 from sverchok.data_structure import dataCorrect, fullList, updateNode
-from sverchok.utils.sv_bmesh_utils import bmesh_from_pydata
+from sverchok.utils.sv_bmesh_utils import bmesh_from_pydata, MeshTopology
 from sverchok.utils.sv_viewer_utils import natural_plus_one, greek_alphabet
 from sverchok.utils.sv_obj_helper import SvObjHelper, CALLBACK_OP, get_random_init_v3
 from sverchok.utils.modules.sv_bmesh_ops import find_islands_treemap
@@ -92,6 +91,45 @@ def default_mesh(name):
     return bpy.data.meshes.new(name)
 
 
+# mesh.as_pointer() -> MeshTopology last written into that mesh by write_mesh_geometry;
+# entries are dropped when the node removes its objects or is removed itself
+_mesh_topologies = dict()
+
+def forget_mesh_topologies(objs):
+    for obj in objs:
+        if obj.data is not None:
+            _mesh_topologies.pop(obj.data.as_pointer(), None)
+
+def write_mesh_geometry(node, mesh, verts, edges, faces, materials):
+    '''
+    Write geometry straight into the mesh with foreach_set. If edges, faces
+    and materials are the same as were written into this mesh last time,
+    only locations of vertices are updated.
+    Returns False if the data can not be written this way (bmesh should be
+    used then, to report errors the usual way).
+    '''
+    verts = np.asarray(verts, dtype=np.float32)
+    if verts.ndim != 2 or verts.shape[1] != 3:
+        return False
+    topology = MeshTopology.from_pydata(len(verts), edges, faces, materials)
+    if topology is None:
+        return False
+
+    previous = _mesh_topologies.get(mesh.as_pointer())
+    if previous is not None and previous.matches(mesh) and previous == topology:
+        mesh.vertices.foreach_set('co', verts.ravel())
+    else:
+        if not topology.is_valid():
+            return False
+        topology.write(mesh, verts)
+        _mesh_topologies[mesh.as_pointer()] = topology
+
+    mesh.update(calc_edges_loose=len(topology.edges) > 0)
+    if node.calc_normals:
+        mesh.calc_normals()
+    return True
+
+
 def make_bmesh_geometry(node, obj_index, context, verts, *topology):
     collection = context.scene.collection
     meshes = bpy.data.meshes
@@ -127,12 +165,14 @@ def make_bmesh_geometry(node, obj_index, context, verts, *topology):
         vertices, this mode can be switched to to increase efficiency
     '''
     if node.fixed_verts and difference == 0:
-        f_v = list(itertools.chain.from_iterable(verts))
-        mesh.vertices.foreach_set('co', f_v)
+        mesh.vertices.foreach_set('co', np.asarray(verts, dtype=np.float32).ravel())
         mesh.update()
+    elif not node.randomize_vcol_islands and write_mesh_geometry(node, mesh, verts, edges, faces, materials):
+        sv_object.hide_select = False
     else:
 
         ''' get bmesh, write bmesh to obj, free bmesh'''
+        _mesh_topologies.pop(mesh.as_pointer(), None)
         bm = bmesh_from_pydata(verts, edges, faces, normal_update=node.calc_normals)
         if materials:
             for face, material in zip(bm.faces[:], materials):
@@ -191,7 +231,8 @@ def make_bmesh_geometry_merged(node, obj_index, context, yielder_object):
 
         if matrix:
             # matrix = matrix_sanitizer(matrix)
-            verts = [matrix @ Vector(v) for v in verts]
+            matrix = np.array(matrix)
+            verts = np.asarray(verts) @ matrix[:3, :3].T + matrix[:3, 3]
 
         big_verts.extend(verts)
         big_edges.extend([[a + vert_count, b + vert_count] for a, b in edges])
@@ -201,15 +242,15 @@ def make_bmesh_geometry_merged(node, obj_index, context, yielder_object):
         vert_count += len(verts)
 
 
-    if node.fixed_verts and len(sv_object.data.vertices) == len(big_verts):
-        mesh = sv_object.data
-        f_v = list(itertools.chain.from_iterable(big_verts))
-        mesh.vertices.foreach_set('co', f_v)
+    mesh = sv_object.data
+    if node.fixed_verts and len(mesh.vertices) == len(big_verts):
+        mesh.vertices.foreach_set('co', np.asarray(big_verts, dtype=np.float32).ravel())
         mesh.update()
-    else:
+    elif not write_mesh_geometry(node, mesh, big_verts, big_edges, big_faces, big_materials):
         ''' get bmesh, write bmesh to obj, free bmesh'''
+        _mesh_topologies.pop(mesh.as_pointer(), None)
         bm = bmesh_from_pydata(big_verts, big_edges, big_faces, normal_update=node.calc_normals)
-        if materials:
+        if big_materials:
             for face, material in zip(bm.faces[:], big_materials):
                 if material is not None:
                     face.material_index = material
@@ -395,6 +436,14 @@ class SvBmeshViewerNodeV28(bpy.types.Node, SverchCustomTreeNode, SvObjHelper):
                 self.outputs[0].sv_set(objs)
 
 
+    def remove_non_updated_objects(self, obj_index):
+        # meshes of these objects are removed as well
+        forget_mesh_topologies(obj for obj in self.get_children() if obj['idx'] > obj_index)
+        super().remove_non_updated_objects(obj_index)
+
+    def sv_free(self):
+        forget_mesh_topologies(self.get_children())
+
     def set_autosmooth(self, objs):
         if not self.autosmooth:
             return
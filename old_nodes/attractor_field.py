@@ -3,7 +3,6 @@ import numpy as np
 
 import bpy
 from bpy.props import FloatProperty, EnumProperty, BoolProperty, IntProperty, StringProperty
-from mathutils import kdtree
 from mathutils import bvhtree
 
 from sverchok.node_tree import SverchCustomTreeNode, throttled
@@ -19,6 +18,7 @@ from sverchok.utils.field.vector import (SvVectorFieldPointDistance,
             SvLineAttractorVectorField, SvPlaneAttractorVectorField,
             SvBvhAttractorVectorField)
 from sverchok.utils.math import all_falloff_types, falloff_array
+from sverchok.utils.sv_KDT_utils import SvKdTree
 
 class SvExAttractorFieldNode(bpy.types.Node, SverchCustomTreeNode):
     """
@@ -117,10 +117,7 @@ class SvExAttractorFieldNode(bpy.types.Node, SverchCustomTreeNode):
             vfields = [SvVectorFieldPointDistance(center, falloff=falloff) for center in centers]
             vfield = SvAverageVectorField(vfields)
         elif self.point_mode == 'MIN':
-            kdt = kdtree.KDTree(len(centers))
-            for i, v in enumerate(centers):
-                kdt.insert(v, i)
-            kdt.balance()
+            kdt = SvKdTree(centers)
             vfield = SvKdtVectorField(kdt=kdt, falloff=falloff)
             sfield = SvKdtScalarField(kdt=kdt, falloff=falloff)
         else: # SEP
@@ -7,7 +7,7 @@ from bpy.props import BoolProperty, FloatVectorProperty, EnumProperty, IntProper
 from sverchok import data_structure
 from sverchok.core import handlers
 from sverchok.core import update_system
-from sverchok.utils import sv_panels_tools, logging
+from sverchok.utils import sv_panels_tools, logging, telemetry
 from sverchok.utils.sv_gist_tools import TOKEN_HELP_URL
 from sverchok.ui import color_def
 
@@ -54,9 +54,34 @@ class SverchokPreferences(AddonPreferences):
     def update_debug_mode(self, context):
         data_structure.DEBUG_MODE = self.show_debug
 
+    def update_check_mutation(self, context):
+        data_structure.CHECK_MUTATION = self.check_input_mutation
+
+    def update_telemetry(self, context):
+        data_structure.TELEMETRY = self.telemetry
+        telemetry.set_memory_tracking(self.telemetry and self.telemetry_memory)
+
+    def update_telemetry_buffer_size(self, context):
+        telemetry.set_buffer_size(self.telemetry_buffer_size)
+
     def update_heat_map(self, context):
         data_structure.heat_map_state(self.heat_map)
 
+    def update_skip_unchanged(self, context):
+        data_structure.SKIP_UNCHANGED = self.skip_unchanged_nodes
+
+    def update_parallel_update(self, context):
+        data_structure.PARALLEL_UPDATE = self.parallel_update
+
+    def update_socket_cache_budget(self, context):
+        data_structure.SOCKET_CACHE_BUDGET = self.socket_cache_budget
+
+    def update_disk_cache(self, context):
+        data_structure.DISK_CACHE_PATH = self.disk_cache_path if self.use_disk_cache else ""
+
+    def update_disk_cache_size(self, context):
+        data_structure.DISK_CACHE_SIZE = self.disk_cache_size
+
     def set_frame_change(self, context):
         handlers.set_frame_change(self.frame_change_mode)
 
@@ -92,6 +117,30 @@ class SverchokPreferences(AddonPreferences):
         default=(0.8, 0.0, 0), subtype='COLOR',
         update=update_system.update_error_colors)
 
+    check_input_mutation: BoolProperty(
+        name="Check input mutation",
+        description="Report nodes which modify data of their input sockets (slows down updates)",
+        default=False,
+        update=update_check_mutation)
+
+    telemetry: BoolProperty(
+        name="Update telemetry",
+        description="Record processing time and output size of each node across updates",
+        default=False,
+        update=update_telemetry)
+
+    telemetry_memory: BoolProperty(
+        name="Track memory",
+        description="Record peak memory allocated by each node (slows down updates noticeably)",
+        default=False,
+        update=update_telemetry)
+
+    telemetry_buffer_size: IntProperty(
+        name="Records",
+        description="Maximum number of stored telemetry records",
+        default=10000, min=100,
+        update=update_telemetry_buffer_size)
+
     #  heat map settings
     heat_map: BoolProperty(
         name="Heat map",
@@ -109,6 +158,36 @@ class SverchokPreferences(AddonPreferences):
         size=3, min=0.0, max=1.0,
         default=(1, 1, 1), subtype='COLOR')
 
+    skip_unchanged_nodes: BoolProperty(
+        name="Skip unchanged nodes",
+        description="On partial updates, do not process nodes whose input data did not change",
+        default=False,
+        update=update_skip_unchanged)
+
+    parallel_update: BoolProperty(
+        name="Parallel update (experimental)",
+        description="Process independent nodes which release the GIL (numpy-heavy nodes) in several threads",
+        default=False,
+        update=update_parallel_update)
+
+    socket_cache_budget: IntProperty(
+        name="Socket cache budget, MB",
+        description="Maximum memory for cached socket data of one node tree; when exceeded, biggest outputs which are not read by viewer or output nodes are freed after update and recalculated when needed. 0 means no limit",
+        default=0, min=0,
+        update=update_socket_cache_budget)
+
+    use_disk_cache: BoolProperty(
+        name="Disk cache",
+        description="Store outputs of heavy nodes on disk and load them instead of recalculation when inputs and settings are the same",
+        default=False,
+        update=update_disk_cache)
+
+    disk_cache_size: IntProperty(
+        name="Disk cache size, MB",
+        description="Maximum size of files in the disk cache; when exceeded, least recently stored files are removed. 0 means no limit",
+        default=1024, min=0,
+        update=update_disk_cache_size)
+
     # Profiling settings
     profiling_sections = [
         ("NONE", "Disable", "Disable profiling", 0),
@@ -254,6 +333,12 @@ class SverchokPreferences(AddonPreferences):
 
     datafiles = os.path.join(bpy.utils.user_resource('DATAFILES', path='sverchok', create=True))
     defaults_location: StringProperty(default=datafiles, description='usually ..data_files\\sverchok\\defaults\\nodes.json')
+    disk_cache_path: StringProperty(
+        name="Disk cache path",
+        default=os.path.join(datafiles, "socket_cache"),
+        subtype='DIR_PATH',
+        description='directory where outputs of nodes are cached',
+        update=update_disk_cache)
     external_editor: StringProperty(description='which external app to invoke to view sources')
     real_sverchok_path: StringProperty(description='use with symlinked to get correct src->dst')
 
@@ -345,10 +430,28 @@ class SverchokPreferences(AddonPreferences):
             col2.row().prop(self, "frame_change_mode", expand=True)
             col2.separator()
 
+            update_box = col2.box()
+            update_box.label(text="Update system:")
+            update_box.prop(self, "skip_unchanged_nodes")
+            update_box.prop(self, "parallel_update")
+            update_box.prop(self, "socket_cache_budget")
+            update_box.prop(self, "use_disk_cache")
+            if self.use_disk_cache:
+                disk_cache_row = update_box.row(align=True)
+                disk_cache_row.prop(self, "disk_cache_path")
+                disk_cache_row.operator("node.sverchok_clear_disk_cache", text="", icon="TRASH")
+                update_box.prop(self, "disk_cache_size")
+
             col2box = col2.box()
             col2box.label(text="Debug:")
             col2box.prop(self, "profile_mode")
             col2box.prop(self, "show_debug")
+            col2box.prop(self, "check_input_mutation")
+            col2box.prop(self, "telemetry")
+            if self.telemetry:
+                telemetry_row = col2box.row()
+                telemetry_row.prop(self, "telemetry_memory")
+                telemetry_row.prop(self, "telemetry_buffer_size")
             col2box.prop(self, "heat_map")
             col2box.prop(self, "developer_mode")
 
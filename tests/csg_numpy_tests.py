@@ -0,0 +1,59 @@
+import numpy as np
+
+from sverchok.utils.testing import SverchokTestCase
+from sverchok.utils.csg_numpy import CSGPolygons, csg_union, csg_subtract, csg_intersect
+
+
+def box(x0, y0, z0, x1, y1, z1):
+    verts = [(x0, y0, z0), (x1, y0, z0), (x1, y1, z0), (x0, y1, z0),
+             (x0, y0, z1), (x1, y0, z1), (x1, y1, z1), (x0, y1, z1)]
+    faces = [[0, 3, 2, 1], [4, 5, 6, 7], [0, 1, 5, 4],
+             [1, 2, 6, 5], [2, 3, 7, 6], [3, 0, 4, 7]]
+    return CSGPolygons.from_pydata(verts, faces)
+
+
+def volume(verts, faces):
+    verts = np.array(verts)
+    result = 0.0
+    for face in faces:
+        a = verts[face[0]]
+        for b, c in zip(verts[face[1:-1]], verts[face[2:]]):
+            result += np.dot(a, np.cross(b, c)) / 6.0
+    return result
+
+
+class CSGNumpyTests(SverchokTestCase):
+    def setUp(self):
+        self.a = box(0, 0, 0, 2, 2, 2)
+        self.b = box(1, 1, 1, 3, 3, 3)
+
+    def test_intersect(self):
+        verts, faces = csg_intersect(self.a, self.b).to_pydata()
+        self.assertAlmostEqual(volume(verts, faces), 1.0)
+
+    def test_union(self):
+        verts, faces = csg_union(self.a, self.b).to_pydata()
+        self.assertAlmostEqual(volume(verts, faces), 15.0)
+
+    def test_subtract(self):
+        verts, faces = csg_subtract(self.a, self.b).to_pydata()
+        self.assertAlmostEqual(volume(verts, faces), 7.0)
+
+    def test_welding(self):
+        verts, faces = self.a.to_pydata()
+        self.assertEqual(len(verts), 8)
+        self.assertEqual(len(faces), 6)
+
+    def test_welding_tolerance(self):
+        verts = [(0, 0, 0), (1, 0, 0), (0, 1, 0), (1e-9, 1, 0), (1, 1, 0)]
+        polygons = CSGPolygons.from_pydata(verts, [[0, 1, 2], [1, 4, 3]])
+        self.assertEqual(len(polygons.to_pydata()[0]), 5)
+        self.assertEqual(len(polygons.to_pydata(tolerance=1e-6)[0]), 4)
+
+    def test_collinear_first_vertices(self):
+        # first three vertices of the face are on one line
+        verts = [(0, 0, 0), (1, 0, 0), (2, 0, 0), (2, 2, 0), (0, 2, 0)]
+        polygons = CSGPolygons.from_pydata(verts, [[0, 1, 2, 3, 4]])
+        self.assertEqual(len(polygons), 1)
+        self.assert_numpy_arrays_equal(polygons.normals[0], np.array([0.0, 0.0, 1.0]), precision=8)
+        self.assertAlmostEqual(polygons.ws[0], 0.0)
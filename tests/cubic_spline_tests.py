@@ -36,3 +36,25 @@ class CubicSplineTests(SverchokTestCase):
         )
         self.assert_numpy_arrays_equal(result, expected_result, precision=8)
 
+
+    def test_eval_derivatives(self):
+        t_in = np.array([0.0, 0.1, 0.4, 0.5, 0.7, 1.0])
+        first, second = self.spline.eval_derivatives(t_in, 2)
+        expected_first = np.array(
+             [[3.9486833,  3.31622777, 0.        ],
+             [3.80727547, 3.41814876, 0.        ],
+             [2.15320998, 4.61033172, 0.        ],
+             [1.97434165, 4.73925271, 0.        ],
+             [2.68981497, 4.22356872, 0.        ],
+             [3.9486833,  3.31622777, 0.        ]]
+        )
+        expected_second = np.array(
+             [[ 0.0,        0.0,        0.0 ],
+             [-2.82815662, 2.03841996, 0.0 ],
+             [-3.5773666,  2.57841996, 0.0 ],
+             [ 0.0,        0.0,        0.0 ],
+             [ 7.15473319, -5.15683992, 0.0 ],
+             [ 0.0,        0.0,        0.0 ]]
+        )
+        self.assert_numpy_arrays_equal(first, expected_first, precision=6)
+        self.assert_numpy_arrays_equal(second, expected_second, precision=6)
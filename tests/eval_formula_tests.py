@@ -0,0 +1,31 @@
+from sverchok.utils.testing import *
+from sverchok.utils.modules.eval_formula import get_variables, safe_eval, safe_eval_vectorized
+
+class EvalFormulaTests(SverchokTestCase):
+    def test_get_variables(self):
+        variables = get_variables("[x*g for g in lst] + sin(y)")
+        self.assertEquals(variables, {'x', 'lst', 'y'})
+
+    def check_vectorized(self, formula, variables):
+        count = len(list(variables.values())[0])
+        expected = [safe_eval(formula, {name: values[i] for name, values in variables.items()})
+                        for i in range(count)]
+        result = safe_eval_vectorized(formula, variables, count)
+        self.assertEquals(result, expected)
+        self.assertEquals([type(r) for r in result], [type(r) for r in expected])
+
+    def test_vectorized_floats(self):
+        self.check_vectorized("sin(x)*y + x**2", dict(x=[0.0, 0.5, 1.0], y=[1.0, 2.0, 3.0]))
+
+    def test_vectorized_ints(self):
+        self.check_vectorized("x*y + x // 2", dict(x=[1, 2, 3], y=[4, 5, 6]))
+
+    def test_vectorized_int_overflow(self):
+        self.check_vectorized("x*y", dict(x=[2**40, 2], y=[2**40, 3]))
+
+    def test_vectorized_condition(self):
+        self.check_vectorized("x if x > 0 else -x", dict(x=[-1.0, 2.0]))
+
+    def test_vectorized_vectors(self):
+        self.check_vectorized("x[0] + 1", dict(x=[[1, 2], [3, 4]]))
+
@@ -36,3 +36,13 @@ class LinearSplineTests(SverchokTestCase):
                  [-1, -1,  0]])
         self.assert_numpy_arrays_equal(result, expected_result)
 
+
+    def test_eval_derivatives(self):
+        t_in = np.array([-0.5, 0.0, 0.4, 1.0, 1.5])
+        first, second = self.spline.eval_derivatives(t_in, 2)
+        t_clamped = np.array([0.0, 0.0, 0.4, 1.0, 1.0])
+        expected_first = self.spline.eval_derivatives(t_clamped, 1)[0]
+        self.assert_numpy_arrays_equal(first, expected_first)
+        # derivative of each segment is collinear with the segment
+        self.assert_numpy_arrays_equal(np.cross(first, -self.spline.tangent(t_clamped)), np.zeros((5, 3)), precision=8)
+        self.assert_numpy_arrays_equal(second, np.zeros((5, 3)))
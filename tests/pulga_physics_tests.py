@@ -0,0 +1,34 @@
+import numpy as np
+
+from sverchok.utils.testing import SverchokTestCase
+from sverchok.utils.pulga_physics_core import grid_neighbour_indices, cross_indices3
+
+
+def close_pairs(verts, distance):
+    pairs = cross_indices3(len(verts))
+    dist = np.linalg.norm(verts[pairs[:, 0]] - verts[pairs[:, 1]], axis=1)
+    return {tuple(sorted(pair)) for pair in pairs[dist < distance].tolist()}
+
+
+class GridNeighbourTests(SverchokTestCase):
+    def check_close_pairs(self, verts, cell_size):
+        pairs = grid_neighbour_indices(verts, cell_size)
+        found = {tuple(sorted(pair)) for pair in pairs.tolist()}
+        self.assertEqual(len(found), len(pairs))
+        self.assertTrue(close_pairs(verts, cell_size) <= found)
+
+    def test_close_pairs(self):
+        verts = np.random.RandomState(0).rand(300, 3) * 10
+        self.check_close_pairs(verts, 0.7)
+
+    def test_zero_cell_size(self):
+        verts = np.random.RandomState(1).rand(20, 3)
+        pairs = grid_neighbour_indices(verts, 0.0)
+        self.assertEqual(len(pairs), 20 * 19 // 2)
+
+    def test_large_extent(self):
+        verts = np.array([[0, 0, 0], [0.5, 0, 0], [1e15, 1e15, 1e15], [1e15, 1e15, 1e15 + 0.5]])
+        self.check_close_pairs(verts, 1.0)
+
+    def test_single_particle(self):
+        self.assertEqual(len(grid_neighbour_indices(np.zeros((1, 3)), 1.0)), 0)
@@ -1,6 +1,8 @@
 
+import numpy as np
 from mathutils import Matrix
 from sverchok.core.socket_conversions import ImplicitConversionProhibited
+from sverchok.core.socket_data import get_output_socket_data, get_array_mode_report
 from sverchok.utils.testing import *
 from sverchok.utils.logging import debug, info, error
 
@@ -122,3 +124,53 @@ class SocketConversionTests(EmptyTreeTestCase):
                 finally:
                     self.tree.nodes.remove(node)
                     self.tree.nodes.remove(ngon)
+
+class ArrayModeTests(EmptyTreeTestCase):
+
+    def test_array_mode_boundaries(self):
+        """
+        Test that nodes in array mode get numpy arrays from list nodes,
+        and list nodes get lists from outputs in array mode.
+        """
+        ngon = create_node("SvNGonNode")
+        ngon.sides_ = 4
+        move = create_node("SvMoveNodeMk3")
+        join = create_node("SvMeshJoinNode")
+
+        self.tree.links.new(ngon.outputs['Vertices'], move.inputs['Vertices'])
+        self.tree.links.new(move.outputs['Vertices'], join.inputs['Vertices'])
+
+        ngon.process()
+        move_input = move.inputs['Vertices'].sv_get()
+        self.assertIsInstance(move_input[0], np.ndarray)
+        self.assertEqual(move_input[0].shape, (4, 3))
+
+        move.process()
+        join_input = join.inputs['Vertices'].sv_get()
+        self.assertIsInstance(join_input[0], list)
+        self.assert_sverchok_data_equal(join_input, [[list(v) for v in get_output_socket_data(ngon, 'Vertices')[0]]], precision=5)
+
+        report = get_array_mode_report(self.tree)
+        self.assertEqual(len(report), 2)
+
+    def test_array_mode_to_matrices(self):
+        """
+        Test that sockets of other types, which use implicit conversions,
+        get lists from outputs in array mode.
+        """
+        ngon = create_node("SvNGonNode")
+        ngon.sides_ = 4
+        move = create_node("SvMoveNodeMk3")
+        matrix_apply = create_node("MatrixApplyNode")
+
+        self.tree.links.new(ngon.outputs['Vertices'], move.inputs['Vertices'])
+        self.tree.links.new(move.outputs['Vertices'], matrix_apply.inputs['Matrixes'])
+
+        ngon.process()
+        move.process()
+        matrices = matrix_apply.inputs['Matrixes'].sv_get()
+        self.assertEqual(len(matrices), 4)
+        self.assertIsInstance(matrices[0], Matrix)
+        self.assert_sverchok_data_equal([m.translation[:] for m in matrices],
+                                        [v for v in get_output_socket_data(ngon, 'Vertices')[0]],
+                                        precision=5)
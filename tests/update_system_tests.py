@@ -3,8 +3,10 @@ import collections
 import unittest
 
 from sverchok.utils.testing import *
+from sverchok import data_structure
 from sverchok.utils.logging import debug, info
-from sverchok.core.update_system import make_dep_dict, make_update_list
+from sverchok.core.socket_data import get_output_socket_data
+from sverchok.core.update_system import make_dep_dict, make_update_list, make_update_waves, get_dep_dict, build_update_list, process_tree
 #from sverchok.tests.mocks import *
 
 class UpdateSystemTests(ReferenceTreeTestCase):
@@ -36,3 +38,58 @@ class UpdateSystemTests(ReferenceTreeTestCase):
                 dep_idx = result.index(dep)
                 self.assertTrue(dep_idx < node_idx)
 
+
+    def test_get_dep_dict(self):
+        tree = get_node_tree()
+        build_update_list(tree)
+        self.assertEqual(get_dep_dict(tree), make_dep_dict(tree))
+        self.assertEqual(get_dep_dict(tree, down=True), make_dep_dict(tree, down=True))
+        # Second call should return cached dictionary
+        self.assertIs(get_dep_dict(tree), get_dep_dict(tree))
+
+    def test_make_update_waves(self):
+        tree = get_node_tree()
+        deps = make_dep_dict(tree)
+        waves = make_update_waves([make_update_list(tree)], deps)
+
+        wave_index = {name: i for i, wave in enumerate(waves) for name in wave}
+        self.assertEqual(set(wave_index.keys()), set(tree.nodes.keys()))
+        # Each node should be in a later wave than all its dependencies.
+        for node, node_deps in deps.items():
+            for dep in node_deps:
+                self.assertTrue(wave_index[dep] < wave_index[node])
+
+
+class ProcessTreeTests(EmptyTreeTestCase):
+    """
+    Run complete updates of a small tree, so that each node
+    is processed through NodeProcessing.
+    """
+
+    def make_tree(self):
+        ngon = create_node("SvNGonNode")
+        ngon.sides_ = 4
+        move = create_node("SvMoveNodeMk3")
+        self.tree.links.new(ngon.outputs['Vertices'], move.inputs['Vertices'])
+        build_update_list(self.tree)
+        return move
+
+    def assert_processed(self, move):
+        self.assertNotIn("error nodes", self.tree)
+        verts = get_output_socket_data(move, 'Vertices')
+        self.assertEqual(len(verts[0]), 4)
+
+    def test_process_tree(self):
+        move = self.make_tree()
+        process_tree(self.tree)
+        self.assert_processed(move)
+
+    def test_process_tree_parallel(self):
+        move = self.make_tree()
+        parallel_update = data_structure.PARALLEL_UPDATE
+        data_structure.PARALLEL_UPDATE = True
+        try:
+            process_tree(self.tree)
+        finally:
+            data_structure.PARALLEL_UPDATE = parallel_update
+        self.assert_processed(move)
@@ -0,0 +1,39 @@
+import numpy as np
+
+from sverchok.utils.testing import SverchokTestCase
+from sverchok.utils.voronoi_numpy import Voronoi2D
+
+
+def triangle_keys(triangles):
+    rows = np.sort(triangles, axis=1)
+    return sorted(map(tuple, rows.tolist()))
+
+
+class Voronoi2DTests(SverchokTestCase):
+    def setUp(self):
+        self.sites = np.random.RandomState(0).rand(300, 2)
+
+    def test_square(self):
+        sites = np.array([[0, 0], [1, 0], [0, 1], [1, 1], [0.5, 0.5]])
+        diagram = Voronoi2D(sites)
+        self.assertEqual(len(diagram.triangles), 4)
+        self.assertEqual(len(diagram.edges), 4)
+        self.assertEqual(len(diagram.ray_starts), 4)
+
+    def test_collinear(self):
+        sites = np.array([[0, 0], [1, 0], [2, 0]])
+        diagram = Voronoi2D(sites)
+        self.assertEqual(len(diagram.triangles), 0)
+        self.assertEqual(len(diagram.line_points), 2)
+
+    def test_update_unchanged(self):
+        diagram = Voronoi2D(self.sites)
+        self.assertIs(diagram.update(self.sites.copy()), diagram)
+
+    def test_update(self):
+        diagram = Voronoi2D(self.sites)
+        sites = self.sites.copy()
+        sites[[3, 100, 200]] += [[0.02, -0.01], [0.1, 0.05], [-0.03, 0.2]]
+        updated = diagram.update(sites)
+        expected = Voronoi2D(sites)
+        self.assertEqual(triangle_keys(updated.triangles), triangle_keys(expected.triangles))
@@ -295,6 +295,11 @@ class SV_PT_ToolsMenu(bpy.types.Panel):
                 row.operator("node.sverchok_profile_save", text="Save data", icon="FILE_TICK")
                 profile_col.operator("node.sverchok_profile_reset", text="Reset data", icon="X")
 
+        if addon.preferences.telemetry:
+            telemetry_row = layout.row(align=True)
+            telemetry_row.operator("node.sverchok_telemetry_save", text="Save telemetry", icon="FILE_TICK")
+            telemetry_row.operator("node.sverchok_telemetry_reset", text="", icon="X")
+
     def draw_interaction_template(self, layout):
         col = box.column(align=True)
         row = col.row(align=True)
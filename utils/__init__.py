@@ -127,10 +127,10 @@ def app_handler_ops(append=None, remove=None):
 utils_modules = [
     # non UI tools
     "cad_module_class", "sv_bmesh_utils", "sv_stethoscope_helper", "sv_viewer_utils",
-    "sv_curve_utils", "voronoi", "sv_script", "sv_itertools", "script_importhelper", "sv_oldnodes_parser",
-    "csg_core", "csg_geom", "geom", "sv_easing_functions", "sv_text_io_common", "sv_obj_baker",
+    "sv_curve_utils", "voronoi", "voronoi_numpy", "sv_script", "sv_itertools", "script_importhelper", "sv_oldnodes_parser",
+    "csg_core", "csg_geom", "csg_numpy", "geom", "sv_easing_functions", "sv_text_io_common", "sv_obj_baker",
     "snlite_utils", "snlite_importhelper", "context_managers", "sv_node_utils", "sv_noise_utils",
-    "profile", "logging", "testing", "sv_requests", "sv_examples_utils", "sv_shader_sources",
+    "profile", "telemetry", "logging", "testing", "sv_requests", "sv_examples_utils", "sv_shader_sources",
     "avl_tree", "sv_nodeview_draw_helper", "sv_font_xml_parser", "exception_drawing_with_bgl",
     # UI text editor ui
     "text_editor_submenu", "text_editor_plugins",
@@ -0,0 +1,385 @@
+# This file is part of project Sverchok. It's copyrighted by the contributors
+# recorded in the version control history of the file, available from
+# its original location https://github.com/nortikin/sverchok/commit/master
+#
+# SPDX-License-Identifier: GPL3
+# License-Filename: LICENSE
+
+"""
+CSG boolean operations on meshes, with polygons stored in flat numpy arrays.
+
+This is the BSP algorithm of csg_core / csg_geom (by Evan Wallace), but
+each node of the BSP tree classifies and splits all polygons passed to it
+at once, instead of one CSGVertex / CSGPolygon object at a time. Trees are
+walked without recursion, so there is no need to raise the recursion limit.
+Vertices of the result are welded by hash of their quantized coordinates.
+"""
+
+from itertools import chain
+
+import numpy as np
+
+# tolerance used to decide if a point is on a plane (CSGPlane.EPSILON)
+PLANE_EPSILON = 1e-5
+
+COPLANAR = 0
+FRONT = 1
+BACK = 2
+SPANNING = 3
+
+
+def _starts(counts):
+    starts = np.zeros(len(counts), dtype=np.int64)
+    np.cumsum(counts[:-1], out=starts[1:])
+    return starts
+
+
+class CSGPolygons(object):
+    """
+    Set of convex polygons. Vertices of all polygons are stored in one array:
+    polygon i uses points[starts[i] : starts[i] + counts[i]]; its plane is
+    normals[i] . p = ws[i]. Tags are integers kept by polygons (and their
+    parts) through all operations.
+    """
+
+    def __init__(self, points, counts, normals, ws, tags=None):
+        self.points = points
+        self.counts = counts
+        self.starts = _starts(counts)
+        self.normals = normals
+        self.ws = ws
+        self.tags = np.zeros(len(counts), dtype=np.int64) if tags is None else tags
+
+    def __len__(self):
+        return len(self.counts)
+
+    @classmethod
+    def empty(cls):
+        return EMPTY
+
+    @classmethod
+    def from_pydata(cls, verts, faces):
+        """
+        Polygons of the mesh; faces with less than 3 vertices
+        and degenerate faces (with zero normal) are skipped.
+        """
+        verts = np.asarray(verts, dtype=np.float64).reshape((-1, 3))
+        faces = [face for face in faces if len(face) >= 3]
+        if not faces:
+            return EMPTY
+        counts = np.array([len(face) for face in faces], dtype=np.int64)
+        indices = np.fromiter(chain.from_iterable(faces), dtype=np.int64, count=counts.sum())
+        points = verts[indices]
+        starts = _starts(counts)
+        # Newell's normal, summed over all edges, so that polygons whose
+        # first vertices are collinear are not lost
+        next_loop = np.arange(1, len(points) + 1)
+        next_loop[starts + counts - 1] = starts
+        origins = np.repeat(points[starts], counts, axis=0)
+        normals = np.add.reduceat(np.cross(points - origins, points[next_loop] - origins), starts)
+        lengths = np.linalg.norm(normals, axis=1)
+        good = lengths > 0
+        normals = normals[good] / lengths[good][:, np.newaxis]
+        centers = np.add.reduceat(points, starts) / counts[:, np.newaxis]
+        ws = (normals * centers[good]).sum(axis=1)
+        points = points[np.repeat(good, counts)]
+        return CSGPolygons(points, counts[good], normals, ws)
+
+    def take(self, mask):
+        """polygons selected by boolean mask"""
+        if not mask.any():
+            return EMPTY
+        return CSGPolygons(self.points[np.repeat(mask, self.counts)], self.counts[mask],
+                           self.normals[mask], self.ws[mask], self.tags[mask])
+
+    def take_range(self, start, end):
+        """polygons from start to end - 1"""
+        if start == end:
+            return EMPTY
+        points_end = self.starts[end] if end < len(self) else len(self.points)
+        return CSGPolygons(self.points[self.starts[start] : points_end], self.counts[start:end],
+                           self.normals[start:end], self.ws[start:end], self.tags[start:end])
+
+    def grouped(self, keys, n_groups):
+        """
+        polygons sorted by integer keys from 0 to n_groups - 1,
+        and list of n_groups + 1 bounds of groups with equal keys
+        """
+        order = np.argsort(keys, kind='stable')
+        bounds = np.searchsorted(keys[order], np.arange(n_groups + 1)).tolist()
+        counts = self.counts[order]
+        index = np.repeat(self.starts[order] - _starts(counts), counts) + np.arange(len(self.points))
+        polygons = CSGPolygons(self.points[index], counts, self.normals[order], self.ws[order], self.tags[order])
+        return polygons, bounds
+
+    def with_tag(self, tag):
+        return CSGPolygons(self.points, self.counts, self.normals, self.ws, np.full(len(self), tag, dtype=np.int64))
+
+    @staticmethod
+    def concat(items):
+        items = [item for item in items if len(item)]
+        if not items:
+            return EMPTY
+        if len(items) == 1:
+            return items[0]
+        return CSGPolygons(np.concatenate([item.points for item in items]),
+                           np.concatenate([item.counts for item in items]),
+                           np.concatenate([item.normals for item in items]),
+                           np.concatenate([item.ws for item in items]),
+                           np.concatenate([item.tags for item in items]))
+
+    def flipped(self):
+        """the same polygons with reversed orientation"""
+        if not len(self):
+            return EMPTY
+        n = len(self.points)
+        index = np.repeat(2 * self.starts + self.counts - 1, self.counts) - np.arange(n)
+        return CSGPolygons(self.points[index], self.counts, -self.normals, -self.ws, self.tags)
+
+    def split(self, normal, w):
+        """
+        Split polygons by the plane normal . p = w.
+        Returns polygons which are coplanar with the plane and facing
+        the same direction, coplanar and facing the other direction,
+        polygons (and their parts) in front of and in back of the plane.
+        """
+        if not len(self):
+            return EMPTY, EMPTY, EMPTY, EMPTY
+        distances = self.points.dot(normal)
+        distances -= w
+        # whole set is on one side, which is the usual case deep in the tree
+        if distances.max() < -PLANE_EPSILON:
+            return EMPTY, EMPTY, EMPTY, self
+        if distances.min() > PLANE_EPSILON:
+            return EMPTY, EMPTY, self, EMPTY
+        types = (distances > PLANE_EPSILON).view(np.int8) | ((distances < -PLANE_EPSILON).view(np.int8) << 1)
+        polygon_types = np.bitwise_or.reduceat(types, self.starts)
+
+        coplanar = polygon_types == COPLANAR
+        facing = self.normals.dot(normal) > 0
+        coplanar_front = self.take(coplanar & facing)
+        coplanar_back = self.take(coplanar & ~facing)
+        front = self.take(polygon_types == FRONT)
+        back = self.take(polygon_types == BACK)
+
+        spanning = polygon_types == SPANNING
+        if spanning.any():
+            loops = np.repeat(spanning, self.counts)
+            front_parts, back_parts = self.take(spanning)._split_spanning(types[loops], normal, w)
+            front = CSGPolygons.concat([front, front_parts])
+            back = CSGPolygons.concat([back, back_parts])
+        return coplanar_front, coplanar_back, front, back
+
+    def _split_spanning(self, types, normal, w):
+        points = self.points
+        n = len(points)
+        next_loop = np.arange(1, n + 1)
+        next_loop[self.starts + self.counts - 1] = self.starts
+        next_types = types[next_loop]
+        crossing = (types | next_types) == SPANNING
+
+        vi = points[crossing]
+        vj = points[next_loop][crossing]
+        direction = vj - vi
+        t = (w - vi.dot(normal)) / direction.dot(normal)
+        intersections = vi + direction * t[:, np.newaxis]
+
+        def side(keep):
+            # each loop gives its vertex (if it is kept on this side),
+            # then the intersection point (if its edge crosses the plane)
+            n_out = keep.astype(np.int64) + crossing
+            offsets = np.cumsum(n_out) - n_out
+            out = np.empty((n_out.sum(), 3))
+            out[offsets[keep]] = points[keep]
+            out[offsets[crossing] + keep[crossing]] = intersections
+            counts = np.add.reduceat(n_out, self.starts)
+            good = counts >= 3
+            return CSGPolygons(out[np.repeat(good, counts)], counts[good],
+                               self.normals[good], self.ws[good], self.tags[good])
+
+        return side(types != BACK), side(types != FRONT)
+
+    def to_pydata(self, tolerance=0.0):
+        """
+        Vertices and faces of the mesh made of polygons. Vertices are
+        welded by hash of their coordinates, quantized to tolerance
+        (exact coordinates are compared if tolerance is 0); vertices are
+        ordered by their first appearance in polygons.
+        """
+        if not len(self):
+            return [], []
+        points = self.points
+        if tolerance > 0:
+            keys = np.round(points / tolerance).astype(np.int64)
+        else:
+            keys = points + 0.0  # -0.0 -> 0.0
+        keys = np.ascontiguousarray(keys)
+        keys = keys.view(np.dtype((np.void, keys.dtype.itemsize * 3))).ravel()
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        order = np.argsort(first)
+        rank = np.empty(len(first), dtype=np.int64)
+        rank[order] = np.arange(len(first))
+        verts = points[first[order]]
+        indices = rank[inverse.ravel()]
+
+        # edges collapsed by welding
+        next_loop = np.arange(1, len(indices) + 1)
+        next_loop[self.starts + self.counts - 1] = self.starts
+        keep = indices != indices[next_loop]
+        counts = np.add.reduceat(keep.astype(np.int64), self.starts)
+        good = counts >= 3
+        indices = indices[keep & np.repeat(good, self.counts)].tolist()
+        faces = []
+        start = 0
+        for count in counts[good].tolist():
+            faces.append(indices[start : start + count])
+            start += count
+        used = np.unique(indices)
+        if len(used) < len(verts):
+            # vertices of dropped polygons only
+            remap = np.full(len(verts), -1, dtype=np.int64)
+            remap[used] = np.arange(len(used))
+            verts = verts[used]
+            faces = [remap[face].tolist() for face in faces]
+        return verts.tolist(), faces
+
+
+EMPTY = CSGPolygons(np.empty((0, 3)), np.empty(0, dtype=np.int64), np.empty((0, 3)), np.empty(0))
+
+
+class CSGNode(object):
+    """
+    Node of a BSP tree: splitting plane, polygons lying in this plane
+    and subtrees in front of and in back of the plane.
+    """
+
+    def __init__(self, polygons=None):
+        self.normal = None
+        self.w = None
+        self.front = None
+        self.back = None
+        self.polygons = EMPTY
+        if polygons is not None:
+            self.build(polygons)
+
+    def nodes(self):
+        """all nodes of the tree, parents before children, front before back"""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            if node.back:
+                stack.append(node.back)
+            if node.front:
+                stack.append(node.front)
+
+    def invert(self):
+        """Convert solid space to empty space and empty space to solid space."""
+        for node in list(self.nodes()):
+            node.polygons = node.polygons.flipped()
+            if node.normal is not None:
+                node.normal = -node.normal
+                node.w = -node.w
+            node.front, node.back = node.back, node.front
+
+    def _clip_step(self, polygons, stack, result):
+        coplanar_front, coplanar_back, front, back = polygons.split(self.normal, self.w)
+        front = CSGPolygons.concat([coplanar_front, front])
+        back = CSGPolygons.concat([coplanar_back, back])
+        if self.back and len(back):
+            stack.append((self.back, back))
+        if self.front:
+            if len(front):
+                stack.append((self.front, front))
+        else:
+            result.append(front)
+
+    def clip_polygons(self, polygons):
+        """Remove all parts of polygons that are inside this BSP tree."""
+        result = []
+        stack = [(self, polygons)]
+        while stack:
+            node, polygons = stack.pop()
+            if node.normal is None:
+                result.append(polygons)
+            else:
+                node._clip_step(polygons, stack, result)
+        return CSGPolygons.concat(result)
+
+    def clip_to(self, bsp):
+        """Remove all polygons in this BSP tree that are inside the other BSP tree."""
+        # polygons of all nodes are clipped at once, tagged by their node
+        nodes = list(self.nodes())
+        polygons = CSGPolygons.concat([node.polygons.with_tag(i) for i, node in enumerate(nodes)])
+        polygons = bsp.clip_polygons(polygons)
+        polygons, bounds = polygons.grouped(polygons.tags, len(nodes))
+        for i, node in enumerate(nodes):
+            node.polygons = polygons.take_range(bounds[i], bounds[i + 1])
+
+    def all_polygons(self):
+        return CSGPolygons.concat([node.polygons for node in self.nodes()])
+
+    def _build_step(self, polygons, stack):
+        if self.normal is None:
+            self.normal = polygons.normals[0]
+            self.w = polygons.ws[0]
+        coplanar_front, coplanar_back, front, back = polygons.split(self.normal, self.w)
+        self.polygons = CSGPolygons.concat([self.polygons, coplanar_front, coplanar_back])
+        if len(front):
+            if not self.front:
+                self.front = CSGNode()
+            stack.append((self.front, front))
+        if len(back):
+            if not self.back:
+                self.back = CSGNode()
+            stack.append((self.back, back))
+
+    def build(self, polygons):
+        """Add polygons to the tree, splitting them by planes of its nodes."""
+        stack = [(self, polygons)]
+        while stack:
+            node, polygons = stack.pop()
+            if len(polygons):
+                node._build_step(polygons, stack)
+
+
+def csg_union(a, b):
+    """union of two solids given as CSGPolygons"""
+    a = CSGNode(a)
+    b = CSGNode(b)
+    a.clip_to(b)
+    b.clip_to(a)
+    b.invert()
+    b.clip_to(a)
+    b.invert()
+    a.build(b.all_polygons())
+    return a.all_polygons()
+
+
+def csg_subtract(a, b):
+    """solid a with solid b cut out of it"""
+    a = CSGNode(a)
+    b = CSGNode(b)
+    a.invert()
+    a.clip_to(b)
+    b.clip_to(a)
+    b.invert()
+    b.clip_to(a)
+    b.invert()
+    a.build(b.all_polygons())
+    a.invert()
+    return a.all_polygons()
+
+
+def csg_intersect(a, b):
+    """intersection of two solids"""
+    a = CSGNode(a)
+    b = CSGNode(b)
+    a.invert()
+    b.clip_to(a)
+    b.invert()
+    a.clip_to(b)
+    b.clip_to(a)
+    a.build(b.all_polygons())
+    a.invert()
+    return a.all_polygons()
@@ -26,6 +26,12 @@ def make_euclidian_ts(pts):
     return tknots
 
 class SvCurve(object):
+    # Curves which can calculate their derivatives exactly set this to True
+    # and override points_and_derivatives_array().
+    has_analytic_derivatives = False
+    # maximum number of arc-length tables cached by get_length_solver()
+    max_cached_length_solvers = 8
+
     def __repr__(self):
         if hasattr(self, '__description__'):
             description = self.__description__
@@ -52,7 +58,19 @@ class SvCurve(object):
         v_h = self.evaluate(t+h)
         return (v_h - v) / h
 
+    def points_and_derivatives_array(self, n, ts):
+        """
+        Calculate points of the curve together with first n derivatives.
+        Returns list of n+1 arrays of shape (len(ts), 3):
+        points, first derivatives, second derivatives...
+        Curves with has_analytic_derivatives do this in one vectorized pass;
+        by default derivatives are calculated by finite differences.
+        """
+        return [self.evaluate_array(ts)] + self.derivatives_array(n, ts)
+
     def tangent_array(self, ts):
+        if self.has_analytic_derivatives:
+            return self.points_and_derivatives_array(1, ts)[1]
         vs = self.evaluate_array(ts)
         h = self.tangent_delta
         u_max = self.get_u_bounds()[1]
@@ -81,6 +99,8 @@ class SvCurve(object):
         return (v2 - 2*v1 + v0) / (h * h)
 
     def second_derivative_array(self, ts):
+        if self.has_analytic_derivatives:
+            return self.points_and_derivatives_array(2, ts)[2]
         h = 0.001
         v0s = self.evaluate_array(ts-h)
         v1s = self.evaluate_array(ts)
@@ -88,6 +108,8 @@ class SvCurve(object):
         return (v2s - 2*v1s + v0s) / (h * h)
 
     def third_derivative_array(self, ts):
+        if self.has_analytic_derivatives:
+            return self.points_and_derivatives_array(3, ts)[3]
         h = 0.001
         v0s = self.evaluate_array(ts)
         v1s = self.evaluate_array(ts+h)
@@ -96,6 +118,8 @@ class SvCurve(object):
         return (- v0s + 3*v1s - 3*v2s + v3s) / (h * h * h)
 
     def derivatives_array(self, n, ts):
+        if self.has_analytic_derivatives:
+            return self.points_and_derivatives_array(n, ts)[1:]
         result = []
         if n >= 1:
             first = self.tangent_array(ts)
@@ -168,19 +192,36 @@ class SvCurve(object):
             normals[nonzero] = normals[nonzero] / norms[nonzero][:,0][np.newaxis].T
         return tangents, normals, binormals
 
-    def frame_array(self, ts):
-        tangents, normals, binormals = self.tangent_normal_binormal_array(ts)
-        tangents = tangents / np.linalg.norm(tangents, axis=1)[np.newaxis].T
-        matrices_np = np.dstack((normals, binormals, tangents))
-        matrices_np = np.transpose(matrices_np, axes=(0,2,1))
-        try:
-            matrices_np = np.linalg.inv(matrices_np)
-            return matrices_np, normals, binormals
-        except np.linalg.LinAlgError as e:
-            error("Some of matrices are singular:")
-            for m in matrices_np:
-                error("M:\n%s", m)
-            raise e
+    def frame_array(self, ts, out=None):
+        """
+        Calculate Frenet frames of the curve at points ts.
+        Returns tuple (matrices, normals, binormals), where matrices
+        is an array of shape (n, 3, 3) with normal, binormal and tangent
+        in columns. The frames are orthonormal, so they are built
+        directly instead of inverting matrices.
+        out: optional preallocated array of shape (n, 3, 3) to write
+        matrices into; in this case normals and binormals are views into it.
+        """
+        n = len(ts)
+        if out is None:
+            out = np.empty((n, 3, 3))
+        elif out.shape != (n, 3, 3):
+            raise ValueError("Output buffer must have shape {}, got {}".format((n, 3, 3), out.shape))
+
+        tangents, seconds = self.derivatives_array(2, ts)
+        tangents = tangents / np.linalg.norm(tangents, axis=1, keepdims=True)
+        binormals = np.cross(tangents, seconds)
+        norms = np.linalg.norm(binormals, axis=1, keepdims=True)
+        singular = norms[:,0] == 0
+        if singular.any():
+            error("Some of matrices are singular (zero curvature at t = %s)", ts[singular])
+            raise np.linalg.LinAlgError("Singular matrix")
+        binormals /= norms
+
+        out[:,:,0] = np.cross(binormals, tangents)
+        out[:,:,1] = binormals
+        out[:,:,2] = tangents
+        return out, out[:,:,0], out[:,:,1]
 
     def curvature_array(self, ts):
         tangents, seconds = self.derivatives_array(2, ts)
@@ -215,7 +256,27 @@ class SvCurve(object):
     def get_u_bounds(self):
         raise Exception("not implemented!")
 
+    def get_length_solver(self, mode='SPL', resolution=50, tolerance=None):
+        """
+        SvCurveLengthSolver prepared for this curve.
+        Solvers are cached in the curve object, so all nodes which
+        use the same curve share one arc-length table.
+        """
+        key = (mode, resolution, tolerance)
+        solvers = self.__dict__.setdefault('_length_solvers', dict())
+        solver = solvers.get(key)
+        if solver is None:
+            solver = SvCurveLengthSolver(self)
+            solver.prepare(mode, resolution, tolerance)
+            if len(solvers) >= self.max_cached_length_solvers:
+                solvers.clear()
+            solvers[key] = solver
+        return solver
+
 class SvCurveLengthSolver(object):
+    # maximum number of refinement passes in prepare()
+    max_refine_iterations = 10
+
     def __init__(self, curve):
         self.curve = curve
         self._spline = None
@@ -225,15 +286,42 @@ class SvCurveLengthSolver(object):
         dvs = vectors[1:] - vectors[:-1]
         lengths = np.linalg.norm(dvs, axis=1)
         return lengths
+
+    def _refine_tknots(self, tknots, tolerance):
+        """
+        Subdivide segments of the table, for which chord length differs
+        from length of two half-chords by more than tolerance.
+        """
+        points = self.curve.evaluate_array(tknots)
+        for i in range(self.max_refine_iterations):
+            middle_ts = (tknots[1:] + tknots[:-1]) / 2.0
+            middle_points = self.curve.evaluate_array(middle_ts)
+            chords = np.linalg.norm(points[1:] - points[:-1], axis=1)
+            halves = np.linalg.norm(middle_points - points[:-1], axis=1) + np.linalg.norm(points[1:] - middle_points, axis=1)
+            bad = (halves - chords) > tolerance
+            if not bad.any():
+                break
+            indexes = np.where(bad)[0] + 1
+            tknots = np.insert(tknots, indexes, middle_ts[bad])
+            points = np.insert(points, indexes, middle_points[bad], axis=0)
+        return tknots
     
     def get_total_length(self):
         if self._spline is None:
             raise Exception("You have to call solver.prepare() first")
         return self._length_params[-1]
 
-    def prepare(self, mode, resolution=50):
+    def prepare(self, mode, resolution=50, tolerance=None):
+        """
+        Build arc-length table of the curve.
+        resolution: initial number of samples.
+        tolerance: if specified, the table is adaptively refined until
+            length of each segment is calculated with this tolerance.
+        """
         t_min, t_max = self.curve.get_u_bounds()
         tknots = np.linspace(t_min, t_max, num=resolution)
+        if tolerance is not None:
+            tknots = self._refine_tknots(tknots, tolerance)
         lengths = self.calc_length_segments(tknots)
         self._length_params = np.cumsum(np.insert(lengths, 0, 0))
         self._spline = self._make_spline(mode, tknots)
@@ -287,19 +375,23 @@ class SvConcatCurve(SvCurve):
             self.u_max = self.ranges.sum()
             self.min_bounds = np.insert(np.cumsum(self.ranges), 0, 0)
         self.tangent_delta = 0.001
+        self.has_analytic_derivatives = all(curve.has_analytic_derivatives for curve in curves)
         self.__description__ = "Concat{}".format(curves)
 
     def get_u_bounds(self):
         return (0.0, self.u_max)
 
-    def _get_ts_grouped(self, ts):
+    def _get_segment_ts(self, ts):
         index = self.min_bounds.searchsorted(ts, side='left') - 1
         index = index.clip(0, len(self.curves) - 1)
-        left_bounds = self.min_bounds[index]
-        curve_left_bounds = self.src_min_bounds[index]
-        dts = ts - left_bounds + curve_left_bounds
+        dts = ts - self.min_bounds[index]
         if self.scale_to_unit:
             dts = dts * self.ranges[index]
+        dts = dts + self.src_min_bounds[index]
+        return index, dts
+
+    def _get_ts_grouped(self, ts):
+        index, dts = self._get_segment_ts(ts)
         #dts_grouped = np.split(dts, np.cumsum(np.unique(index, return_counts=True)[1])[:-1])
         # TODO: this should be vectorized somehow
         dts_grouped = []
@@ -337,25 +429,45 @@ class SvConcatCurve(SvCurve):
         points_grouped = [self.curves[i].evaluate_array(np.array(dts)) for i, dts in dts_grouped]
         return np.concatenate(points_grouped)
 
+    def points_and_derivatives_array(self, n, ts):
+        index, dts = self._get_segment_ts(ts)
+        result = [np.empty((len(ts), 3)) for i in range(n+1)]
+        for i in np.unique(index):
+            mask = index == i
+            values = self.curves[i].points_and_derivatives_array(n, dts[mask])
+            for k, value in enumerate(values):
+                if self.scale_to_unit and k > 0:
+                    value = value * self.ranges[i] ** k
+                result[k][mask] = value
+        return result
+
     def tangent(self, t):
         return self.tangent_array(np.array([t]))[0]
 
     def tangent_array(self, ts):
+        if self.has_analytic_derivatives:
+            return self.points_and_derivatives_array(1, ts)[1]
         dts_grouped = self._get_ts_grouped(ts)
         tangents_grouped = [self.curves[i].tangent_array(np.array(dts)) for i, dts in dts_grouped]
         return np.concatenate(tangents_grouped)
 
     def second_derivative_array(self, ts):
+        if self.has_analytic_derivatives:
+            return self.points_and_derivatives_array(2, ts)[2]
         dts_grouped = self._get_ts_grouped(ts)
         vectors = [self.curves[i].second_derivative_array(np.array(dts)) for i, dts in dts_grouped]
         return np.concatenate(vectors)
 
     def third_derivative_array(self, ts):
+        if self.has_analytic_derivatives:
+            return self.points_and_derivatives_array(3, ts)[3]
         dts_grouped = self._get_ts_grouped(ts)
         vectors = [self.curves[i].third_derivative_array(np.array(dts)) for i, dts in dts_grouped]
         return np.concatenate(vectors)
 
     def derivatives_array(self, n, ts):
+        if self.has_analytic_derivatives:
+            return self.points_and_derivatives_array(n, ts)[1:]
         dts_grouped = self._get_ts_grouped(ts)
         derivs = [self.curves[i].derivatives_array(n, np.array(dts)) for i, dts in dts_grouped]
         result = []
@@ -419,6 +531,7 @@ class SvCurveSegment(SvCurve):
             self.tangent_delta = curve.tangent_delta
         else:
             self.tangent_delta = 0.001
+        self.has_analytic_derivatives = curve.has_analytic_derivatives
         self.rescale = rescale
         if self.rescale:
             self.u_bounds = (0.0, 1.0)
@@ -435,6 +548,14 @@ class SvCurveSegment(SvCurve):
     def get_u_bounds(self):
         return self.u_bounds
 
+    def _get_scale(self):
+        # d/dt of mapping from segment parameter to parameter of original curve
+        if self.rescale:
+            m,M = self.target_u_bounds
+            return M - m
+        else:
+            return 1.0
+
     def evaluate(self, t):
         if self.rescale:
             m,M = self.target_u_bounds
@@ -447,38 +568,48 @@ class SvCurveSegment(SvCurve):
             ts = (M - m)*ts + m
         return self.curve.evaluate_array(ts)
 
+    def points_and_derivatives_array(self, n, ts):
+        if self.rescale:
+            m,M = self.target_u_bounds
+            ts = (M - m)*ts + m
+        values = self.curve.points_and_derivatives_array(n, ts)
+        scale = self._get_scale()
+        return [value * scale**k if k > 0 else value for k, value in enumerate(values)]
+
     def tangent(self, t):
         if self.rescale:
             m,M = self.target_u_bounds
             t = (M - m)*t + m
-        return self.curve.tangent(t)
+        return self._get_scale() * self.curve.tangent(t)
         
     def tangent_array(self, ts):
         if self.rescale:
             m,M = self.target_u_bounds
             ts = (M - m)*ts + m
-        return self.curve.tangent_array(ts)
+        return self._get_scale() * self.curve.tangent_array(ts)
 
     def second_derivative_array(self, ts):
         if self.rescale:
             m,M = self.target_u_bounds
             ts = (M - m)*ts + m
-        return self.curve.second_derivative_array(ts)
+        return self._get_scale()**2 * self.curve.second_derivative_array(ts)
 
     def third_derivative_array(self, ts):
         if self.rescale:
             m,M = self.target_u_bounds
             ts = (M - m)*ts + m
-        return self.curve.third_derivative_array(ts)
+        return self._get_scale()**3 * self.curve.third_derivative_array(ts)
 
-    def derivatives_array(self, ts):
+    def derivatives_array(self, n, ts):
         if self.rescale:
             m,M = self.target_u_bounds
             ts = (M - m)*ts + m
-        return self.curve.derivatives_array(ts)
+        scale = self._get_scale()
+        return [scale**(k+1) * value for k, value in enumerate(self.curve.derivatives_array(n, ts))]
 
 class SvLine(SvCurve):
     __description__ = "Line"
+    has_analytic_derivatives = True
 
     def __init__(self, point, direction):
         self.point = np.array(point)
@@ -512,8 +643,18 @@ class SvLine(SvCurve):
         result = np.tile(tangent[np.newaxis].T, len(ts)).T
         return result
 
+    def points_and_derivatives_array(self, n, ts):
+        points = self.evaluate_array(ts)
+        result = [points]
+        if n >= 1:
+            result.append(np.broadcast_to(self.direction, points.shape).copy())
+        for i in range(1, n):
+            result.append(np.zeros_like(points))
+        return result
+
 class SvCircle(SvCurve):
     __description__ = "Circle"
+    has_analytic_derivatives = True
 
     def __init__(self, matrix, radius):
         self.matrix = np.array(matrix.to_3x3())
@@ -536,7 +677,7 @@ class SvCircle(SvCurve):
         ys = r * np.sin(ts)
         zs = np.zeros_like(xs)
         vertices = np.stack((xs, ys, zs)).T
-        return np.apply_along_axis(lambda v: self.matrix @ v, 1, vertices) + self.center
+        return vertices @ self.matrix.T + self.center
 
     def tangent(self, t):
         x = - self.radius * sin(t)
@@ -549,15 +690,24 @@ class SvCircle(SvCurve):
         ys = self.radius * np.cos(ts)
         zs = np.zeros_like(xs)
         vectors = np.stack((xs, ys, zs)).T
-        result = np.apply_along_axis(lambda v: self.matrix @ v, 1, vectors)
-        return result
+        return vectors @ self.matrix.T
 
-#     def second_derivative_array(self, ts):
-#         xs = - np.cos(ts)
-#         ys = - np.sin(ts)
-#         zs = np.zeros_like(xs)
-#         vectors = np.stack((xs, ys, zs)).T
-#         return np.apply_along_axis(lambda v: self.matrix @ v, 1, vectors)
+    def points_and_derivatives_array(self, n, ts):
+        r = self.radius
+        coss = np.cos(ts)
+        sins = np.sin(ts)
+        zs = np.zeros_like(ts)
+        # k-th derivative of (cos t, sin t) is (cos(t + k*pi/2), sin(t + k*pi/2)),
+        # so it cycles through (cos, sin), (-sin, cos), (-cos, -sin), (sin, -cos)
+        cycle = [(coss, sins), (-sins, coss), (-coss, -sins), (sins, -coss)]
+        result = []
+        for k in range(n+1):
+            xs, ys = cycle[k % 4]
+            vectors = r * np.stack((xs, ys, zs)).T @ self.matrix.T
+            if k == 0:
+                vectors = vectors + self.center
+            result.append(vectors)
+        return result
 
 class SvLambdaCurve(SvCurve):
     __description__ = "Formula"
@@ -592,6 +742,7 @@ class SvLambdaCurve(SvCurve):
 
 class SvSplineCurve(SvCurve):
     __description__ = "Spline"
+    has_analytic_derivatives = True
 
     def __init__(self, spline):
         self.spline = spline
@@ -606,11 +757,17 @@ class SvSplineCurve(SvCurve):
         return np.array(vs)
 
     def tangent(self, t):
-        vs = self.spline.tangent(np.array([t]))
-        return vs[0]
+        return self.tangent_array(np.array([t]))[0]
 
     def tangent_array(self, ts):
-        return self.spline.tangent(ts)
+        # Exact derivative of the spline. For linear splines this is the
+        # segment vector divided by the segment's span of t; it is not
+        # the reversed segment vector given by LinearSpline.tangent().
+        return self.spline.eval_derivatives(ts, 1)[0]
+
+    def points_and_derivatives_array(self, n, ts):
+        points = self.spline.eval(ts)
+        return [points] + self.spline.eval_derivatives(ts, n)
 
     def get_u_bounds(self):
         return self.u_bounds
@@ -814,16 +971,16 @@ class SvIsoUvCurve(SvCurve):
             return self.surface.evaluate_array(ts, np.repeat(self.value, len(ts)))
 
 class SvLengthRebuiltCurve(SvCurve):
-    def __init__(self, curve, resolution, mode='SPL'):
+    def __init__(self, curve, resolution, mode='SPL', tolerance=None):
         self.curve = curve
         self.resolution = resolution
+        self.tolerance = tolerance
         if hasattr(curve, 'tangent_delta'):
             self.tangent_delta = curve.tangent_delta
         else:
             self.tangent_delta = 0.001
         self.mode = mode
-        self.solver = SvCurveLengthSolver(curve)
-        self.solver.prepare(self.mode, resolution)
+        self.solver = curve.get_length_solver(mode, resolution, tolerance)
         self.u_bounds = (0.0, self.solver.get_total_length())
         self.__description__ = "{} rebuilt".format(curve)
 
@@ -0,0 +1,108 @@
+# This file is part of project Sverchok. It's copyrighted by the contributors
+# recorded in the version control history of the file, available from
+# its original location https://github.com/nortikin/sverchok/commit/master
+#
+# SPDX-License-Identifier: GPL3
+# License-Filename: LICENSE
+
+"""
+Evaluation of fields by blocks of points.
+
+Fields which are built of other fields (binary operations, compositions
+and so on) evaluate their sub-fields by blocks of FIELD_CHUNK_SIZE points.
+Sub-fields are then called with arrays of at most that size, so temporary
+arrays of the whole chain of fields take memory proportional to the
+block size instead of the number of points.
+
+While a block is evaluated, results of sub-fields are remembered
+(see evaluate_grid_shared), so a field object which is used in several
+branches of a tree of fields is evaluated only once per block.
+"""
+
+import threading
+
+import numpy as np
+
+# number of points evaluated at once
+FIELD_CHUNK_SIZE = 65536
+
+# per-thread state; _local.block_results holds results of fields
+# evaluated for the current block of points:
+# (id(field), id(xs), id(ys), id(zs)) -> ((field, xs, ys, zs), result);
+# None when no block is being evaluated in this thread
+_local = threading.local()
+
+def _get_block_results():
+    return getattr(_local, 'block_results', None)
+
+def evaluate_grid_shared(field, xs, ys, zs):
+    """
+    field.evaluate_grid(xs, ys, zs). While a block of points is evaluated
+    by evaluate_chunked, the result is remembered and returned for following
+    calls with the same field and the same arrays. Returned arrays must not
+    be modified in place.
+    """
+    block_results = _get_block_results()
+    if block_results is None:
+        return field.evaluate_grid(xs, ys, zs)
+    key = (id(field), id(xs), id(ys), id(zs))
+    item = block_results.get(key)
+    if item is not None:
+        return item[1]
+    result = field.evaluate_grid(xs, ys, zs)
+    # keep references to arguments, so that their ids are not reused
+    block_results[key] = ((field, xs, ys, zs), result)
+    return result
+
+def evaluate_chunked(function, xs, ys, zs, n_outputs, chunk_size=None):
+    """
+    Evaluate function(xs, ys, zs) by blocks of chunk_size points
+    (FIELD_CHUNK_SIZE by default) and collect results into arrays of
+    the same shape as xs. The function gets 1D arrays.
+
+    n_outputs: 1 if function returns one array (scalar fields),
+        3 if it returns tuple of 3 arrays (vector fields).
+    """
+    if _get_block_results() is not None:
+        # called from a field which is evaluated by blocks already
+        if np.ndim(xs) == 1 and np.shape(xs) == np.shape(ys) == np.shape(zs) and len(xs) <= (chunk_size or FIELD_CHUNK_SIZE):
+            # pass the same arrays, so that evaluate_grid_shared can recognize them
+            return function(xs, ys, zs)
+        return _evaluate_chunks(function, xs, ys, zs, n_outputs, chunk_size, False)
+    _local.block_results = {}
+    try:
+        return _evaluate_chunks(function, xs, ys, zs, n_outputs, chunk_size, True)
+    finally:
+        _local.block_results = None
+
+def _evaluate_chunks(function, xs, ys, zs, n_outputs, chunk_size, outermost):
+    if chunk_size is None:
+        chunk_size = FIELD_CHUNK_SIZE
+    xs, ys, zs = np.broadcast_arrays(xs, ys, zs)
+    shape = xs.shape
+    xs, ys, zs = xs.ravel(), ys.ravel(), zs.ravel()
+    n = len(xs)
+
+    if n <= chunk_size:
+        result = function(xs, ys, zs)
+        if n_outputs == 1:
+            return np.reshape(result, shape)
+        return tuple(np.reshape(r, shape) for r in result)
+
+    results = None
+    for start in range(0, n, chunk_size):
+        end = start + chunk_size
+        block = function(xs[start:end], ys[start:end], zs[start:end])
+        if n_outputs == 1:
+            block = (block,)
+        if results is None:
+            results = [np.empty(n, dtype=np.promote_types(np.asarray(r).dtype, np.float64)) for r in block]
+        for result, r in zip(results, block):
+            result[start:end] = r
+        if outermost:
+            _local.block_results.clear()
+
+    results = [result.reshape(shape) for result in results]
+    if n_outputs == 1:
+        return results[0]
+    return tuple(results)
@@ -9,11 +9,12 @@ import numpy as np
 from math import copysign, sqrt, sin, cos, atan2, acos, pi
 
 from mathutils import Matrix, Vector
-from mathutils import kdtree
-from mathutils import bvhtree
 
 from sverchok.utils.math import from_cylindrical, from_spherical, to_cylindrical, to_spherical
 from sverchok.utils.geom import LineEquation, CircleEquation3D
+from sverchok.utils.sv_KDT_utils import SvKdTree
+from sverchok.utils.sv_bvh_utils import get_bvh, bvh_find_nearest
+from sverchok.utils.field.chunked import evaluate_chunked, evaluate_grid_shared
 
 ##################
 #                #
@@ -36,6 +37,13 @@ class SvScalarField(object):
     def evaluate_grid(self, xs, ys, zs):
         raise Exception("not implemented")
 
+    def evaluate_grid_chunked(self, xs, ys, zs, chunk_size=None):
+        """
+        Same as evaluate_grid, but points are processed by blocks
+        of chunk_size points, to limit memory used by temporary arrays.
+        """
+        return evaluate_chunked(self.evaluate_grid, xs, ys, zs, 1, chunk_size)
+
     def gradient(self, point, step=0.001):
         x, y, z = point
         v_dx_plus = self.evaluate(x+step,y,z)
@@ -51,19 +59,12 @@ class SvScalarField(object):
         return np.array([dv_dx, dv_dy, dv_dz])
 
     def gradient_grid(self, xs, ys, zs, step=0.001):
-        v_dx_plus = self.evaluate_grid(xs+step, ys,zs)
-        v_dx_minus = self.evaluate_grid(xs-step,ys,zs)
-        v_dy_plus = self.evaluate_grid(xs, ys+step, zs)
-        v_dy_minus = self.evaluate_grid(xs, ys-step, zs)
-        v_dz_plus = self.evaluate_grid(xs, ys, zs+step)
-        v_dz_minus = self.evaluate_grid(xs, ys, zs-step)
-
-        dv_dx = (v_dx_plus - v_dx_minus) / (2*step)
-        dv_dy = (v_dy_plus - v_dy_minus) / (2*step)
-        dv_dz = (v_dz_plus - v_dz_minus) / (2*step)
-
-        R = np.stack((dv_dx, dv_dy, dv_dz))
-        return R[0], R[1], R[2]
+        def gradient_block(xs, ys, zs):
+            dv_dx = self.evaluate_grid(xs+step, ys, zs) - self.evaluate_grid(xs-step, ys, zs)
+            dv_dy = self.evaluate_grid(xs, ys+step, zs) - self.evaluate_grid(xs, ys-step, zs)
+            dv_dz = self.evaluate_grid(xs, ys, zs+step) - self.evaluate_grid(xs, ys, zs-step)
+            return dv_dx / (2*step), dv_dy / (2*step), dv_dz / (2*step)
+        return evaluate_chunked(gradient_block, xs, ys, zs, 3)
 
 class SvConstantScalarField(SvScalarField):
     def __init__(self, value):
@@ -96,7 +97,7 @@ class SvVectorFieldDecomposed(SvScalarField):
             return [rho, phi, theta][self.axis]
 
     def evaluate_grid(self, xs, ys, zs):
-        results = self.vfield.evaluate_grid(xs, ys, zs)
+        results = evaluate_grid_shared(self.vfield, xs, ys, zs)
         if self.coords == 'XYZ':
             return results[self.axis]
         elif self.coords == 'CYL':
@@ -121,7 +122,7 @@ class SvScalarFieldLambda(SvScalarField):
         if self.in_field is None:
             Vs = np.zeros(xs.shape[0])
         else:
-            Vs = self.in_field.evaluate_grid(xs, ys, zs)
+            Vs = evaluate_grid_shared(self.in_field, xs, ys, zs)
         if self.function_numpy is not None:
             return self.function_numpy(xs, ys, zs, Vs)
         else:
@@ -185,10 +186,11 @@ class SvScalarFieldBinOp(SvScalarField):
     def evaluate(self, x, y, z):
         return self.function(self.field1.evaluate(x, y, z), self.field2.evaluate(x, y, z))
 
+    def _evaluate_block(self, xs, ys, zs):
+        return self.function(evaluate_grid_shared(self.field1, xs, ys, zs), evaluate_grid_shared(self.field2, xs, ys, zs))
+
     def evaluate_grid(self, xs, ys, zs):
-        return self.function(self.field1.evaluate_grid(xs, ys, zs), self.field2.evaluate_grid(xs, ys, zs))
-        #func = lambda xs, ys, zs : self.function(self.field1.evaluate_grid(xs, ys, zs), self.field2.evaluate_grid(xs, ys, zs))
-        #return np.vectorize(func, signature="(m),(m),(m)->(m)")(xs, ys, zs)
+        return evaluate_chunked(self._evaluate_block, xs, ys, zs, 1)
 
 class SvScalarFieldVectorizedFunction(SvScalarField):
     def __init__(self, field, function):
@@ -200,7 +202,7 @@ class SvScalarFieldVectorizedFunction(SvScalarField):
         return self.function(self.field.evaluate(x,y,z))
 
     def evaluate_grid(self, xs, ys, zs):
-        return self.function(self.field.evaluate_grid(xs,ys,zs))
+        return self.function(evaluate_grid_shared(self.field, xs, ys, zs))
 
 class SvCoordinateScalarField(SvScalarField):
     def __init__(self, coordinate):
@@ -255,7 +257,7 @@ class SvNegatedScalarField(SvScalarField):
         return -x
 
     def evaluate_grid(self, xs, ys, zs):
-        return (- self.field.evaluate_grid(xs, ys, zs))
+        return (- evaluate_grid_shared(self.field, xs, ys, zs))
 
 class SvAbsScalarField(SvScalarField):
     def __init__(self, field):
@@ -267,7 +269,7 @@ class SvAbsScalarField(SvScalarField):
         return abs(v) 
 
     def evaluate_grid(self, xs, ys, zs):
-        return np.abs(self.field.evaluate_grid(xs, ys, zs))
+        return np.abs(evaluate_grid_shared(self.field, xs, ys, zs))
 
 class SvVectorFieldsScalarProduct(SvScalarField):
     def __init__(self, field1, field2):
@@ -281,8 +283,8 @@ class SvVectorFieldsScalarProduct(SvScalarField):
         return np.dot(v1, v2)
 
     def evaluate_grid(self, xs, ys, zs):
-        vx1, vy1, vz1 = self.field1.evaluate_grid(xs, ys, zs)
-        vx2, vy2, vz2 = self.field2.evaluate_grid(xs, ys, zs)
+        vx1, vy1, vz1 = evaluate_grid_shared(self.field1, xs, ys, zs)
+        vx2, vy2, vz2 = evaluate_grid_shared(self.field2, xs, ys, zs)
         vectors1 = np.stack((vx1, vy1, vz1)).T
         vectors2 = np.stack((vx2, vy2, vz2)).T
         result = np.vectorize(np.dot, signature="(3),(3)->()")(vectors1, vectors2)
@@ -298,7 +300,7 @@ class SvVectorFieldNorm(SvScalarField):
         return np.linalg.norm(v)
 
     def evaluate_grid(self, xs, ys, zs):
-        vx, vy, vz = self.field.evaluate_grid(xs, ys, zs)
+        vx, vy, vz = evaluate_grid_shared(self.field, xs, ys, zs)
         vectors = np.stack((vx, vy, vz)).T
         result = np.linalg.norm(vectors, axis=1)
         return result
@@ -329,8 +331,8 @@ class SvMergedScalarField(SvScalarField):
             raise Exception("unsupported operation")
         return value
 
-    def evaluate_grid(self, xs, ys, zs):
-        values = np.array([field.evaluate_grid(xs, ys, zs) for field in self.fields])
+    def _evaluate_block(self, xs, ys, zs):
+        values = np.array([evaluate_grid_shared(field, xs, ys, zs) for field in self.fields])
         if self.mode == 'MIN':
             value = np.min(values, axis=0)
         elif self.mode == 'MAX':
@@ -345,6 +347,9 @@ class SvMergedScalarField(SvScalarField):
             raise Exception("unsupported operation")
         return value
 
+    def evaluate_grid(self, xs, ys, zs):
+        return evaluate_chunked(self._evaluate_block, xs, ys, zs, 1)
+
 class SvKdtScalarField(SvScalarField):
     __description__ = "KDT"
 
@@ -353,28 +358,17 @@ class SvKdtScalarField(SvScalarField):
         if kdt is not None:
             self.kdt = kdt
         elif vertices is not None:
-            self.kdt = kdtree.KDTree(len(vertices))
-            for i, v in enumerate(vertices):
-                self.kdt.insert(v, i)
-            self.kdt.balance()
+            self.kdt = SvKdTree(vertices)
         else:
             raise Exception("Either kdt or vertices must be provided")
 
     def evaluate(self, x, y, z):
-        nearest, i, distance = self.kdt.find((x, y, z))
-        if self.falloff is not None:
-            value = self.falloff(np.array([distance]))[0]
-            return value
-        else:
-            return distance
+        return self.evaluate_grid(np.array([x]), np.array([y]), np.array([z]))[0]
 
     def evaluate_grid(self, xs, ys, zs):
-        def find(v):
-            nearest, i, distance = self.kdt.find(v)
-            return distance
-
-        points = np.stack((xs, ys, zs)).T
-        norms = np.vectorize(find, signature='(3)->()')(points)
+        points = np.stack((xs, ys, zs), axis=-1)
+        norms, _ = self.kdt.query(points)
+        norms = norms.reshape(np.shape(xs))
         if self.falloff is not None:
             result = self.falloff(norms)
             return result
@@ -479,33 +473,22 @@ class SvBvhAttractorScalarField(SvScalarField):
         if bvh is not None:
             self.bvh = bvh
         elif verts is not None and faces is not None:
-            self.bvh = bvhtree.BVHTree.FromPolygons(verts, faces)
+            self.bvh = get_bvh(verts, faces)
         else:
             raise Exception("Either bvh or verts and faces must be provided!")
 
     def evaluate(self, x, y, z):
-        nearest, normal, idx, distance = self.bvh.find_nearest((x,y,z))
-        if self.signed:
-            sign = (Vector((x,y,z)) - nearest).dot(normal)
-            sign = copysign(1, sign)
-        else:
-            sign = 1
-        return sign * distance
+        return self.evaluate_grid(np.array([x]), np.array([y]), np.array([z]))[0]
 
     def evaluate_grid(self, xs, ys, zs):
-        def find(v):
-            nearest, normal, idx, distance = self.bvh.find_nearest(v)
-            if nearest is None:
-                raise Exception("No nearest point on mesh found for vertex %s" % v)
-            if self.signed:
-                sign = (v - nearest).dot(normal)
-                sign = copysign(1, sign)
-            else:
-                sign = 1
-            return sign * distance
-
         points = np.stack((xs, ys, zs)).T
-        norms = np.vectorize(find, signature='(3)->()')(points)
+        nearest, normals, _, norms, success = bvh_find_nearest(self.bvh, points)
+        if not success.all():
+            v = points[np.argmin(success)]
+            raise Exception("No nearest point on mesh found for vertex %s" % v)
+        if self.signed:
+            signs = ((points - nearest) * normals).sum(axis=1)
+            norms = np.where(signs < 0, -norms, norms)
         if self.falloff is not None:
             result = self.falloff(norms)
             return result
@@ -595,9 +578,12 @@ class SvVectorScalarFieldComposition(SvScalarField):
         v2 = self.sfield.evaluate(x1,y1,z1)
         return v2
     
+    def _evaluate_block(self, xs, ys, zs):
+        vx1, vy1, vz1 = evaluate_grid_shared(self.vfield, xs, ys, zs)
+        return evaluate_grid_shared(self.sfield, vx1, vy1, vz1)
+
     def evaluate_grid(self, xs, ys, zs):
-        vx1, vy1, vz1 = self.vfield.evaluate_grid(xs, ys, zs)
-        return self.sfield.evaluate_grid(vx1, vy1, vz1)
+        return evaluate_chunked(self._evaluate_block, xs, ys, zs, 1)
 
 class SvVectorFieldDivergence(SvScalarField):
     def __init__(self, field, step):
@@ -620,20 +606,19 @@ class SvVectorFieldDivergence(SvScalarField):
 
         return dx_dx + dy_dy + dz_dz
     
-    def evaluate_grid(self, xs, ys, zs):
+    def _evaluate_block(self, xs, ys, zs):
         step = self.step
-        xs_dx_plus, _, _ = self.field.evaluate_grid(xs+step, ys,zs)
-        xs_dx_minus, _, _ = self.field.evaluate_grid(xs-step,ys,zs)
-        _, ys_dy_plus, _ = self.field.evaluate_grid(xs, ys+step, zs)
-        _, ys_dy_minus, _ = self.field.evaluate_grid(xs, ys-step, zs)
-        _, _, zs_dz_plus = self.field.evaluate_grid(xs, ys, zs+step)
-        _, _, zs_dz_minus = self.field.evaluate_grid(xs, ys, zs-step)
+        # accumulate differences one by one, so that only
+        # a couple of temporary arrays exist at a time
+        result = self.field.evaluate_grid(xs+step, ys, zs)[0] - self.field.evaluate_grid(xs-step, ys, zs)[0]
+        result += self.field.evaluate_grid(xs, ys+step, zs)[1]
+        result -= self.field.evaluate_grid(xs, ys-step, zs)[1]
+        result += self.field.evaluate_grid(xs, ys, zs+step)[2]
+        result -= self.field.evaluate_grid(xs, ys, zs-step)[2]
+        return result / (2*step)
 
-        dx_dx = (xs_dx_plus - xs_dx_minus) / (2*step)
-        dy_dy = (ys_dy_plus - ys_dy_minus) / (2*step)
-        dz_dz = (zs_dz_plus - zs_dz_minus) / (2*step)
-
-        return dx_dx + dy_dy + dz_dz
+    def evaluate_grid(self, xs, ys, zs):
+        return evaluate_chunked(self._evaluate_block, xs, ys, zs, 1)
 
 class SvScalarFieldLaplacian(SvScalarField):
     def __init__(self, field, step):
@@ -655,20 +640,20 @@ class SvScalarFieldLaplacian(SvScalarField):
         result = (sides - 6*v0) / (8 * step * step * step)
         return result
     
-    def evaluate_grid(self, xs, ys, zs):
+    def _evaluate_block(self, xs, ys, zs):
         step = self.step
-        v_dx_plus = self.field.evaluate_grid(xs+step, ys,zs)
-        v_dx_minus = self.field.evaluate_grid(xs-step,ys,zs)
-        v_dy_plus = self.field.evaluate_grid(xs, ys+step, zs)
-        v_dy_minus = self.field.evaluate_grid(xs, ys-step, zs)
-        v_dz_plus = self.field.evaluate_grid(xs, ys, zs+step)
-        v_dz_minus = self.field.evaluate_grid(xs, ys, zs-step)
-        v0 = self.field.evaluate_grid(xs, ys, zs)
-
-        sides = v_dx_plus + v_dx_minus + v_dy_plus + v_dy_minus + v_dz_plus + v_dz_minus
+        sides = self.field.evaluate_grid(xs+step, ys, zs) + self.field.evaluate_grid(xs-step, ys, zs)
+        sides += self.field.evaluate_grid(xs, ys+step, zs)
+        sides += self.field.evaluate_grid(xs, ys-step, zs)
+        sides += self.field.evaluate_grid(xs, ys, zs+step)
+        sides += self.field.evaluate_grid(xs, ys, zs-step)
+        v0 = evaluate_grid_shared(self.field, xs, ys, zs)
         result = (sides - 6*v0) / (8 * step * step * step)
         return result
 
+    def evaluate_grid(self, xs, ys, zs):
+        return evaluate_chunked(self._evaluate_block, xs, ys, zs, 1)
+
 class ScalarFieldCurvatureCalculator(object):
     # Ref.: Curvature formulas for implicit curves and surfaces // Ron Goldman // doi:10.1016/j.cagd.2005.06.005
     def __init__(self, field, step):
@@ -697,7 +682,7 @@ class ScalarFieldCurvatureCalculator(object):
         v_dyz_plus = self.field.evaluate_grid(xs, ys+step, zs+step)
         v_dxz_plus = self.field.evaluate_grid(xs+step, ys, zs+step)
 
-        v0 = self.v0 = self.field.evaluate_grid(xs, ys, zs)
+        v0 = self.v0 = evaluate_grid_shared(self.field, xs, ys, zs)
 
         self.dx = (v_dx_plus - v0) / step
         self.dy = (v_dy_plus - v0) / step
@@ -813,20 +798,14 @@ class SvVoronoiScalarField(SvScalarField):
     __description__ = "Voronoi"
 
     def __init__(self, vertices):
-        self.kdt = kdtree.KDTree(len(vertices))
-        for i, v in enumerate(vertices):
-            self.kdt.insert(v, i)
-        self.kdt.balance()
+        self.kdt = SvKdTree(vertices)
 
     def evaluate(self, x, y, z):
-        vs = self.kdt.find_n((x,y,z), 2)
-        if len(vs) != 2:
-            raise Exception("Unexpected kdt result at (%s,%s,%s): %s" % (x, y, z, vs))
-        t1, t2 = vs
-        distance1 = t1[2]
-        distance2 = t2[2]
-        return abs(distance1 - distance2)
+        return self.evaluate_grid(np.array([x]), np.array([y]), np.array([z]))[0]
 
     def evaluate_grid(self, xs, ys, zs):
-        return np.vectorize(self.evaluate, signature='(),(),()->()')(xs,ys,zs)
+        points = np.stack((xs, ys, zs), axis=-1)
+        distances, _ = self.kdt.query(points, 2)
+        result = abs(distances[:,0] - distances[:,1])
+        return result.reshape(np.shape(xs))
 
@@ -9,13 +9,13 @@ import numpy as np
 from math import sqrt, copysign, pi
 from mathutils import Matrix, Vector
 from mathutils import noise
-from mathutils import kdtree
-from mathutils import bvhtree
 
 from sverchok.utils.geom import autorotate_householder, autorotate_track, autorotate_diff, diameter, LineEquation, CircleEquation3D
 from sverchok.utils.math import from_cylindrical, from_spherical
-
-from sverchok.utils.curve import SvCurveLengthSolver
+from sverchok.utils.sv_KDT_utils import SvKdTree
+from sverchok.utils.sv_bvh_utils import get_bvh, bvh_find_nearest
+from sverchok.utils.sv_noise_utils import noise_numpy_types, numpy_noise_vector
+from sverchok.utils.field.chunked import evaluate_chunked, evaluate_grid_shared
 
 ##################
 #                #
@@ -37,6 +37,13 @@ class SvVectorField(object):
     def evaluate_grid(self, xs, ys, zs):
         raise Exception("not implemented")
 
+    def evaluate_grid_chunked(self, xs, ys, zs, chunk_size=None):
+        """
+        Same as evaluate_grid, but points are processed by blocks
+        of chunk_size points, to limit memory used by temporary arrays.
+        """
+        return evaluate_chunked(self.evaluate_grid, xs, ys, zs, 3, chunk_size)
+
 class SvMatrixVectorField(SvVectorField):
 
     def __init__(self, matrix):
@@ -91,9 +98,9 @@ class SvComposedVectorField(SvVectorField):
             return np.array(from_spherical(v1, v2, v3, mode='radians'))
 
     def evaluate_grid(self, xs, ys, zs):
-        v1s = self.sfield1.evaluate_grid(xs, ys, zs)
-        v2s = self.sfield2.evaluate_grid(xs, ys, zs)
-        v3s = self.sfield3.evaluate_grid(xs, ys, zs)
+        v1s = evaluate_grid_shared(self.sfield1, xs, ys, zs)
+        v2s = evaluate_grid_shared(self.sfield2, xs, ys, zs)
+        v3s = evaluate_grid_shared(self.sfield3, xs, ys, zs)
         if self.coords == 'XYZ':
             return v1s, v2s, v3s
         elif self.coords == 'CYL':
@@ -115,7 +122,7 @@ class SvAbsoluteVectorField(SvVectorField):
         return r + np.array([x, y, z])
     
     def evaluate_grid(self, xs, ys, zs):
-        rxs, rys, rzs = self.field.evaluate_grid(xs, ys, zs)
+        rxs, rys, rzs = evaluate_grid_shared(self.field, xs, ys, zs)
         return rxs + xs, rys + ys, rzs + zs
 
 class SvRelativeVectorField(SvVectorField):
@@ -128,7 +135,7 @@ class SvRelativeVectorField(SvVectorField):
         return r - np.array([x, y, z])
     
     def evaluate_grid(self, xs, ys, zs):
-        rxs, rys, rzs = self.field.evaluate_grid(xs, ys, zs)
+        rxs, rys, rzs = evaluate_grid_shared(self.field, xs, ys, zs)
         return rxs - xs, rys - ys, rzs - zs
 
 class SvVectorFieldLambda(SvVectorField):
@@ -145,7 +152,7 @@ class SvVectorFieldLambda(SvVectorField):
         if self.in_field is None:
             Vs = np.zeros(xs.shape[0])
         else:
-            vx, vy, vz = self.in_field.evaluate_grid(xs, ys, zs)
+            vx, vy, vz = evaluate_grid_shared(self.in_field, xs, ys, zs)
             Vs = np.stack((vx, vy, vz)).T
         if self.function_numpy is None:
             return np.vectorize(self.function,
@@ -169,13 +176,14 @@ class SvVectorFieldBinOp(SvVectorField):
     def evaluate(self, x, y, z):
         return self.function(self.field1.evaluate(x, y, z), self.field2.evaluate(x, y, z))
 
+    def _evaluate_block(self, xs, ys, zs):
+        vx1, vy1, vz1 = evaluate_grid_shared(self.field1, xs, ys, zs)
+        vx2, vy2, vz2 = evaluate_grid_shared(self.field2, xs, ys, zs)
+        R = self.function(np.array([vx1, vy1, vz1]), np.array([vx2, vy2, vz2]))
+        return R[0], R[1], R[2]
+
     def evaluate_grid(self, xs, ys, zs):
-        def func(xs, ys, zs):
-            vx1, vy1, vz1 = self.field1.evaluate_grid(xs, ys, zs)
-            vx2, vy2, vz2 = self.field2.evaluate_grid(xs, ys, zs)
-            R = self.function(np.array([vx1, vy1, vz1]), np.array([vx2, vy2, vz2]))
-            return R[0], R[1], R[2]
-        return np.vectorize(func, signature="(m),(m),(m)->(m),(m),(m)")(xs, ys, zs)
+        return evaluate_chunked(self._evaluate_block, xs, ys, zs, 3)
 
 class SvAverageVectorField(SvVectorField):
 
@@ -187,17 +195,13 @@ class SvAverageVectorField(SvVectorField):
         vectors = np.array([field.evaluate(x, y, z) for field in self.fields])
         return np.mean(vectors, axis=0)
 
+    def _evaluate_block(self, xs, ys, zs):
+        data = np.array([evaluate_grid_shared(field, xs, ys, zs) for field in self.fields])
+        mean = np.mean(data, axis=0)
+        return mean[0], mean[1], mean[2]
+
     def evaluate_grid(self, xs, ys, zs):
-        def func(xs, ys, zs):
-            data = []
-            for field in self.fields:
-                vx, vy, vz = field.evaluate_grid(xs, ys, zs)
-                vectors = np.stack((vx, vy, vz)).T
-                data.append(vectors)
-            data = np.array(data)
-            mean = np.mean(data, axis=0).T
-            return mean[0], mean[1], mean[2]
-        return np.vectorize(func, signature="(m),(m),(m)->(m),(m),(m)")(xs, ys, zs)
+        return evaluate_chunked(self._evaluate_block, xs, ys, zs, 3)
 
 class SvVectorFieldCrossProduct(SvVectorField):
     def __init__(self, field1, field2):
@@ -211,8 +215,8 @@ class SvVectorFieldCrossProduct(SvVectorField):
         return np.cross(v1, v2)
 
     def evaluate_grid(self, xs, ys, zs):
-        vx1, vy1, vz1 = self.field1.evaluate_grid(xs, ys, zs)
-        vx2, vy2, vz2 = self.field2.evaluate_grid(xs, ys, zs)
+        vx1, vy1, vz1 = evaluate_grid_shared(self.field1, xs, ys, zs)
+        vx2, vy2, vz2 = evaluate_grid_shared(self.field2, xs, ys, zs)
         vectors1 = np.stack((vx1, vy1, vz1)).T
         vectors2 = np.stack((vx2, vy2, vz2)).T
         R = np.cross(vectors1, vectors2).T
@@ -229,14 +233,13 @@ class SvVectorFieldMultipliedByScalar(SvVectorField):
         vector = self.vector_field.evaluate(x, y, z)
         return scalar * vector
 
+    def _evaluate_block(self, xs, ys, zs):
+        scalars = evaluate_grid_shared(self.scalar_field, xs, ys, zs)
+        vx, vy, vz = evaluate_grid_shared(self.vector_field, xs, ys, zs)
+        return scalars * vx, scalars * vy, scalars * vz
+
     def evaluate_grid(self, xs, ys, zs):
-        def product(xs, ys, zs):
-            scalars = self.scalar_field.evaluate_grid(xs, ys, zs)
-            vx, vy, vz = self.vector_field.evaluate_grid(xs, ys, zs)
-            vectors = np.stack((vx, vy, vz))
-            R = (scalars * vectors)
-            return R[0], R[1], R[2]
-        return np.vectorize(product, signature="(m),(m),(m)->(m),(m),(m)")(xs, ys, zs)
+        return evaluate_chunked(self._evaluate_block, xs, ys, zs, 3)
 
 class SvVectorFieldsLerp(SvVectorField):
 
@@ -252,14 +255,17 @@ class SvVectorFieldsLerp(SvVectorField):
         vector2 = self.vfield2.evaluate(x, y, z)
         return (1 - scalar) * vector1 + scalar * vector2
 
+    def _evaluate_block(self, xs, ys, zs):
+        scalars = evaluate_grid_shared(self.scalar_field, xs, ys, zs)
+        vx1, vy1, vz1 = evaluate_grid_shared(self.vfield1, xs, ys, zs)
+        vectors1 = np.stack((vx1, vy1, vz1))
+        vx2, vy2, vz2 = evaluate_grid_shared(self.vfield2, xs, ys, zs)
+        vectors2 = np.stack((vx2, vy2, vz2))
+        R = (1 - scalars) * vectors1 + scalars * vectors2
+        return R[0], R[1], R[2]
+
     def evaluate_grid(self, xs, ys, zs):
-            scalars = self.scalar_field.evaluate_grid(xs, ys, zs)
-            vx1, vy1, vz1 = self.vfield1.evaluate_grid(xs, ys, zs)
-            vectors1 = np.stack((vx1, vy1, vz1))
-            vx2, vy2, vz2 = self.vfield2.evaluate_grid(xs, ys, zs)
-            vectors2 = np.stack((vx2, vy2, vz2))
-            R = (1 - scalars) * vectors1 + scalars * vectors2
-            return R[0], R[1], R[2]
+        return evaluate_chunked(self._evaluate_block, xs, ys, zs, 3)
 
 class SvNoiseVectorField(SvVectorField):
     def __init__(self, noise_type, seed):
@@ -268,10 +274,18 @@ class SvNoiseVectorField(SvVectorField):
         self.__description__ = "{} noise".format(noise_type)
 
     def evaluate(self, x, y, z):
+        if self.noise_type in noise_numpy_types:
+            xs, ys, zs = self.evaluate_grid(np.array([x]), np.array([y]), np.array([z]))
+            return np.array([xs[0], ys[0], zs[0]])
         noise.seed_set(self.seed)
         return noise.noise_vector((x, y, z), noise_basis=self.noise_type)
 
     def evaluate_grid(self, xs, ys, zs):
+        if self.noise_type in noise_numpy_types:
+            noise_function = noise_numpy_types[self.noise_type][1]
+            vectors = np.stack((xs, ys, zs)).T
+            r = numpy_noise_vector(vectors, self.seed, noise_function, True)
+            return r[:,0], r[:,1], r[:,2]
         noise.seed_set(self.seed)
         def mk_noise(v):
             r = noise.noise_vector(v, noise_basis=self.noise_type)
@@ -287,40 +301,21 @@ class SvKdtVectorField(SvVectorField):
         if kdt is not None:
             self.kdt = kdt
         elif vertices is not None:
-            self.kdt = kdtree.KDTree(len(vertices))
-            for i, v in enumerate(vertices):
-                self.kdt.insert(v, i)
-            self.kdt.balance()
+            self.kdt = SvKdTree(vertices)
         else:
             raise Exception("Either kdt or vertices must be provided")
         self.__description__ = "KDT Attractor"
 
     def evaluate(self, x, y, z):
-        nearest, i, distance = self.kdt.find((x, y, z))
-        vector = np.array(nearest) - np.array([x, y, z])
-        if self.falloff is not None:
-            value = self.falloff(np.array([distance]))[0]
-            if self.negate:
-                value = - value
-            norm = np.linalg.norm(vector)
-            return value * vector / norm
-        else:
-            if self.negate:
-                return - vector
-            else:
-                return vector
+        xs, ys, zs = self.evaluate_grid(np.array([x]), np.array([y]), np.array([z]))
+        return np.array([xs[0], ys[0], zs[0]])
 
     def evaluate_grid(self, xs, ys, zs):
-        def find(v):
-            nearest, i, distance = self.kdt.find(v)
-            dv = np.array(nearest) - np.array(v)
-            if self.negate:
-                return - dv
-            else:
-                return dv
-
         points = np.stack((xs, ys, zs)).T
-        vectors = np.vectorize(find, signature='(3)->(3)')(points)
+        _, indices = self.kdt.query(points)
+        vectors = self.kdt.verts[indices] - points
+        if self.negate:
+            vectors = - vectors
         if self.falloff is not None:
             norms = np.linalg.norm(vectors, axis=1, keepdims=True)
             lens = self.falloff(norms)
@@ -581,48 +576,28 @@ class SvBvhAttractorVectorField(SvVectorField):
         if bvh is not None:
             self.bvh = bvh
         elif verts is not None and faces is not None:
-            self.bvh = bvhtree.BVHTree.FromPolygons(verts, faces)
+            self.bvh = get_bvh(verts, faces)
         else:
             raise Exception("Either bvh or verts and faces must be provided!")
         self.__description__ = "BVH Attractor"
 
     def evaluate(self, x, y, z):
-        vertex = Vector((x,y,z))
-        nearest, normal, idx, distance = self.bvh.find_nearest(vertex)
-        if self.use_normal:
-            if self.signed_normal:
-                sign = (v - nearest).dot(normal)
-                sign = copysign(1, sign)
-            else:
-                sign = 1
-            return sign * np.array(normal)
-        else:
-            dv = np.array(nearest - vertex)
-            if self.falloff is not None:
-                norm = np.linalg.norm(dv)
-                len = self.falloff(norm)
-                dv = len * dv
-                return dv
-            else:
-                return dv
+        xs, ys, zs = self.evaluate_grid(np.array([x]), np.array([y]), np.array([z]))
+        return np.array([xs[0], ys[0], zs[0]])
 
     def evaluate_grid(self, xs, ys, zs):
-        def find(v):
-            nearest, normal, idx, distance = self.bvh.find_nearest(v)
-            if nearest is None:
-                raise Exception("No nearest point on mesh found for vertex %s" % v)
-            if self.use_normal:
-                if self.signed_normal:
-                    sign = (v - nearest).dot(normal)
-                    sign = copysign(1, sign)
-                else:
-                    sign = 1
-                return sign * np.array(normal)
-            else:
-                return np.array(nearest) - v
-
         points = np.stack((xs, ys, zs)).T
-        vectors = np.vectorize(find, signature='(3)->(3)')(points)
+        nearest, normals, _, _, success = bvh_find_nearest(self.bvh, points)
+        if not success.all():
+            v = points[np.argmin(success)]
+            raise Exception("No nearest point on mesh found for vertex %s" % v)
+        if self.use_normal:
+            vectors = normals
+            if self.signed_normal:
+                signs = ((points - nearest) * normals).sum(axis=1)
+                vectors[signs < 0] *= -1
+        else:
+            vectors = nearest - points
         if self.falloff is not None:
             norms = np.linalg.norm(vectors, axis=1, keepdims=True)
             nonzero = (norms > 0)[:,0]
@@ -652,7 +627,7 @@ class SvSelectVectorField(SvVectorField):
 
     def evaluate_grid(self, xs, ys, zs):
         n = len(xs)
-        vectors = [field.evaluate_grid(xs, ys, zs) for field in self.fields]
+        vectors = [evaluate_grid_shared(field, xs, ys, zs) for field in self.fields]
         vectors = np.stack(vectors)
         vectors = np.transpose(vectors, axes=(2,0,1))
         norms = np.linalg.norm(vectors, axis=2)
@@ -678,8 +653,8 @@ class SvVectorFieldTangent(SvVectorField):
         return projection
     
     def evaluate_grid(self, xs, ys, zs):
-        vx1, vy1, vz1 = self.field1.evaluate_grid(xs, ys, zs)
-        vx2, vy2, vz2 = self.field2.evaluate_grid(xs, ys, zs)
+        vx1, vy1, vz1 = evaluate_grid_shared(self.field1, xs, ys, zs)
+        vx2, vy2, vz2 = evaluate_grid_shared(self.field2, xs, ys, zs)
         vectors1 = np.stack((vx1, vy1, vz1)).T
         vectors2 = np.stack((vx2, vy2, vz2)).T
 
@@ -704,8 +679,8 @@ class SvVectorFieldCotangent(SvVectorField):
         return v1 - projection
     
     def evaluate_grid(self, xs, ys, zs):
-        vx1, vy1, vz1 = self.field1.evaluate_grid(xs, ys, zs)
-        vx2, vy2, vz2 = self.field2.evaluate_grid(xs, ys, zs)
+        vx1, vy1, vz1 = evaluate_grid_shared(self.field1, xs, ys, zs)
+        vx2, vy2, vz2 = evaluate_grid_shared(self.field2, xs, ys, zs)
         vectors1 = np.stack((vx1, vy1, vz1)).T
         vectors2 = np.stack((vx2, vy2, vz2)).T
 
@@ -729,10 +704,12 @@ class SvVectorFieldComposition(SvVectorField):
         v2 = self.field2.evaluate(x1,y1,z1)
         return v2
     
+    def _evaluate_block(self, xs, ys, zs):
+        vx1, vy1, vz1 = evaluate_grid_shared(self.field1, xs, ys, zs)
+        return evaluate_grid_shared(self.field2, vx1, vy1, vz1)
+
     def evaluate_grid(self, xs, ys, zs):
-        r = self.field1.evaluate_grid(xs, ys, zs)
-        vx1, vy1, vz1 = r
-        return self.field2.evaluate_grid(vx1, vy1, vz1)
+        return evaluate_chunked(self._evaluate_block, xs, ys, zs, 3)
 
 class SvScalarFieldGradient(SvVectorField):
     def __init__(self, field, step):
@@ -774,7 +751,7 @@ class SvVectorFieldRotor(SvVectorField):
 
         return np.array([rx, ry, rz])
 
-    def evaluate_grid(self, xs, ys, zs):
+    def _evaluate_block(self, xs, ys, zs):
         step = self.step
         _, y_dx_plus, z_dx_plus = self.field.evaluate_grid(xs+step,ys,zs)
         _, y_dx_minus, z_dx_minus = self.field.evaluate_grid(xs-step,ys,zs)
@@ -793,8 +770,10 @@ class SvVectorFieldRotor(SvVectorField):
         rx = dz_dy - dy_dz
         ry = - (dz_dx - dx_dz)
         rz = dy_dx - dx_dy
-        R = np.stack((rx, ry, rz))
-        return R[0], R[1], R[2]
+        return rx, ry, rz
+
+    def evaluate_grid(self, xs, ys, zs):
+        return evaluate_chunked(self._evaluate_block, xs, ys, zs, 3)
 
 class SvBendAlongCurveField(SvVectorField):
     def __init__(self, curve, algorithm, scale_all, axis, t_min, t_max, up_axis=None, resolution=50, length_mode='T'):
@@ -809,8 +788,7 @@ class SvBendAlongCurveField(SvVectorField):
         if algorithm == 'ZERO':
             self.curve.pre_calc_torsion_integral(resolution)
         if length_mode == 'L':
-            self.length_solver = SvCurveLengthSolver(curve)
-            self.length_solver.prepare('SPL', resolution)
+            self.length_solver = curve.get_length_solver('SPL', resolution)
         self.__description__ = "Bend along {}".format(curve)
 
     def get_matrix(self, tangent, scale):
@@ -1019,25 +997,22 @@ class SvBendAlongSurfaceField(SvVectorField):
 class SvVoronoiVectorField(SvVectorField):
 
     def __init__(self, vertices):
-        self.kdt = kdtree.KDTree(len(vertices))
-        for i, v in enumerate(vertices):
-            self.kdt.insert(v, i)
-        self.kdt.balance()
+        self.kdt = SvKdTree(vertices)
         self.__description__ = "Voronoi"
 
     def evaluate(self, x, y, z):
-        v = Vector((x,y,z))
-        vs = self.kdt.find_n(v, 2)
-        if len(vs) != 2:
-            raise Exception("Unexpected kdt result at (%s,%s,%s): %s" % (x, y, z, vs))
-        t1, t2 = vs
-        d1 = t1[2]
-        d2 = t2[2]
-        delta = abs(d1 - d2)
-        v1 = (t1[0] - v).normalized()
-        return delta * np.array(v1)
+        xs, ys, zs = self.evaluate_grid(np.array([x]), np.array([y]), np.array([z]))
+        return np.array([xs[0], ys[0], zs[0]])
 
     def evaluate_grid(self, xs, ys, zs):
-        points = np.vectorize(self.evaluate, signature='(),(),()->(3)')(xs,ys,zs).T
-        return points[0], points[1], points[2]
+        shape = np.shape(xs)
+        points = np.stack((xs, ys, zs), axis=-1).reshape((-1, 3))
+        distances, indices = self.kdt.query(points, 2)
+        delta = abs(distances[:,0] - distances[:,1])
+        vectors = self.kdt.verts[indices[:,0]] - points
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        nonzero = norms[:,0] > 0
+        vectors[nonzero] = vectors[nonzero] / norms[nonzero]
+        R = (delta[:, np.newaxis] * vectors).T
+        return R[0].reshape(shape), R[1].reshape(shape), R[2].reshape(shape)
 
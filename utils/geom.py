@@ -606,6 +606,31 @@ class CubicSpline(Spline):
         out = ax + t_r * (bx + t_r * (cx + t_r * dx))
         return out
 
+    def eval_derivatives(self, t_in, n=1, tknots=None):
+        """
+        Calc exact derivatives of the spline at the points in t_in.
+        Returns list of n np arrays: first derivatives, second derivatives...
+        """
+
+        if tknots is None:
+            tknots = self.tknots
+
+        index = tknots.searchsorted(t_in, side='left') - 1
+        index = index.clip(0, len(self.splines) - 1)
+        to_calc = self.splines[index]
+        ax, bx, cx, dx, tx = np.swapaxes(to_calc, 0, 1)
+        t_r = t_in[:, np.newaxis] - tx
+        result = []
+        if n >= 1:
+            result.append(bx + t_r * (2 * cx + 3 * t_r * dx))
+        if n >= 2:
+            result.append(2 * cx + 6 * t_r * dx)
+        if n >= 3:
+            result.append(6 * dx)
+        for i in range(3, n):
+            result.append(np.zeros_like(ax))
+        return result
+
 #     def integrate(self, t_in, tknots=None):
 #         if tknots is None:
 #             tknots = self.tknots
@@ -692,6 +717,27 @@ class LinearSpline(Spline):
         lookup_segments = GenerateLookup(self.is_cyclic, self.pts.tolist())
         return np.array([lookup_segments.find_bucket(f) for f in t_in])
 
+    def eval_derivatives(self, t_in, n=1, tknots=None):
+        """
+        Calc exact derivatives of the spline at the points in t_in.
+        Returns list of n np arrays: first derivatives, second derivatives...
+        t_in is clamped to the range of tknots, as it is in eval().
+        """
+
+        if tknots is None:
+            tknots = self.tknots
+
+        t_in = np.clip(t_in, tknots[0], tknots[-1])
+        index = tknots.searchsorted(t_in, side='right') - 1
+        index = index.clip(0, len(self.pts) - 2)
+        dts = tknots[index + 1] - tknots[index]
+        dts[dts == 0] = 1e-8
+        first = (self.pts[index + 1] - self.pts[index]) / dts[:, np.newaxis]
+        result = [first]
+        for i in range(1, n):
+            result.append(np.zeros_like(first))
+        return result[:n]
+
 class Spline2D(object):
     """
     2D Spline (surface).
@@ -19,6 +19,7 @@
 import itertools
 from collections import defaultdict
 
+import numpy as np
 import bmesh
 from mathutils import Vector
 
@@ -73,12 +74,148 @@ def can_skip(cm, closest_points, vert_vectors):
     cpa, cpb = closest_points
     return (cpa-cpb).length > cm.VTX_PRECISION
 
+# edges which span more grid cells than this are tested against
+# all other edges directly instead of being put into the grid
+MAX_GRID_CELLS_PER_EDGE = 64
+
+def overlapping_boxes_pairs(mins, maxs):
+    '''
+    > mins, maxs:   np.arrays of shape (n, 3), corners of axis-aligned bounding boxes
+    < returns np.array of shape (m, 2) with all pairs of indices (i < j) of
+      boxes which overlap (touching boxes count as overlapping), sorted.
+
+    Candidates are found with a uniform grid, so that the number of
+    tested pairs is proportional to number of boxes for usual meshes.
+    '''
+    n = len(mins)
+    if n < 2:
+        return np.zeros((0, 2), dtype=np.int64)
+
+    cell_size = np.median((maxs - mins).max(axis=1))
+    if not cell_size > 0:
+        cell_size = (maxs.max(axis=0) - mins.min(axis=0)).max()
+    if not cell_size > 0:
+        cell_size = 1.0
+    origin = mins.min(axis=0)
+    # keep number of cells along each axis small enough for int64 keys
+    cell_size = max(cell_size, (maxs.max(axis=0) - origin).max() / 2**20)
+    lo = np.floor((mins - origin) / cell_size).astype(np.int64)
+    hi = np.floor((maxs - origin) / cell_size).astype(np.int64)
+    spans = hi - lo + 1
+    n_cells = np.prod(spans.astype(np.float64), axis=1)
+    big = n_cells > MAX_GRID_CELLS_PER_EDGE
+
+    pairs = []
+
+    # boxes which fit in a few cells: pairs of boxes which share a cell
+    small_idx = np.flatnonzero(~big)
+    counts = n_cells[small_idx].astype(np.int64)
+    owners = np.repeat(small_idx, counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    owner_spans = spans[owners]
+    z = local % owner_spans[:, 2]
+    local //= owner_spans[:, 2]
+    y = local % owner_spans[:, 1]
+    x = local // owner_spans[:, 1]
+    cells = lo[owners] + np.stack((x, y, z), axis=1)
+    dims = hi.max(axis=0) + 1
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+
+    order = np.lexsort((owners, keys))
+    keys, owners = keys[order], owners[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    sizes = np.diff(np.r_[starts, len(keys)])
+    # for each cell with m boxes, all m*(m-1)/2 pairs of them
+    for size in np.unique(sizes[sizes > 1]):
+        group_starts = starts[sizes == size]
+        i, j = np.triu_indices(size, 1)
+        pairs.append(np.stack((owners[group_starts[:, None] + i].ravel(),
+                               owners[group_starts[:, None] + j].ravel()), axis=1))
+
+    # boxes which span many cells: test against all boxes
+    for b in np.flatnonzero(big):
+        others = np.flatnonzero(np.all(mins[b] <= maxs, axis=1) & np.all(mins <= maxs[b], axis=1))
+        others = others[others != b]
+        pairs.append(np.stack((np.minimum(others, b), np.maximum(others, b)), axis=1))
+
+    if not pairs:
+        return np.zeros((0, 2), dtype=np.int64)
+
+    pairs = np.concatenate(pairs)
+    pairs = np.unique(pairs[:, 0] * n + pairs[:, 1])
+    pairs = np.stack((pairs // n, pairs % n), axis=1)
+
+    # boxes sharing a cell do not necessarily overlap
+    i, j = pairs[:, 0], pairs[:, 1]
+    good = np.all(mins[i] <= maxs[j], axis=1) & np.all(mins[j] <= maxs[i], axis=1)
+    return pairs[good]
+
+def get_candidate_pairs(cm, bm, edge_indices):
+    '''
+    Pairs of edge indices (i < j) which may intersect: edges do not share a vertex,
+    their bounding boxes overlap, their ends lie in the same plane and the closest
+    points of their lines are (approximately) within both edges. Pairs are in the same
+    order as in get_valid_permutations.
+
+    Tests here are done in numpy for all pairs at once and are slightly more
+    permissive than the exact ones, which are to be done for the remaining pairs.
+    '''
+    edge_indices = np.array(sorted(edge_indices), dtype=np.int64)
+    if len(edge_indices) < 2:
+        return []
+    vert_idxs = np.array([cm.vert_idxs_from_edge_idx(bm, idx) for idx in edge_indices], dtype=np.int64)
+    coords = np.array([v.co[:] for v in bm.verts], dtype=np.float64)
+    ends = coords[vert_idxs]
+
+    pairs = overlapping_boxes_pairs(ends.min(axis=1), ends.max(axis=1))
+    a, b = vert_idxs[pairs[:, 0]], vert_idxs[pairs[:, 1]]
+    shared = ((a[:, 0] == b[:, 0]) | (a[:, 0] == b[:, 1]) |
+              (a[:, 1] == b[:, 0]) | (a[:, 1] == b[:, 1]) |
+              (a[:, 0] == a[:, 1]) | (b[:, 0] == b[:, 1]))
+    pairs = pairs[~shared]
+
+    eps = cm.VTX_PRECISION
+    p1, p2 = ends[pairs[:, 0], 0], ends[pairs[:, 0], 1]
+    p3, p4 = ends[pairs[:, 1], 0], ends[pairs[:, 1], 1]
+    v1, v2, v3 = p2 - p1, p3 - p1, p4 - p1
+    l1, l2, l3 = [np.linalg.norm(v, axis=1) for v in (v1, v2, v3)]
+    # exact tests are done with single precision, leave room for rounding errors
+    scale = np.maximum.reduce([l1, l2, l3, np.linalg.norm(p4 - p3, axis=1), np.abs(p1).max(axis=1)])
+    slack = 1e-5 * (scale + 1.0)
+
+    in_xoy = np.all(np.abs(np.stack((p1, p2, p3, p4))[:, :, 2]) < eps + slack, axis=0)
+    triple = np.einsum('ij,ij->i', np.cross(v1, v2), v3)
+    coplanar = in_xoy | (np.abs(triple) < eps + slack * (l1 * l2 + l2 * l3 + l1 * l3 + 1.0))
+
+    # closest points of two lines; (nearly) parallel lines are left for exact test
+    d1, d2, r = v1, p4 - p3, p1 - p3
+    aa = np.einsum('ij,ij->i', d1, d1)
+    bb = np.einsum('ij,ij->i', d1, d2)
+    cc = np.einsum('ij,ij->i', d1, r)
+    ee = np.einsum('ij,ij->i', d2, d2)
+    ff = np.einsum('ij,ij->i', d2, r)
+    denom = aa * ee - bb * bb
+    regular = denom > 1e-6 * aa * ee
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = (bb * ff - cc * ee) / denom
+        t = (aa * ff - bb * cc) / denom
+        gap = np.linalg.norm((p1 + s[:, None] * d1) - (p3 + t[:, None] * d2), axis=1)
+        s_tol = (eps + slack) / np.sqrt(aa) + 1e-4
+        t_tol = (eps + slack) / np.sqrt(ee) + 1e-4
+        close = ((gap <= eps + slack) &
+                 (s >= -s_tol) & (s <= 1 + s_tol) &
+                 (t >= -t_tol) & (t <= 1 + t_tol))
+    good = coplanar & (~regular | close)
+
+    pairs = edge_indices[pairs[good]]
+    return [tuple(pair) for pair in pairs.tolist()]
+
 def get_intersection_dictionary(cm, bm, edge_indices):
 
     bm.verts.ensure_lookup_table()
     bm.edges.ensure_lookup_table()
 
-    permutations = get_valid_permutations(cm, bm, edge_indices)
+    permutations = get_candidate_pairs(cm, bm, edge_indices)
 
     k = defaultdict(list)
     d = defaultdict(list)
@@ -17,10 +17,16 @@
 # ##### END GPL LICENSE BLOCK #####
 
 import ast
+from functools import lru_cache
 
-from sverchok.utils.script_importhelper import safe_names
+import numpy as np
+
+from sverchok.utils.script_importhelper import safe_names, safe_names_np
 from sverchok.utils import logging
 
+# maximum number of compiled expressions kept in the cache
+FORMULA_CACHE_SIZE = 256
+
 class VariableCollector(ast.NodeVisitor):
     """
     Visitor class to collect free variable names from the expression.
@@ -111,10 +117,58 @@ def get_variables(string):
     result = visitor.variables
     return result.difference(safe_names.keys())
 
+# Functions which work elementwise on numpy arrays and give
+# the same results as their scalar versions from safe_names
+vectorizable_functions = {
+        'acos', 'acosh', 'asin', 'asinh', 'atan', 'atan2', 'atanh',
+        'copysign', 'cos', 'cosh', 'degrees', 'radians',
+        'erf', 'erfc', 'exp', 'expm1', 'fabs', 'gamma', 'hypot',
+        'isfinite', 'isinf', 'isnan', 'lgamma', 'log', 'log10', 'log1p', 'log2',
+        'sin', 'sinh', 'sqrt', 'tan', 'tanh', 'abs', 'pow'
+    }
+
+vectorized_names = safe_names_np.copy()
+vectorized_names['atan'] = np.arctan
+
+def is_vectorizable(root):
+    """
+    Check if expression can be evaluated for numpy arrays of values at once:
+    it should contain only arithmetic operations, simple comparisons and
+    calls of functions from vectorizable_functions.
+    """
+    for node in ast.walk(root):
+        if isinstance(node, (ast.Subscript, ast.Attribute, ast.BoolOp, ast.IfExp,
+                             ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp,
+                             ast.Lambda, ast.List, ast.Tuple, ast.Set, ast.Dict,
+                             ast.Starred, ast.JoinedStr)):
+            return False
+        if isinstance(node, ast.Compare):
+            if len(node.ops) > 1 or isinstance(node.ops[0], (ast.Is, ast.IsNot, ast.In, ast.NotIn)):
+                return False
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            return False
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in vectorizable_functions:
+                return False
+            if node.keywords:
+                return False
+            # math.log(x, base) and numpy.log(x, out) are different things
+            if node.func.id == 'log' and len(node.args) != 1:
+                return False
+    return True
+
+@lru_cache(maxsize=FORMULA_CACHE_SIZE)
+def _compile(string):
+    root = ast.parse(string, mode='eval')
+    return compile(root, "<expression>", 'eval'), is_vectorizable(root)
+
 def sv_compile(string):
+    """
+    Compile expression. Compiled code is cached, so the same
+    expression is parsed only once.
+    """
     try:
-        root = ast.parse(string, mode='eval')
-        return compile(root, "<expression>", 'eval')
+        return _compile(string)[0]
     except SyntaxError as e:
         logging.exception(e)
         raise Exception("Invalid expression syntax: " + str(e))
@@ -136,20 +190,99 @@ def safe_eval_compiled(compiled, variables, allowed_names = None):
         logging.exception(e)
         raise Exception("Invalid expression syntax: " + str(e))
 
+def safe_eval_compiled_np(compiled, variables, like):
+    """
+    Evaluate expression for numpy arrays of variable values,
+    using numpy versions of functions. If the result is a scalar,
+    it is broadcasted to the shape of `like` array.
+    """
+    r = safe_eval_compiled(compiled, variables, allowed_names = safe_names_np)
+    if not isinstance(r, np.ndarray):
+        r = np.full_like(like, r)
+    return r
+
 # It could be safer...
 def safe_eval(string, variables):
     """
     Evaluate expression, allowing only functions known to be "safe"
     to be used.
     """
+    return safe_eval_compiled(sv_compile(string), variables)
+
+def _as_array(values):
+    """
+    Values as 1D numpy array, or None if they are not all
+    floats or all integers.
+    """
+    if isinstance(values, np.ndarray):
+        if values.ndim == 1 and values.dtype.kind in 'if':
+            return values
+        return None
+    types = set(map(type, values))
     try:
-        env = dict()
-        env.update(safe_names)
-        env.update(variables)
-        env["__builtins__"] = {}
-        root = ast.parse(string, mode='eval')
-        return eval(compile(root, "<expression>", 'eval'), env)
+        if types and types <= {float, np.float64}:
+            return np.array(values, dtype=np.float64)
+        if types and types <= {int, np.int64}:
+            return np.array(values, dtype=np.int64)
+    except OverflowError:
+        pass
+    return None
+
+def _eval_arrays(compiled, arrays, count):
+    env = dict(vectorized_names)
+    env.update(arrays)
+    env["__builtins__"] = {}
+    with np.errstate(divide='raise', invalid='raise', over='raise', under='ignore'):
+        result = eval(compiled, env)
+    if not isinstance(result, np.ndarray) or result.shape != (count,) or result.dtype.kind not in 'bif':
+        return None
+    return result
+
+def safe_eval_vectorized(string, variables, count):
+    """
+    Evaluate expression for `count` sets of variable values.
+    variables: dictionary of variable name -> list (or 1D numpy array) of `count` values.
+    Returns list of results, the same as
+
+        [safe_eval(string, {name: values[i] for name, values in variables.items()})
+            for i in range(count)]
+
+    If all values are plain numbers and the expression consists only of elementwise
+    operations, it is evaluated once for numpy arrays of values; otherwise (or if
+    numpy evaluation fails) it is evaluated for each set of values separately.
+    """
+    try:
+        compiled, vectorizable = _compile(string)
     except SyntaxError as e:
         logging.exception(e)
         raise Exception("Invalid expression syntax: " + str(e))
 
+    if vectorizable and count > 0:
+        arrays = {name: _as_array(values) for name, values in variables.items()}
+        if all(array is not None and len(array) == count for array in arrays.values()):
+            try:
+                result = _eval_arrays(compiled, arrays, count)
+                if result is not None and any(array.dtype.kind == 'i' for array in arrays.values()):
+                    # numpy integers can overflow, while python ones can not;
+                    # check the result against calculation in floats
+                    floats = {name: array.astype(np.float64) for name, array in arrays.items()}
+                    check = _eval_arrays(compiled, floats, count)
+                    if check is None or not np.allclose(result, check, rtol=1e-9, atol=0, equal_nan=True):
+                        result = None
+                    elif result.dtype.kind == 'i' and not (np.abs(check) < 2**53).all():
+                        result = None
+            except (ArithmeticError, ValueError, TypeError):
+                result = None
+            if result is not None:
+                return result.tolist()
+
+    env = dict(safe_names)
+    env["__builtins__"] = {}
+    names = list(variables.keys())
+    columns = [variables[name] for name in names]
+    result = []
+    for i in range(count):
+        for name, column in zip(names, columns):
+            env[name] = column[i]
+        result.append(eval(compiled, env))
+    return result
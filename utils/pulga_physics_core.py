@@ -24,6 +24,71 @@ def cross_indices3(n):
     return ind
 
 
+# offsets to 13 of 26 neighbour cells, so that each pair of cells is visited once
+HALF_NEIGHBOURS = np.array([(dx, dy, dz)
+                            for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)
+                            if (dx, dy, dz) > (0, 0, 0)], dtype=np.int64)
+
+
+def cell_pairs_indices(order, starts_a, counts_a, starts_b, counts_b, same_cell):
+    '''all pairs of particles between cells a and b (sorted particle indices in "order")'''
+    pair_counts = counts_a * counts_b
+    total = np.sum(pair_counts)
+    if total == 0:
+        return np.zeros((0, 2), dtype=np.int64)
+    pair_cell = np.repeat(np.arange(len(pair_counts)), pair_counts)
+    local = np.arange(total) - np.repeat(np.cumsum(pair_counts) - pair_counts, pair_counts)
+    id_a = local // counts_b[pair_cell]
+    id_b = local % counts_b[pair_cell]
+    if same_cell:
+        mask = id_a < id_b
+        pair_cell, id_a, id_b = pair_cell[mask], id_a[mask], id_b[mask]
+    return np.stack((order[starts_a[pair_cell] + id_a], order[starts_b[pair_cell] + id_b]), axis=-1)
+
+
+def grid_neighbour_indices(verts, cell_size):
+    '''
+    broad phase of particles interaction: uniform grid with cells of cell_size.
+    returns pairs of indices of particles which are in the same or adjacent cells,
+    so all pairs closer than cell_size are included.
+    if cell_size is not positive, all pairs are returned
+    '''
+    if len(verts) < 2:
+        return np.zeros((0, 2), dtype=np.int64)
+    if not cell_size > 0 or not np.isfinite(cell_size):
+        return cross_indices3(len(verts))
+    # keep number of cells along each axis small enough for int64 keys
+    extent = (np.max(verts, axis=0) - np.min(verts, axis=0)).max()
+    cell_size = max(cell_size, extent / 2**20)
+    cells = np.floor(verts / cell_size).astype(np.int64)
+    # one empty cell at each side so neighbour keys never wrap to other rows
+    cells -= np.min(cells, axis=0) - 1
+    dims = np.max(cells, axis=0) + 2
+    strides = np.array([dims[1] * dims[2], dims[2], 1], dtype=np.int64)
+    keys = cells @ strides
+
+    order = np.argsort(keys, kind='stable')
+    cell_keys, starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+
+    pairs = [cell_pairs_indices(order, starts, counts, starts, counts, True)]
+    for offset in HALF_NEIGHBOURS @ strides:
+        neighbour_keys = cell_keys + offset
+        pos = np.searchsorted(cell_keys, neighbour_keys).clip(0, len(cell_keys) - 1)
+        found = cell_keys[pos] == neighbour_keys
+        if np.any(found):
+            pairs.append(cell_pairs_indices(order, starts[found], counts[found],
+                                            starts[pos[found]], counts[pos[found]], False))
+
+    return np.concatenate(pairs)
+
+
+def scatter_add(result, ids, values):
+    '''accumulate values (n, 3) into result rows pointed by ids'''
+    v_len = result.shape[0]
+    for axis in range(3):
+        result[:, axis] += np.bincount(ids, weights=values[:, axis], minlength=v_len)
+
+
 def numpy_match_long_repeat(p):
     '''match list length by repeating last one'''
     q = []
@@ -74,11 +139,16 @@ def self_react(params):
     '''behaviors between particles: collide, attract and fit'''
     ps, collision, sum_rad, gates, att_params, fit_params = params
     use_collide, use_attract, use_grow = gates
-    indexes = ps.params['indexes']
-    if use_grow:
+    if ps.params['broad_phase']:
+        # without attraction only close particles interact
+        indexes = grid_neighbour_indices(ps.verts, 2 * np.max(ps.rads))
         sum_rad = ps.rads[indexes[:, 0]] + ps.rads[indexes[:, 1]]
-        if use_attract:
-            att_params[2] = ps.mass[indexes[:, 0]] * ps.mass[indexes[:, 1]]
+    else:
+        indexes = ps.params['indexes']
+        if use_grow:
+            sum_rad = ps.rads[indexes[:, 0]] + ps.rads[indexes[:, 1]]
+            if use_attract:
+                att_params[2] = ps.mass[indexes[:, 0]] * ps.mass[indexes[:, 1]]
     dif_v = ps.verts[indexes[:, 0], :] - ps.verts[indexes[:, 1], :]
     dist = np.linalg.norm(dif_v, axis=1)
     mask = sum_rad > dist
@@ -88,17 +158,14 @@ def self_react(params):
     some_attractions = use_attract and(len(index_inter) < len(indexes))
 
     if some_collisions or some_attractions:
-        result = np.zeros((ps.v_len, ps.v_len, 3), dtype=np.float64)
         dist_cor = np.clip(dist, 1e-6, 1e4)
         normal_v = dif_v/dist_cor[:, np.newaxis]
 
         if some_collisions:
-            self_collision_force(result, dist, sum_rad, index_inter, mask, normal_v, collision)
+            self_collision_force(ps.r, dist, sum_rad, index_inter, mask, normal_v, collision)
         if some_attractions:
             antimask = np.invert(mask)
-            attract_force(result, dist_cor, antimask, indexes, normal_v, att_params)
-
-        ps.r += np.sum(result, axis=1)
+            attract_force(ps.r, dist_cor, antimask, indexes, normal_v, att_params)
 
     if use_grow:
         fit_force(ps, index_inter, fit_params)
@@ -117,8 +184,8 @@ def self_collision_force(result, dist, sum_rad, index_inter, mask, normal_v, sel
     sf = self_collision[:, np.newaxis]
     len0, len1 = [sf[id1], sf[id0]] if variable_coll else [sf, sf]
 
-    result[id0, id1, :] = -no * le * len0
-    result[id1, id0, :] = no * le * len1
+    scatter_add(result, id0, -no * le * len0)
+    scatter_add(result, id1, no * le * len1)
 
 
 def attract_force(result, dist, mask, index, norm_v, att_params):
@@ -137,15 +204,15 @@ def attract_force(result, dist, mask, index, norm_v, att_params):
     att = attract
     len0, len1 = [att[id1], att[id0]] if variable_att else [att, att]
 
-    result[id0, id1, :] = - direction * len0
-    result[id1, id0, :] = direction * len1
+    scatter_add(result, id0, - direction * len0)
+    scatter_add(result, id1, direction * len1)
 
 
 def fit_force(ps, index_inter, fit_params):
     '''the untouched particles will grow, the ones that collide will shrink'''
     grow, min_rad, max_rad = fit_params
     touch = np.unique(index_inter)
-    free = np.setdiff1d(np.arange(ps.v_len, dtype=np.int16), touch)
+    free = np.setdiff1d(np.arange(ps.v_len), touch)
     v_grow = len(grow) > 1
     grow_un, grow_tou = [grow[free], grow[touch]] if v_grow else [grow, grow]
     ps.rads[free] += grow_un*0.1
@@ -172,8 +239,13 @@ def self_react_setup(ps, dicti, forces_composite):
     if not use_self_react:
         return
 
-    ps.params['indexes'] = cross_indices3(ps.v_len)
-    sum_rad = ps.rads[ps.params['indexes'][:, 0]] + ps.rads[ps.params['indexes'][:, 1]]
+    # attraction acts between all particles, other behaviors only between close ones
+    ps.params['broad_phase'] = not use_attract
+    if ps.params['broad_phase']:
+        sum_rad = None
+    else:
+        ps.params['indexes'] = cross_indices3(ps.v_len)
+        sum_rad = ps.rads[ps.params['indexes'][:, 0]] + ps.rads[ps.params['indexes'][:, 1]]
 
     att_params = att_setup(use_attract, ps, np_attract, att_decay)
     fit_params = fit_setup(use_grow, np_grow, min_rad, max_rad)
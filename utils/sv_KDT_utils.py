@@ -5,9 +5,15 @@
 # SPDX-License-Identifier: GPL3
 # License-Filename: LICENSE
 
+import numpy as np
 from mathutils import kdtree
 from sverchok.data_structure import match_long_repeat as mlr
 
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
 # documentation/blender_python_api_2_70_release/mathutils.kdtree.html
 def create_kdt(verts):
     '''Basic kdt setup'''
@@ -20,16 +26,152 @@ def create_kdt(verts):
     return kd
 
 
+class SvKdTree(object):
+    '''
+    KD-tree with batch queries: points to search for are passed as
+    an array of shape (n, 3), results are returned as numpy arrays.
+    Uses scipy.spatial.cKDTree if scipy is installed; otherwise numpy
+    brute force search for small sets of points, and mathutils.kdtree
+    for larger ones.
+    '''
+    # without scipy, sets of up to this number of points are searched by brute force
+    brute_force_max_points = 256
+    # number of distances calculated at once by brute force search
+    brute_force_chunk = 1 << 20
+
+    def __init__(self, verts, implementation=None):
+        self.verts = np.asarray(verts, dtype=np.float64).reshape((-1, 3))
+        if implementation is None:
+            if cKDTree is not None:
+                implementation = 'SCIPY'
+            elif len(self.verts) <= self.brute_force_max_points:
+                implementation = 'NUMPY'
+            else:
+                implementation = 'MATHUTILS'
+        self.implementation = implementation
+        if implementation == 'SCIPY':
+            self._tree = cKDTree(self.verts)
+        elif implementation == 'MATHUTILS':
+            self._tree = create_kdt(self.verts.tolist())
+        elif implementation != 'NUMPY':
+            raise Exception("Unsupported KDTree implementation: " + implementation)
+
+    def __len__(self):
+        return len(self.verts)
+
+    def _chunks(self, points):
+        size = max(1, self.brute_force_chunk // max(1, len(self.verts)))
+        for start in range(0, len(points), size):
+            chunk = points[start : start + size]
+            dists2 = np.sum((chunk[:, np.newaxis, :] - self.verts[np.newaxis, :, :])**2, axis=2)
+            yield start, dists2
+
+    def query(self, points, k=1):
+        '''
+        Find k nearest vertices for each of points.
+        Returns tuple (distances, indices): arrays of shape (n,) for k == 1,
+        or (n, k) otherwise, ordered by distance.
+        '''
+        points = np.asarray(points, dtype=np.float64).reshape((-1, 3))
+        if k > len(self.verts):
+            raise Exception("Can not find {} nearest vertices in KDTree of {} vertices".format(k, len(self.verts)))
+        n = len(points)
+
+        if self.implementation == 'SCIPY':
+            distances, indices = self._tree.query(points, k=k)
+            return distances, indices
+
+        shape = (n,) if k == 1 else (n, k)
+        distances = np.empty(shape, dtype=np.float64)
+        indices = np.empty(shape, dtype=np.int64)
+
+        if self.implementation == 'NUMPY':
+            for start, dists2 in self._chunks(points):
+                end = start + len(dists2)
+                if k == 1:
+                    idxs = np.argmin(dists2, axis=1)
+                    indices[start:end] = idxs
+                    distances[start:end] = dists2[np.arange(len(idxs)), idxs]
+                else:
+                    idxs = np.argpartition(dists2, k-1, axis=1)[:, :k]
+                    ds = np.take_along_axis(dists2, idxs, axis=1)
+                    order = np.argsort(ds, axis=1)
+                    indices[start:end] = np.take_along_axis(idxs, order, axis=1)
+                    distances[start:end] = np.take_along_axis(ds, order, axis=1)
+            np.sqrt(distances, out=distances)
+        else:
+            if k == 1:
+                find = self._tree.find
+                for i, point in enumerate(points.tolist()):
+                    co, indices[i], distances[i] = find(point)
+            else:
+                find_n = self._tree.find_n
+                for i, point in enumerate(points.tolist()):
+                    found = find_n(point, k)
+                    indices[i] = [item[1] for item in found]
+                    distances[i] = [item[2] for item in found]
+
+        return distances, indices
+
+    def query_range(self, points, radius):
+        '''
+        Find all vertices within radius from each of points.
+        radius: single number or array with value per point.
+        Returns list of tuples (indices, distances), ordered by distance.
+        '''
+        points = np.asarray(points, dtype=np.float64).reshape((-1, 3))
+        radiuses = np.broadcast_to(np.asarray(radius, dtype=np.float64), (len(points),))
+        result = []
+
+        if self.implementation == 'SCIPY':
+            found = self._tree.query_ball_point(points, radiuses)
+            for point, idxs in zip(points, found):
+                idxs = np.array(idxs, dtype=np.int64)
+                dists = np.linalg.norm(self.verts[idxs] - point, axis=1)
+                order = np.argsort(dists)
+                result.append((idxs[order], dists[order]))
+        elif self.implementation == 'NUMPY':
+            for start, dists2 in self._chunks(points):
+                rads2 = radiuses[start : start + len(dists2)]**2
+                for row, rad2 in zip(dists2, rads2):
+                    idxs = np.nonzero(row <= rad2)[0]
+                    idxs = idxs[np.argsort(row[idxs])]
+                    result.append((idxs, np.sqrt(row[idxs])))
+        else:
+            find_range = self._tree.find_range
+            for point, rad in zip(points.tolist(), radiuses.tolist()):
+                found = find_range(point, rad)
+                idxs = np.array([item[1] for item in found], dtype=np.int64)
+                dists = np.array([item[2] for item in found], dtype=np.float64)
+                result.append((idxs, dists))
+
+        return result
+
+
 def kdt_closest_verts_range(verts, v_find, dists, out):
     '''Find vertices in desired distance'''
-    kd = create_kdt(verts)
-    out.extend([kd.find_range(vert, dist) for vert, dist in zip(*mlr([v_find, dists]))])
+    kd = SvKdTree(verts)
+    v_find, dists = mlr([v_find, dists])
+    cos = kd.verts.tolist()
+    for idxs, distances in kd.query_range(v_find, dists):
+        out.append([(cos[i], i, d) for i, d in zip(idxs.tolist(), distances.tolist())])
 
 
 def kdt_closest_verts_find_n(verts, v_find, nums, out):
     '''Find  the N closest vertices ordered by distance'''
-    kd = create_kdt(verts)
-    out.extend([kd.find_n(vert, num) for vert, num in zip(*mlr([v_find, nums]))])
+    kd = SvKdTree(verts)
+    v_find, nums = mlr([v_find, nums])
+    nums = [max(0, min(num, len(kd))) for num in nums]
+    k = max(nums)
+    if k == 0:
+        out.extend([] for num in nums)
+        return
+    distances, indices = kd.query(v_find, k)
+    if k == 1:
+        distances, indices = distances[:, np.newaxis], indices[:, np.newaxis]
+    cos = kd.verts.tolist()
+    for num, idxs, ds in zip(nums, indices.tolist(), distances.tolist()):
+        out.append([(cos[i], i, d) for i, d in zip(idxs[:num], ds[:num])])
 
 
 def kdt_closest_path(verts, radius, start_index, result, cycle):
@@ -72,7 +214,7 @@ def kdt_closest_edges(verts, socket_inputs, egdes_output):
     mindist, maxdist, maxNum, skip = socket_inputs
 
     # make kdtree
-    kd = create_kdt(verts)
+    kd = SvKdTree(verts)
 
     # set minimum values
     maxNum = max(maxNum, 1)
@@ -81,12 +223,11 @@ def kdt_closest_edges(verts, socket_inputs, egdes_output):
     # makes edges
     e = set()
 
-    for i, vtx in enumerate(verts):
+    for i, (indices, dists) in enumerate(kd.query_range(verts, abs(maxdist))):
         num_edges = 0
 
         # this always returns closest first followed by next closest, etc.
-        #              co  index  dist
-        for edge_idx, (_, index, dist) in enumerate(kd.find_range(vtx, abs(maxdist))):
+        for edge_idx, (index, dist) in enumerate(zip(indices.tolist(), dists.tolist())):
 
             if skip > 0:
                 if edge_idx < skip:
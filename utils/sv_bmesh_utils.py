@@ -19,10 +19,11 @@
 from contextlib import contextmanager
 import math
 from operator import setitem
-from itertools import count
+from itertools import count, chain
 
 import numpy as np
 
+import bpy
 import bmesh
 from bmesh.types import BMVert, BMEdge, BMFace
 import mathutils
@@ -51,12 +52,246 @@ def empty_bmesh(use_operators=True):
         raise error
 
 
-def bmesh_from_pydata(verts=None, edges=[], faces=[], markup_face_data=False, markup_edge_data=False,
-                      markup_vert_data=False, normal_update=False):
-    ''' verts is necessary, edges/faces are optional
-        normal_update, will update verts/edges/faces normals at the end
+# meshes with at least this number of vertices are converted to and from
+# bmesh through a temporary bpy Mesh, with foreach_set / foreach_get
+BULK_CONVERSION_MIN_VERTS = 10000
+
+
+def _face_arrays(faces):
+    '''
+    faces as flat array of vertex indices plus arrays of
+    first loop index and number of loops of each face
+    '''
+    if isinstance(faces, np.ndarray) and faces.ndim == 2:
+        n_faces, n_sides = faces.shape
+        loop_verts = faces.ravel().astype(np.int64)
+        loop_totals = np.full(n_faces, n_sides, dtype=np.int64)
+    else:
+        loop_totals = np.array([len(face) for face in faces], dtype=np.int64)
+        loop_verts = np.fromiter(chain.from_iterable(faces), dtype=np.int64, count=loop_totals.sum())
+    loop_starts = np.zeros_like(loop_totals)
+    np.cumsum(loop_totals[:-1], out=loop_starts[1:])
+    return loop_verts, loop_starts, loop_totals
+
+
+def _faces_are_valid(loop_verts, loop_starts, loop_totals, n_verts):
+    '''
+    False if bm.faces.new would fail for some of faces
+    (or may fail: equal faces are detected by a hash of their vertices)
+    '''
+    if (loop_totals < 3).any():
+        return False
+    if loop_verts.min() < 0 or loop_verts.max() >= n_verts:
+        return False
+    face_index = np.repeat(np.arange(len(loop_totals)), loop_totals)
+    order = np.lexsort((loop_verts, face_index))
+    sorted_verts = loop_verts[order]
+    sorted_faces = face_index[order]
+    if ((sorted_verts[1:] == sorted_verts[:-1]) & (sorted_faces[1:] == sorted_faces[:-1])).any():
+        return False
+    face_keys = np.stack((loop_totals,
+                          np.add.reduceat(loop_verts, loop_starts),
+                          np.add.reduceat(loop_verts * loop_verts, loop_starts),
+                          np.minimum.reduceat(loop_verts, loop_starts),
+                          np.maximum.reduceat(loop_verts, loop_starts)), axis=1)
+    face_keys = face_keys[np.lexsort(face_keys.T)]
+    return not (face_keys[1:] == face_keys[:-1]).all(axis=1).any()
+
+
+def _edge_arrays(edges, n_verts):
+    '''
+    edges as int array of shape (n, 2), or None if some of them
+    would be rejected by bm.edges.new
+    '''
+    if len(edges) == 0:
+        return np.empty((0, 2), dtype=np.int64)
+    edges = np.asarray(edges, dtype=np.int64)
+    if edges.ndim != 2 or edges.shape[1] != 2:
+        return None
+    if edges.min() < 0 or edges.max() >= n_verts or (edges[:, 0] == edges[:, 1]).any():
+        return None
+    return edges
+
+
+def _mesh_arrays(edges, loop_verts, loop_starts, loop_totals, n_verts):
+    '''
+    vertices of mesh edges and edge index of each loop, in the order
+    in which bm.faces.new / bm.edges.new would create edges; plus
+    indices of mesh edges for loose edges given in edges.
     '''
+    n_loops = len(loop_verts)
+
+    # edge of each loop goes from its vertex to the vertex of the next loop;
+    # bm.faces.new creates the closing edge of a face first, then others in order
+    next_loop = np.arange(1, n_loops + 1)
+    last_loops = loop_starts + loop_totals - 1
+    next_loop[last_loops] = loop_starts
+    creation_order = 2 * np.arange(n_loops) + 1
+    creation_order[last_loops] = 2 * loop_starts
+    v1 = np.concatenate((loop_verts, edges[:, 0]))
+    v2 = np.concatenate((loop_verts[next_loop], edges[:, 1]))
+    creation_order = np.concatenate((creation_order, 2 * n_loops + np.arange(len(edges))))
+
+    by_creation = np.argsort(creation_order, kind='stable')
+    keys = np.minimum(v1, v2) * n_verts + np.maximum(v1, v2)
+    _, first, inverse = np.unique(keys[by_creation], return_index=True, return_inverse=True)
+    new_order = np.argsort(first)
+    edge_ids = np.empty(len(first), dtype=np.int64)
+    edge_ids[new_order] = np.arange(len(first))
+    element_edges = np.empty(len(keys), dtype=np.int64)
+    element_edges[by_creation] = edge_ids[inverse]
+    created = by_creation[first[new_order]]
+    edge_verts = np.stack((v1[created], v2[created]), axis=1)
+    return edge_verts, element_edges[:n_loops], element_edges[n_loops:]
+
+
+def _write_mesh_arrays(mesh, verts, edge_verts, loop_verts, loop_edges, loop_starts, loop_totals):
+    '''write geometry into an empty bpy Mesh at once'''
+    mesh.vertices.add(len(verts))
+    mesh.vertices.foreach_set("co", verts.astype(np.float32).ravel())
+    mesh.edges.add(len(edge_verts))
+    mesh.edges.foreach_set("vertices", edge_verts.astype(np.int32).ravel())
+    mesh.loops.add(len(loop_verts))
+    mesh.loops.foreach_set("vertex_index", loop_verts.astype(np.int32))
+    mesh.loops.foreach_set("edge_index", loop_edges.astype(np.int32))
+    mesh.polygons.add(len(loop_totals))
+    mesh.polygons.foreach_set("loop_start", loop_starts.astype(np.int32))
+    mesh.polygons.foreach_set("loop_total", loop_totals.astype(np.int32))
+
+
+class MeshTopology(object):
+    '''
+    Edges, faces and material indices of faces as flat arrays, in the form
+    they are stored by bpy.types.Mesh. Two topologies are equal if they
+    were built from equal data.
+    '''
+    def __init__(self, n_verts, edges, loop_verts, loop_starts, loop_totals, materials):
+        self.n_verts = n_verts
+        self.edges = edges
+        self.loop_verts = loop_verts
+        self.loop_starts = loop_starts
+        self.loop_totals = loop_totals
+        self.materials = materials
+
+    @classmethod
+    def from_pydata(cls, n_verts, edges=[], faces=[], materials=None):
+        '''
+        None if data can not be written into Mesh as is (bm.edges.new or
+        bm.faces.new would reject some of edges or faces).
+        Material index of faces is 0 where materials is None or too short.
+        '''
+        edges = _edge_arrays(edges, n_verts)
+        if edges is None:
+            return None
+        if len(faces) > 0:
+            loop_verts, loop_starts, loop_totals = _face_arrays(faces)
+        else:
+            loop_verts = loop_starts = loop_totals = np.empty(0, dtype=np.int64)
+        n_faces = len(loop_totals)
+        face_materials = np.zeros(n_faces, dtype=np.int32)
+        if materials is not None and len(materials) > 0 and n_faces > 0:
+            materials = [0 if m is None else m for m in materials[:n_faces]]
+            face_materials[:len(materials)] = materials
+        return cls(n_verts, edges, loop_verts, loop_starts, loop_totals, face_materials)
+
+    def __eq__(self, other):
+        return (self.n_verts == other.n_verts
+                and np.array_equal(self.loop_totals, other.loop_totals)
+                and np.array_equal(self.loop_verts, other.loop_verts)
+                and np.array_equal(self.edges, other.edges)
+                and np.array_equal(self.materials, other.materials))
+
+    def is_valid(self):
+        if len(self.loop_totals) == 0:
+            return True
+        return _faces_are_valid(self.loop_verts, self.loop_starts, self.loop_totals, self.n_verts)
+
+    def matches(self, mesh):
+        '''True if mesh has the same numbers of elements as this topology would give'''
+        return (len(mesh.vertices) == self.n_verts
+                and len(mesh.loops) == len(self.loop_verts)
+                and len(mesh.polygons) == len(self.loop_totals))
+
+    def write(self, mesh, verts):
+        '''
+        replace geometry of mesh; the order of elements is the same as
+        bm.to_mesh would give for bmesh_from_pydata(verts, edges, faces)
+        '''
+        edge_verts, loop_edges, _ = _mesh_arrays(self.edges, self.loop_verts,
+                                                 self.loop_starts, self.loop_totals, self.n_verts)
+        mesh.clear_geometry()
+        _write_mesh_arrays(mesh, verts, edge_verts, self.loop_verts, loop_edges,
+                           self.loop_starts, self.loop_totals)
+        mesh.polygons.foreach_set("material_index", self.materials)
+
+
+def _bmesh_from_arrays(verts, edges, faces):
+    '''
+    bmesh with the same order of elements (and the same order of edge
+    vertices) as it would be created by bm.verts.new / bm.faces.new /
+    bm.edges.new, built at once through a temporary mesh.
+    Returns (bm, indices of bmesh edges for edges) or None,
+    if data is not valid to be converted this way.
+    '''
+    verts = np.asarray(verts, dtype=np.float64)
+    if verts.ndim != 2 or verts.shape[1] != 3:
+        return None
+    n_verts = len(verts)
+    edges = _edge_arrays(edges, n_verts)
+    if edges is None:
+        return None
+    if len(faces) > 0:
+        loop_verts, loop_starts, loop_totals = _face_arrays(faces)
+        if not _faces_are_valid(loop_verts, loop_starts, loop_totals, n_verts):
+            return None
+    else:
+        loop_verts = loop_starts = loop_totals = np.empty(0, dtype=np.int64)
+
+    edge_verts, loop_edges, edge_indices = _mesh_arrays(edges, loop_verts, loop_starts, loop_totals, n_verts)
+
+    mesh = bpy.data.meshes.new("sv_bmesh_from_pydata")
+    try:
+        _write_mesh_arrays(mesh, verts, edge_verts, loop_verts, loop_edges, loop_starts, loop_totals)
+        bm = bmesh.new()
+        bm.from_mesh(mesh)
+    finally:
+        bpy.data.meshes.remove(mesh)
+    return bm, edge_indices
+
+
+def _arrays_from_bmesh(bm):
+    '''
+    vertices (float64 array of shape (n, 3)), edges (int array of shape (m, 2)),
+    flat vertex indices of faces and numbers of vertices of faces,
+    read at once through a temporary mesh.
+    '''
+    mesh = bpy.data.meshes.new("sv_pydata_from_bmesh")
+    try:
+        bm.to_mesh(mesh)
+        verts = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", verts)
+        edges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+        mesh.edges.foreach_get("vertices", edges)
+        loop_verts = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get("vertex_index", loop_verts)
+        loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("loop_total", loop_totals)
+    finally:
+        bpy.data.meshes.remove(mesh)
+    return verts.astype(np.float64).reshape((-1, 3)), edges.reshape((-1, 2)), loop_verts, loop_totals
+
+
+def _split_faces(loop_verts, loop_totals):
+    '''list of lists of vertex indices'''
+    if len(loop_totals) > 0 and (loop_totals == loop_totals[0]).all():
+        return loop_verts.reshape((-1, loop_totals[0])).tolist()
+    loop_verts = loop_verts.tolist()
+    ends = np.cumsum(loop_totals).tolist()
+    starts = [0] + ends[:-1]
+    return [loop_verts[start:end] for start, end in zip(starts, ends)]
 
+
+def _bmesh_from_lists(verts, edges, faces, markup_edge_data):
     bm = bmesh.new()
     bm_verts = bm.verts
     add_vert = bm_verts.new
@@ -94,6 +329,36 @@ def bmesh_from_pydata(verts=None, edges=[], faces=[], markup_face_data=False, ma
 
         bm.edges.index_update()
 
+    return bm
+
+
+def bmesh_from_pydata(verts=None, edges=[], faces=[], markup_face_data=False, markup_edge_data=False,
+                      markup_vert_data=False, normal_update=False):
+    ''' verts is necessary, edges/faces are optional
+        normal_update, will update verts/edges/faces normals at the end
+        big meshes (see BULK_CONVERSION_MIN_VERTS) are passed to bmesh at once
+    '''
+
+    converted = None
+    if len(verts) >= BULK_CONVERSION_MIN_VERTS:
+        converted = _bmesh_from_arrays(verts, edges, faces)
+
+    if converted is None:
+        bm = _bmesh_from_lists(verts, edges, faces, markup_edge_data)
+    else:
+        bm, edge_indices = converted
+        bm.verts.index_update()
+        bm.verts.ensure_lookup_table()
+        bm.edges.index_update()
+        bm.faces.index_update()
+        if markup_edge_data and len(edge_indices) > 0:
+            initial_index_layer = bm.edges.layers.int.new("initial_index")
+            initial_indices = np.zeros(len(bm.edges), dtype=np.int64)
+            initial_indices[edge_indices] = np.arange(len(edge_indices))
+            for bm_edge, idx in zip(bm.edges, initial_indices.tolist()):
+                bm_edge[initial_index_layer] = idx
+
+    bm_verts = bm.verts
     if markup_vert_data:
         bm_verts.ensure_lookup_table()
         layer = bm_verts.layers.int.new("initial_index")
@@ -138,18 +403,31 @@ def add_mesh_to_bmesh(bm, verts, edges=None, faces=None, sv_index_name=None, upd
 
 
 def numpy_data_from_bmesh(bm, out_np, face_data=None):
-    if out_np[0]:
-        verts = np.array([v.co[:] for v in bm.verts])
-    else:
-        verts = [v.co[:] for v in bm.verts]
-    if out_np[1]:
-        edges = np.array([[e.verts[0].index, e.verts[1].index] for e in bm.edges])
-    else:
-        edges = [[e.verts[0].index, e.verts[1].index] for e in bm.edges]
-    if out_np[2]:
-        faces = np.array([[i.index for i in p.verts] for p in bm.faces])
+    if len(bm.verts) >= BULK_CONVERSION_MIN_VERTS:
+        verts, edges, loop_verts, loop_totals = _arrays_from_bmesh(bm)
+        if not out_np[0]:
+            verts = list(map(tuple, verts.tolist()))
+        if not out_np[1]:
+            edges = edges.tolist()
+        if out_np[2] and len(loop_totals) > 0 and (loop_totals == loop_totals[0]).all():
+            faces = loop_verts.reshape((-1, loop_totals[0]))
+        else:
+            faces = _split_faces(loop_verts, loop_totals)
+            if out_np[2]:
+                faces = np.array(faces)
     else:
-        faces = [[i.index for i in p.verts] for p in bm.faces]
+        if out_np[0]:
+            verts = np.array([v.co[:] for v in bm.verts])
+        else:
+            verts = [v.co[:] for v in bm.verts]
+        if out_np[1]:
+            edges = np.array([[e.verts[0].index, e.verts[1].index] for e in bm.edges])
+        else:
+            edges = [[e.verts[0].index, e.verts[1].index] for e in bm.edges]
+        if out_np[2]:
+            faces = np.array([[i.index for i in p.verts] for p in bm.faces])
+        else:
+            faces = [[i.index for i in p.verts] for p in bm.faces]
 
     if face_data:
         if out_np[3]:
@@ -162,9 +440,15 @@ def numpy_data_from_bmesh(bm, out_np, face_data=None):
 
 def pydata_from_bmesh(bm, face_data=None):
 
-    verts = [v.co[:] for v in bm.verts]
-    edges = [[e.verts[0].index, e.verts[1].index] for e in bm.edges]
-    faces = [[i.index for i in p.verts] for p in bm.faces]
+    if len(bm.verts) >= BULK_CONVERSION_MIN_VERTS:
+        verts, edges, loop_verts, loop_totals = _arrays_from_bmesh(bm)
+        verts = list(map(tuple, verts.tolist()))
+        edges = edges.tolist()
+        faces = _split_faces(loop_verts, loop_totals)
+    else:
+        verts = [v.co[:] for v in bm.verts]
+        edges = [[e.verts[0].index, e.verts[1].index] for e in bm.edges]
+        faces = [[i.index for i in p.verts] for p in bm.faces]
 
     if face_data is None:
         return verts, edges, faces
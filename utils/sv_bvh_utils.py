@@ -0,0 +1,108 @@
+# This file is part of project Sverchok. It's copyrighted by the contributors
+# recorded in the version control history of the file, available from
+# its original location https://github.com/nortikin/sverchok/commit/master
+#
+# SPDX-License-Identifier: GPL3
+# License-Filename: LICENSE
+
+"""
+Batched queries to mathutils.bvhtree.
+
+Functions of this module take numpy arrays of points (and ray directions)
+and return numpy arrays of results, so that callers do not have to loop
+over points themselves. Built BVH trees are cached by fingerprint of the
+mesh, so a node which is processed again with the same mesh (or several
+nodes which use the same mesh) does not rebuild the tree.
+"""
+
+import collections
+
+import numpy as np
+from mathutils.bvhtree import BVHTree
+
+from sverchok.core.socket_data import sv_data_fingerprint
+
+# maximum number of BVH trees kept in the cache
+BVH_CACHE_SIZE = 16
+
+_bvh_cache = collections.OrderedDict()
+
+
+def get_bvh(verts, faces, all_triangles=False, epsilon=0.0):
+    '''
+    BVHTree.FromPolygons(verts, faces), reused if a tree for the same mesh was built before.
+    '''
+    verts_fingerprint = sv_data_fingerprint(verts)
+    faces_fingerprint = sv_data_fingerprint(faces)
+    if verts_fingerprint is None or faces_fingerprint is None:
+        return BVHTree.FromPolygons(verts, faces, all_triangles=all_triangles, epsilon=epsilon)
+
+    key = (verts_fingerprint, faces_fingerprint, all_triangles, epsilon)
+    bvh = _bvh_cache.get(key)
+    if bvh is not None:
+        _bvh_cache.move_to_end(key)
+        return bvh
+
+    if isinstance(verts, np.ndarray):
+        verts = verts.tolist()
+    if isinstance(faces, np.ndarray):
+        faces = faces.tolist()
+    bvh = BVHTree.FromPolygons(verts, faces, all_triangles=all_triangles, epsilon=epsilon)
+    _bvh_cache[key] = bvh
+    while len(_bvh_cache) > BVH_CACHE_SIZE:
+        _bvh_cache.popitem(last=False)
+    return bvh
+
+
+def clear_bvh_cache():
+    _bvh_cache.clear()
+
+
+def _as_points(points):
+    return np.asarray(points, dtype=np.float64).reshape((-1, 3))
+
+
+def _collect(found, n):
+    '''
+    convert list of (location, normal, index, distance) tuples into arrays;
+    for missing results location, normal and distance are NaN and index is -1
+    '''
+    locations = np.full((n, 3), np.nan)
+    normals = np.full((n, 3), np.nan)
+    indices = np.full(n, -1, dtype=np.int64)
+    distances = np.full(n, np.nan)
+    success = np.array([item[0] is not None for item in found], dtype=bool).reshape(n)
+    if success.any():
+        hits = [item for item in found if item[0] is not None]
+        locations[success] = [item[0][:] for item in hits]
+        normals[success] = [item[1][:] for item in hits]
+        indices[success] = [item[2] for item in hits]
+        distances[success] = [item[3] for item in hits]
+    return locations, normals, indices, distances, success
+
+
+def bvh_find_nearest(bvh, points, distance=None):
+    '''
+    nearest points on the mesh for each of points, np.array of shape (n, 3).
+    returns tuple of arrays: locations (n, 3), normals (n, 3), indices (n,),
+    distances (n,) and success mask (n,)
+    '''
+    points = _as_points(points)
+    args = () if distance is None else (distance,)
+    find = bvh.find_nearest
+    found = [find(point, *args) for point in points.tolist()]
+    return _collect(found, len(points))
+
+
+def bvh_ray_cast(bvh, starts, directions, distance=None):
+    '''
+    cast rays from starts in directions (arrays of shape (n, 3) or (3,)).
+    returns tuple of arrays: locations (n, 3), normals (n, 3), indices (n,),
+    distances (n,) and success mask (n,)
+    '''
+    starts, directions = np.broadcast_arrays(_as_points(starts), _as_points(directions))
+    args = () if distance is None else (distance,)
+    ray_cast = bvh.ray_cast
+    found = [ray_cast(start, direction, *args)
+                for start, direction in zip(starts.tolist(), directions.tolist())]
+    return _collect(found, len(starts))
@@ -5,6 +5,8 @@
 # SPDX-License-Identifier: GPL3
 # License-Filename: LICENSE
 
+from functools import lru_cache
+
 import numpy as np
 
 noise_options = [
@@ -238,9 +240,238 @@ def random_cells(vecs, seed, smooth):
 
     return rand_v(np.floor(vecs), seed_vals)
 
+# Noises below use a permutation table for hashing of lattice points,
+# so they give the same result for the same seed without changing
+# global state of numpy.random.
+
+GRAD3 = np.array([
+    [1, 1, 0], [-1, 1, 0], [1, -1, 0], [-1, -1, 0],
+    [1, 0, 1], [-1, 0, 1], [1, 0, -1], [-1, 0, -1],
+    [0, 1, 1], [0, -1, 1], [0, 1, -1], [0, -1, -1]
+    ], dtype=np.float64)
+
+NEIGHBOUR_OFFSETS = np.array([
+    [i, j, k] for i in (-1, 0, 1) for j in (-1, 0, 1) for k in (-1, 0, 1)
+    ], dtype=np.int64)
+
+# number of points processed at once by simplex and voronoi noises
+NOISE_CHUNK_SIZE = 32768
+
+@lru_cache(maxsize=32)
+def noise_tables(seed):
+    '''
+    permutation table (doubled to 512 items) and random
+    offsets of feature points (256 vectors in [0, 1)) for the seed
+    '''
+    random_state = np.random.RandomState(int(seed) % 2**32)
+    perm = random_state.permutation(256)
+    jitter = random_state.random_sample((256, 3))
+    return np.concatenate((perm, perm)), jitter
+
+def lattice_hash(perm, cells):
+    '''pseudo random integer in [0, 256) for each integer lattice point, cells.shape = (..., 3)'''
+    cells = cells & 255
+    return perm[perm[perm[cells[..., 0]] + cells[..., 1]] + cells[..., 2]]
+
+def simplex_noise(vecs, seed, smooth):
+    '''
+    3D simplex noise, values are in [0, 1] range.
+    smooth is not used, simplex noise is always smooth.
+    '''
+    perm, _ = noise_tables(seed)
+    vecs = np.asarray(vecs, dtype=np.float64)
+    result = np.empty(len(vecs))
+    for start in range(0, len(vecs), NOISE_CHUNK_SIZE):
+        chunk = vecs[start : start + NOISE_CHUNK_SIZE]
+        result[start : start + NOISE_CHUNK_SIZE] = _simplex_noise_chunk(chunk, perm)
+    return result
+
+def _simplex_noise_chunk(vecs, perm):
+    skew = vecs.sum(axis=1) / 3.0
+    cell = np.floor(vecs + skew[:, np.newaxis])
+    unskew = cell.sum(axis=1) / 6.0
+    d0 = vecs - cell + unskew[:, np.newaxis]
+    x0, y0, z0 = d0.T
+
+    # offsets of second and third corners of the simplex
+    first = np.stack((
+        (x0 >= y0) & (x0 >= z0),
+        (x0 < y0) & (y0 >= z0),
+        (x0 < z0) & (y0 < z0)), axis=1).astype(np.int64)
+    second = np.stack((
+        (x0 >= y0) | (x0 >= z0),
+        (x0 < y0) | (y0 >= z0),
+        (x0 < z0) | (y0 < z0)), axis=1).astype(np.int64)
+
+    cell = cell.astype(np.int64)
+    result = np.zeros(len(vecs))
+    for offset, d in [(0, d0),
+                      (first, d0 - first + 1.0/6.0),
+                      (second, d0 - second + 2.0/6.0),
+                      (1, d0 - 1.0 + 3.0/6.0)]:
+        gradients = GRAD3[lattice_hash(perm, cell + offset) % 12]
+        t = np.maximum(0.6 - (d * d).sum(axis=1), 0.0)
+        result += t**4 * (gradients * d).sum(axis=1)
+    return 0.5 + 16.0 * result
+
+def voronoi_distances(vecs, seed, count):
+    '''
+    Distances from each point to `count` nearest feature points,
+    np.array of shape (n, count), sorted. Each cell of integer lattice
+    contains one feature point at random position.
+    '''
+    perm, jitter = noise_tables(seed)
+    vecs = np.asarray(vecs, dtype=np.float64)
+    result = np.empty((len(vecs), count))
+    for start in range(0, len(vecs), NOISE_CHUNK_SIZE):
+        chunk = vecs[start : start + NOISE_CHUNK_SIZE]
+        cells = np.floor(chunk).astype(np.int64)[:, np.newaxis, :] + NEIGHBOUR_OFFSETS
+        points = cells + jitter[lattice_hash(perm, cells)]
+        distances = np.linalg.norm(points - chunk[:, np.newaxis, :], axis=2)
+        distances = np.partition(distances, count - 1, axis=1)[:, :count]
+        distances.sort(axis=1)
+        result[start : start + NOISE_CHUNK_SIZE] = distances
+    return result
+
+def voronoi_f1(vecs, seed, smooth):
+    '''distance to the nearest feature point'''
+    return voronoi_distances(vecs, seed, 1)[:, 0]
+
+def voronoi_f2(vecs, seed, smooth):
+    '''distance to the second nearest feature point'''
+    return voronoi_distances(vecs, seed, 2)[:, 1]
+
+def voronoi_f3(vecs, seed, smooth):
+    '''distance to the third nearest feature point'''
+    return voronoi_distances(vecs, seed, 3)[:, 2]
+
+def voronoi_f4(vecs, seed, smooth):
+    '''distance to the fourth nearest feature point'''
+    return voronoi_distances(vecs, seed, 4)[:, 3]
+
+def voronoi_f2f1(vecs, seed, smooth):
+    '''difference between distances to the second and the first nearest feature points'''
+    distances = voronoi_distances(vecs, seed, 2)
+    return distances[:, 1] - distances[:, 0]
+
+def voronoi_crackle(vecs, seed, smooth):
+    '''F2 - F1, sharpened and clamped to 1'''
+    return np.minimum(10.0 * voronoi_f2f1(vecs, seed, smooth), 1.0)
+
 noise_numpy_types = {
     'RANDOM_CELLS': (random_cells, random_interpolator),
     'RANDOM_GRADIENTS': (gradient_noise_random, interpolation_noise_random),
     'ORTHO_GRADIENTS': (gradient_noise_ortho, interpolation_noise_ortho),
     'NUMPY_PERLIN': (gradient_noise_perlin, numpy_perlin_noise),
+    'NUMPY_SIMPLEX': (simplex_noise, simplex_noise),
+    'NUMPY_VORONOI_F1': (voronoi_f1, voronoi_f1),
+    'NUMPY_VORONOI_F2': (voronoi_f2, voronoi_f2),
+    'NUMPY_VORONOI_F3': (voronoi_f3, voronoi_f3),
+    'NUMPY_VORONOI_F4': (voronoi_f4, voronoi_f4),
+    'NUMPY_VORONOI_F2F1': (voronoi_f2f1, voronoi_f2f1),
+    'NUMPY_VORONOI_CRACKLE': (voronoi_crackle, voronoi_crackle),
      }
+
+def numpy_noise_vector(vecs, seed, noise_function, smooth):
+    '''
+    noise vectors, np.array of shape (n, 3) with components in [-1, 1] range;
+    components are calculated with seeds seed, seed+1 and seed+2.
+    '''
+    vecs = np.asarray(vecs, dtype=np.float64)
+    r_noise = np.stack((
+        noise_function(vecs, seed, smooth),
+        noise_function(vecs, seed + 1, smooth),
+        noise_function(vecs, seed + 2, smooth)
+        )).T
+    return 2 * r_noise - 1
+
+def numpy_turbulence(vecs, octaves, hard, amplitude_scale, frequency_scale, seed, noise_function, smooth):
+    '''
+    sum of octaves of signed noise, the same way as mathutils.noise.turbulence does.
+    hard: use absolute values of noise (sharp transitions)
+    '''
+    vecs = np.asarray(vecs, dtype=np.float64)
+    result = np.zeros(len(vecs))
+    amplitude = 1.0
+    for i in range(max(int(octaves), 1)):
+        t = 2 * noise_function(vecs, seed, smooth) - 1
+        if hard:
+            t = np.abs(t)
+        result += amplitude * t
+        amplitude *= amplitude_scale
+        vecs = vecs * frequency_scale
+    return result
+
+def numpy_turbulence_vector(vecs, octaves, hard, amplitude_scale, frequency_scale, seed, noise_function, smooth):
+    '''vector version of numpy_turbulence, components use seeds seed, seed+1 and seed+2'''
+    return np.stack([
+        numpy_turbulence(vecs, octaves, hard, amplitude_scale, frequency_scale, seed + i, noise_function, smooth)
+        for i in range(3)]).T
+
+def numpy_fractal(fractal_type, vecs, h_factor, lacunarity, octaves, offset, gain, seed, noise_function, smooth):
+    '''
+    Musgrave fractals (the same types as in mathutils.noise) built from numpy noise function.
+    fractal_type: one of FRACTAL, MULTI_FRACTAL, HETERO_TERRAIN,
+        RIDGED_MULTI_FRACTAL, HYBRID_MULTI_FRACTAL
+    '''
+    vecs = np.asarray(vecs, dtype=np.float64)
+    # as in Blender's C code: int(octaves) full octaves, then the
+    # fractional part of octaves scales one more octave (not for ridged)
+    n_octaves = int(np.floor(octaves))
+    rmd = octaves - n_octaves
+    pw_hl = pow(lacunarity, -h_factor)
+
+    def signed_noise(i, mask=None):
+        points = vecs if mask is None else vecs[mask]
+        return 2 * noise_function(points * lacunarity**i, seed, smooth) - 1
+
+    if fractal_type == 'FRACTAL':
+        result = np.zeros(len(vecs))
+        for i in range(n_octaves):
+            result += signed_noise(i) * pw_hl**i
+        if rmd != 0:
+            result += rmd * signed_noise(n_octaves) * pw_hl**n_octaves
+    elif fractal_type == 'MULTI_FRACTAL':
+        result = np.ones(len(vecs))
+        for i in range(n_octaves):
+            result *= signed_noise(i) * pw_hl**i + 1.0
+        if rmd != 0:
+            result *= rmd * signed_noise(n_octaves) * pw_hl**n_octaves + 1.0
+    elif fractal_type == 'HETERO_TERRAIN':
+        result = offset + signed_noise(0)
+        for i in range(1, n_octaves):
+            result += (signed_noise(i) + offset) * pw_hl**i * result
+        last = max(n_octaves, 1)
+        if rmd != 0:
+            result += rmd * (signed_noise(last) + offset) * pw_hl**last * result
+    elif fractal_type == 'RIDGED_MULTI_FRACTAL':
+        signal = (offset - np.abs(signed_noise(0)))**2
+        result = signal
+        for i in range(1, n_octaves):
+            weight = np.clip(signal * gain, 0.0, 1.0)
+            signal = (offset - np.abs(signed_noise(i)))**2 * weight
+            result = result + signal * pw_hl**i
+    elif fractal_type == 'HYBRID_MULTI_FRACTAL':
+        result = signed_noise(0) + offset
+        weight = gain * result
+        # octave at which summation stopped for each point: points drop out
+        # once their weight falls to 0.001 or below
+        stopped_at = np.full(len(vecs), max(n_octaves, 1))
+        alive = np.ones(len(vecs), dtype=bool)
+        for i in range(1, n_octaves):
+            dying = alive & ~(weight > 0.001)
+            stopped_at[dying] = i
+            alive &= ~dying
+            if not alive.any():
+                break
+            w = np.minimum(weight[alive], 1.0)
+            signal = (signed_noise(i, alive) + offset) * pw_hl**i
+            result[alive] += w * signal
+            weight[alive] = w * gain * signal
+        if rmd != 0:
+            for i in np.unique(stopped_at):
+                mask = stopped_at == i
+                result[mask] += rmd * (signed_noise(i, mask) + offset) * pw_hl**i
+    else:
+        raise Exception("Unsupported fractal type: " + fractal_type)
+    return result
@@ -0,0 +1,197 @@
+# This file is part of project Sverchok. It's copyrighted by the contributors
+# recorded in the version control history of the file, available from
+# its original location https://github.com/nortikin/sverchok/commit/master
+#
+# SPDX-License-Identifier: GPL3
+# License-Filename: LICENSE
+
+"""
+Per-node update telemetry.
+
+When enabled in preferences, the update system records, for each processed
+node, its processing time, estimated size of its output data and (optionally)
+peak memory allocated while processing it. Records are kept in a ring buffer
+across updates, so that hot nodes and regressions can be found without cProfile.
+
+Records can be aggregated with get_node_stats() or exported as JSON or
+in Chrome trace format (chrome://tracing, https://ui.perfetto.dev).
+"""
+
+import collections
+import json
+import tracemalloc
+
+import bpy
+from bpy.props import StringProperty, EnumProperty
+
+from sverchok.core.socket_data import socket_data_cache, sv_data_size
+from sverchok.utils.logging import info
+
+# ring buffer of node records
+_records = collections.deque(maxlen=10000)
+# number of update passes recorded so far
+_update_pass = 0
+
+def set_buffer_size(size):
+    """Change maximum number of stored records, keeping the latest ones"""
+    global _records
+    _records = collections.deque(_records, maxlen=size)
+
+def set_memory_tracking(enabled):
+    """Start or stop tracking of memory allocations (slows down Python noticeably)"""
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+def tracks_memory():
+    """True if memory allocations are being tracked"""
+    return tracemalloc.is_tracing()
+
+def begin_update():
+    """Mark start of new update pass"""
+    global _update_pass
+    _update_pass += 1
+
+def node_memory_start():
+    """Call before processing of a node, returns baseline for record_node()"""
+    if not tracemalloc.is_tracing():
+        return None
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    else:
+        # Python < 3.9 (Blender 2.8x) has no reset_peak; clearing traces
+        # resets the peak too, blocks allocated before are not tracked then
+        tracemalloc.clear_traces()
+    return tracemalloc.get_traced_memory()[0]
+
+def get_outputs_size(node):
+    tree_data = socket_data_cache.get(node.id_data.tree_id, {})
+    size = 0
+    for socket in node.outputs:
+        s_id = getattr(socket, 'socket_id', None)
+        if s_id in tree_data:
+            size += sv_data_size(tree_data[s_id])
+    return size
+
+def record_node(node, start, duration, memory_start=None):
+    """Store record about processing of the node"""
+    peak = None
+    if memory_start is not None and tracemalloc.is_tracing():
+        peak = tracemalloc.get_traced_memory()[1] - memory_start
+    _records.append({
+        "tree": node.id_data.name,
+        "name": node.name,
+        "bl_idname": node.bl_idname,
+        "update": _update_pass,
+        "start": start,
+        "duration": duration,
+        "output_size": get_outputs_size(node),
+        "peak_memory": peak
+    })
+
+def get_records(tree_name=None, node_name=None):
+    """Stored records, optionally filtered by tree and node name, oldest first"""
+    return [r for r in _records
+                if (tree_name is None or r["tree"] == tree_name)
+                and (node_name is None or r["name"] == node_name)]
+
+def get_node_stats(tree_name=None, sort="total"):
+    """
+    Aggregate records per node.
+    Returns list of dictionaries with keys tree, name, bl_idname,
+    count, total, mean, max, last, output_size, peak_memory;
+    sorted by specified key in descending order.
+    """
+    stats = collections.OrderedDict()
+    for r in get_records(tree_name):
+        key = (r["tree"], r["name"])
+        item = stats.get(key)
+        if item is None:
+            item = stats[key] = dict(tree=r["tree"], name=r["name"], bl_idname=r["bl_idname"],
+                                     count=0, total=0.0, max=0.0, peak_memory=None)
+        item["count"] += 1
+        item["total"] += r["duration"]
+        item["max"] = max(item["max"], r["duration"])
+        item["last"] = r["duration"]
+        item["output_size"] = r["output_size"]
+        if r["peak_memory"] is not None:
+            item["peak_memory"] = max(item["peak_memory"] or 0, r["peak_memory"])
+    result = list(stats.values())
+    for item in result:
+        item["mean"] = item["total"] / item["count"]
+    result.sort(key=lambda item: item[sort] or 0, reverse=True)
+    return result
+
+def clear():
+    global _update_pass
+    _records.clear()
+    _update_pass = 0
+
+def get_chrome_trace():
+    """Records in Chrome trace event format"""
+    events = []
+    for r in _records:
+        events.append({
+            "name": r["name"],
+            "cat": r["bl_idname"],
+            "ph": "X",
+            "ts": r["start"] * 1e6,
+            "dur": r["duration"] * 1e6,
+            "pid": r["tree"],
+            "tid": 0,
+            "args": {"update": r["update"], "output_size": r["output_size"], "peak_memory": r["peak_memory"]}
+        })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+def save(path, format="CHROME"):
+    if format == "CHROME":
+        data = get_chrome_trace()
+    else:
+        data = {"records": list(_records), "stats": get_node_stats()}
+    with open(path, 'w') as f:
+        json.dump(data, f)
+    info("Update telemetry (%s records) saved to %s", len(_records), path)
+
+class SvTelemetrySave(bpy.types.Operator):
+    """Save collected update telemetry to JSON file"""
+    bl_idname = "node.sverchok_telemetry_save"
+    bl_label = "Save update telemetry"
+    bl_options = {'INTERNAL'}
+
+    formats = [
+            ("CHROME", "Chrome trace", "Chrome trace event format, can be opened in chrome://tracing", 0),
+            ("JSON", "Records", "Plain list of records and per-node statistics", 1)
+        ]
+
+    format: EnumProperty(name = "Format", items = formats, default = "CHROME")
+    filepath: StringProperty(subtype="FILE_PATH")
+
+    def execute(self, context):
+        save(self.filepath, self.format)
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+class SvTelemetryReset(bpy.types.Operator):
+    """Reset collected update telemetry"""
+    bl_idname = "node.sverchok_telemetry_reset"
+    bl_label = "Reset update telemetry"
+    bl_options = {'INTERNAL'}
+
+    def execute(self, context):
+        clear()
+        info("Update telemetry cleared.")
+        return {'FINISHED'}
+
+classes = [SvTelemetrySave, SvTelemetryReset]
+
+def register():
+    for class_name in classes:
+        bpy.utils.register_class(class_name)
+
+def unregister():
+    for class_name in reversed(classes):
+        bpy.utils.unregister_class(class_name)
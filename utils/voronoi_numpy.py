@@ -0,0 +1,297 @@
+# This file is part of project Sverchok. It's copyrighted by the contributors
+# recorded in the version control history of the file, available from
+# its original location https://github.com/nortikin/sverchok/commit/master
+#
+# SPDX-License-Identifier: GPL3
+# License-Filename: LICENSE
+
+"""
+2D Voronoi diagrams, with sites and results stored in numpy arrays.
+
+The diagram is built as the dual of Delaunay triangulation of sites:
+vertices of the diagram are circumcenters of Delaunay triangles, finite
+edges connect circumcenters of adjacent triangles, and each edge of the
+convex hull of sites gives a ray going to infinity. The triangulation is
+calculated by scipy.spatial.Delaunay (Qhull) if scipy is installed, and
+by Fortune's sweep from sverchok.utils.voronoi otherwise.
+
+When only a few sites move (as between frames of an animation), the
+triangulation of the previous diagram is updated locally instead of
+being calculated anew, see Voronoi2D.update.
+"""
+
+import numpy as np
+
+from sverchok.utils.voronoi import Site, computeDelaunayTriangulation
+
+try:
+    from scipy.spatial import Delaunay
+except ImportError:
+    Delaunay = None
+
+# Voronoi2D.update builds the diagram from scratch if more than this part of sites moved
+INCREMENTAL_MAX_MOVED = 0.05
+
+# relative tolerance of checks if a point is inside of a circumcircle
+CIRCLE_EPSILON = 1e-9
+
+# number of point / circle pairs checked at once
+CIRCLE_CHECK_CHUNK = 1 << 20
+
+# number of new triangles checked against nearby sites at once
+CIRCLE_CHECK_GROUP = 16
+
+# triangles with many sites nearby are checked against this number of them first
+CIRCLE_CHECK_SAMPLE = 1024
+
+
+def _signed_areas(sites, triangles):
+    a, b, c = (sites[triangles[:, i]] for i in range(3))
+    b = b - a
+    c = c - a
+    return (b[:, 0] * c[:, 1] - b[:, 1] * c[:, 0]) / 2
+
+
+def _circumcircles(sites, triangles):
+    """centers of circumcircles of triangles, array (m, 2), and squared radiuses, array (m,)"""
+    a, b, c = (sites[triangles[:, i]] for i in range(3))
+    b = b - a
+    c = c - a
+    d = 2 * (b[:, 0] * c[:, 1] - b[:, 1] * c[:, 0])
+    b2 = (b * b).sum(axis=1)
+    c2 = (c * c).sum(axis=1)
+    ux = (c[:, 1] * b2 - b[:, 1] * c2) / d
+    uy = (b[:, 0] * c2 - c[:, 0] * b2) / d
+    return a + np.stack([ux, uy], axis=1), ux * ux + uy * uy
+
+
+def _empty_circles(sites, centers, radiuses2):
+    """
+    For each circle, True if there are no sites strictly inside of it.
+    Circles are checked by small groups, against sites in the bounding box
+    of the group. Big circles usually contain some of sites, so groups with
+    many sites nearby are checked against a sample of them first.
+    """
+    radiuses = np.sqrt(radiuses2)[:, np.newaxis]
+    result = np.ones(len(centers), dtype=bool)
+    order = np.argsort(centers[:, 0])
+    for start in range(0, len(centers), CIRCLE_CHECK_GROUP):
+        group = order[start : start + CIRCLE_CHECK_GROUP]
+        for sample in (True, False):
+            low = (centers[group] - radiuses[group]).min(axis=0)
+            high = (centers[group] + radiuses[group]).max(axis=0)
+            nearby = sites[((sites >= low) & (sites <= high)).all(axis=1)]
+            if sample:
+                if len(nearby) <= CIRCLE_CHECK_SAMPLE:
+                    continue
+                nearby = nearby[:: len(nearby) // CIRCLE_CHECK_SAMPLE]
+            diffs = centers[group, np.newaxis, :] - nearby[np.newaxis, :, :]
+            inside = ((diffs * diffs).sum(axis=2) < radiuses2[group, np.newaxis] * (1 - CIRCLE_EPSILON)).any(axis=1)
+            result[group[inside]] = False
+            group = group[~inside]
+            if not len(group):
+                break
+    return result
+
+
+def delaunay_triangles(sites):
+    """
+    Delaunay triangulation of 2D points, array of shape (n, 2).
+    Returns array of shape (m, 3) with indexes of vertices of triangles,
+    ordered counterclockwise. If all points lay on one line, there are no triangles.
+    """
+    sites = np.asarray(sites, dtype=np.float64).reshape((-1, 2))
+    if len(sites) < 3:
+        return np.empty((0, 3), dtype=np.int64)
+    if Delaunay is not None:
+        try:
+            triangles = Delaunay(sites).simplices.astype(np.int64)
+        except Exception:
+            # QhullError: points are collinear or coincide
+            return np.empty((0, 3), dtype=np.int64)
+    else:
+        triangles = computeDelaunayTriangulation([Site(x, y) for x, y in sites.tolist()])
+        triangles = np.array([tri for tri in triangles if -1 not in tri], dtype=np.int64).reshape((-1, 3))
+    areas = _signed_areas(sites, triangles)
+    triangles = triangles[areas != 0]
+    clockwise = areas[areas != 0] < 0
+    triangles[clockwise] = triangles[clockwise][:, [0, 2, 1]]
+    return triangles
+
+
+class Voronoi2D(object):
+    """
+    Voronoi diagram of 2D sites.
+
+    sites: array (n, 2).
+    triangles: Delaunay triangulation of sites, array (m, 3), counterclockwise.
+    hull_edges: edges of the convex hull of sites, array (h, 2) of indexes of sites.
+    vertices: vertices of the diagram (circumcenters of triangles), array (m, 2).
+    edges: finite edges of the diagram, array (k, 2) of indexes of vertices.
+    ray_starts, ray_directions: edges which start at vertex ray_starts[i]
+        and go to infinity in direction ray_directions[i] (unit vector).
+    line_points, line_directions: edges which are infinite in both directions;
+        there are such edges only if all sites lay on one line.
+    """
+
+    def __init__(self, sites, triangles=None):
+        self.sites = np.asarray(sites, dtype=np.float64).reshape((-1, 2))
+        if triangles is None:
+            triangles = delaunay_triangles(self.sites)
+        self.triangles = triangles
+        self._build()
+
+    def _build(self):
+        sites, triangles = self.sites, self.triangles
+        n = len(sites)
+        self.vertices, _ = _circumcircles(sites, triangles)
+
+        # edges of triangles, a -> b; each edge inside of the convex hull
+        # is used by two triangles, each edge of the hull by one
+        starts = triangles.ravel()
+        ends = triangles[:, [1, 2, 0]].ravel()
+        triangle_idxs = np.repeat(np.arange(len(triangles)), 3)
+        keys = np.minimum(starts, ends) * n + np.maximum(starts, ends)
+        order = np.argsort(keys, kind='stable')
+        paired = np.nonzero(keys[order][1:] == keys[order][:-1])[0]
+        self.edges = np.stack([triangle_idxs[order[paired]], triangle_idxs[order[paired + 1]]], axis=1)
+
+        single = np.ones(len(keys), dtype=bool)
+        single[paired] = False
+        single[paired + 1] = False
+        hull = order[single]
+        self.hull_edges = np.stack([starts[hull], ends[hull]], axis=1)
+        # triangles are counterclockwise, so outside of the hull is at the right of a -> b
+        sides = sites[ends[hull]] - sites[starts[hull]]
+        directions = np.stack([sides[:, 1], -sides[:, 0]], axis=1)
+        self.ray_starts = triangle_idxs[hull]
+        self.ray_directions = directions / np.linalg.norm(directions, axis=1)[:, np.newaxis]
+
+        self.line_points = np.empty((0, 2))
+        self.line_directions = np.empty((0, 2))
+        if not len(triangles) and n >= 2:
+            # all sites are on one line: the diagram consists of
+            # perpendicular bisectors of neighbouring sites
+            centered = sites - sites.mean(axis=0)
+            direction = np.linalg.svd(centered)[2][0]
+            projections = np.unique(centered.dot(direction))
+            if len(projections) >= 2:
+                middles = (projections[1:] + projections[:-1]) / 2
+                self.line_points = sites.mean(axis=0) + middles[:, np.newaxis] * direction
+                self.line_directions = np.tile([-direction[1], direction[0]], (len(middles), 1))
+
+    def segments(self):
+        """
+        All edges of the diagram as parametric segments p + t * d, t_min <= t <= t_max.
+        Returns tuple of arrays: points p, directions d, t_min, t_max,
+        start_vertices and end_vertices (indexes of diagram vertices at
+        t_min and t_max, -1 where the segment is infinite at that end).
+        """
+        n_edges, n_rays, n_lines = len(self.edges), len(self.ray_starts), len(self.line_points)
+        v1, v2 = self.edges.T
+        points = np.concatenate([self.vertices[v1], self.vertices[self.ray_starts], self.line_points])
+        directions = np.concatenate([self.vertices[v2] - self.vertices[v1], self.ray_directions, self.line_directions])
+        t_min = np.concatenate([np.zeros(n_edges + n_rays), np.full(n_lines, -np.inf)])
+        t_max = np.concatenate([np.ones(n_edges), np.full(n_rays + n_lines, np.inf)])
+        start_vertices = np.concatenate([v1, self.ray_starts, np.full(n_lines, -1, dtype=np.int64)])
+        end_vertices = np.concatenate([v2, np.full(n_rays + n_lines, -1, dtype=np.int64)])
+        return points, directions, t_min, t_max, start_vertices, end_vertices
+
+    def update(self, sites):
+        """
+        Voronoi diagram for new positions of the same sites.
+        If only a few sites moved, triangles which have moved sites as
+        vertices, or have new positions of sites inside of their
+        circumcircles, are replaced by triangulation of their vertices;
+        other triangles are reused.
+        """
+        sites = np.asarray(sites, dtype=np.float64).reshape((-1, 2))
+        if sites.shape != self.sites.shape or not len(self.triangles):
+            return Voronoi2D(sites)
+        moved = np.nonzero((sites != self.sites).any(axis=1))[0]
+        if not len(moved):
+            return self
+        if len(moved) > INCREMENTAL_MAX_MOVED * len(sites):
+            return Voronoi2D(sites)
+        triangles = self._updated_triangles(sites, moved)
+        if triangles is None:
+            return Voronoi2D(sites)
+        return Voronoi2D(sites, triangles)
+
+    def _updated_triangles(self, sites, moved):
+        old_sites, triangles = self.sites, self.triangles
+        new_positions = sites[moved]
+
+        invalid = np.isin(triangles, moved).any(axis=1)
+        centers, radiuses2 = _circumcircles(old_sites, triangles)
+        # only circles which reach the bounding box of new positions are checked
+        radiuses = np.sqrt(radiuses2) * (1 + CIRCLE_EPSILON)
+        low, high = new_positions.min(axis=0), new_positions.max(axis=0)
+        candidates = np.nonzero((centers[:, 0] + radiuses >= low[0]) & (centers[:, 0] - radiuses <= high[0]) &
+                                (centers[:, 1] + radiuses >= low[1]) & (centers[:, 1] - radiuses <= high[1]))[0]
+        step = max(1, CIRCLE_CHECK_CHUNK // max(1, len(candidates)))
+        for start in range(0, len(moved), step):
+            diffs = centers[candidates, np.newaxis, :] - new_positions[np.newaxis, start : start + step, :]
+            inside = (diffs * diffs).sum(axis=2) < radiuses2[candidates, np.newaxis] * (1 + CIRCLE_EPSILON)
+            invalid[candidates[inside.any(axis=1)]] = True
+
+        # sites which move outside of the convex hull make new
+        # triangles with vertices of hull edges they can see
+        hull_starts = old_sites[self.hull_edges[:, 0]]
+        sides = old_sites[self.hull_edges[:, 1]] - hull_starts
+        relative = new_positions[np.newaxis, :, :] - hull_starts[:, np.newaxis, :]
+        cross = sides[:, np.newaxis, 0] * relative[:, :, 1] - sides[:, np.newaxis, 1] * relative[:, :, 0]
+        visible = (cross <= 0).any(axis=1)
+
+        affected = np.unique(np.concatenate([triangles[invalid].ravel(), moved, self.hull_edges[visible].ravel()]))
+        local = affected[delaunay_triangles(sites[affected])]
+        if not len(local):
+            return None
+
+        # new triangles are Delaunay triangles of all sites
+        # if there are no other sites inside of their circumcircles
+        centers, radiuses2 = _circumcircles(sites, local)
+        good = _empty_circles(sites, centers, radiuses2)
+        local = local[good]
+
+        # triangles around the affected sites, before and after the update
+        n = len(sites)
+        near = np.isin(triangles, affected).any(axis=1)
+        old_patch = triangles[near]
+        kept_patch = triangles[near & ~invalid]
+        known = _triangle_keys(kept_patch, n)
+        added = local[~np.isin(_triangle_keys(local, n), known)]
+        new_patch = np.concatenate([kept_patch, added])
+        if not _same_topology(sites, old_patch, new_patch, added):
+            return None
+        return np.concatenate([triangles[~invalid], added])
+
+
+def _triangle_keys(triangles, n):
+    rows = np.sort(triangles, axis=1)
+    return (rows[:, 0] * n + rows[:, 1]) * n + rows[:, 2]
+
+
+def _euler_characteristic(triangles, n):
+    starts = triangles.ravel()
+    ends = triangles[:, [1, 2, 0]].ravel()
+    edges = np.unique(np.minimum(starts, ends) * n + np.maximum(starts, ends))
+    return len(np.unique(triangles)) - len(edges) + len(triangles)
+
+
+def _same_topology(sites, old_patch, new_patch, added):
+    """
+    Check that the new patch of triangles is a valid replacement of the old one:
+    added triangles are counterclockwise, triangles do not overlap (each
+    directed edge is used once), the same vertices are used and the patch
+    has the same Euler characteristic (so it has no new holes).
+    """
+    if (_signed_areas(sites, added) <= 0).any():
+        return False
+    n = len(sites)
+    directed = new_patch.ravel() * n + new_patch[:, [1, 2, 0]].ravel()
+    if len(np.unique(directed)) != len(directed):
+        return False
+    if not np.array_equal(np.unique(old_patch), np.unique(new_patch)):
+        return False
+    return _euler_characteristic(old_patch, n) == _euler_characteristic(new_patch, n)